@@ -2,7 +2,7 @@ from django.contrib import admin
 
 # Register your models here.
 from django.contrib import admin
-from .models import Categoria, Presupuesto, Transaccion, Alerta, WhatsAppLog, WhatsAppSession
+from .models import Categoria, Presupuesto, Transaccion, Alerta, WhatsAppLog, WhatsAppSession, ReglaCategoria
 
 # 1. Configuración para CATEGORÍA
 class CategoriaAdmin(admin.ModelAdmin):
@@ -51,8 +51,9 @@ class AlertaAdmin(admin.ModelAdmin):
 
 @admin.register(WhatsAppLog)
 class WhatsAppLogAdmin(admin.ModelAdmin):
-    list_display = ('fecha_creacion', 'procesado', 'ver_mensaje')
+    list_display = ('fecha_creacion', 'procesado', 'intentos', 'ver_mensaje')
     list_filter = ('procesado', 'fecha_creacion')
+    search_fields = ('mensaje_id',)
     
     def ver_mensaje(self, obj):
         # Intentamos mostrar el texto del mensaje para ver rápido qué es
@@ -65,6 +66,12 @@ class WhatsAppLogAdmin(admin.ModelAdmin):
 class WhatsAppSessionAdmin(admin.ModelAdmin):
     list_display = ('usuario', 'telefono', 'estado', 'ultimo_mensaje')
 
+@admin.register(ReglaCategoria)
+class ReglaCategoriaAdmin(admin.ModelAdmin):
+    list_display = ('patron', 'categoria', 'usuario', 'prioridad')
+    list_filter = ('usuario',)
+    search_fields = ('patron',)
+
 # --- Registro final ---
 admin.site.register(Categoria, CategoriaAdmin)
 admin.site.register(Transaccion, TransaccionAdmin)
@@ -0,0 +1,319 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear
+from django.utils import timezone
+from .models import Categoria, Presupuesto, ResumenDiario, Transaccion
+from .utils import rango_mes
+from .verificacion import encolar_verificacion
+from . import versiones
+
+# --- LIBRO DE GASTOS POR PRESUPUESTO ---
+# Cada Presupuesto guarda en `gastado` la suma de los GASTOS que le corresponden.
+# En vez de recalcular un aggregate en cada lectura, aplicamos deltas con F() cada vez
+# que una Transacción se crea, edita o elimina (ver signals.py). Las actualizaciones con F()
+# se resuelven en la BD, así que dos gastos simultáneos no se pisan entre sí.
+
+
+_diferido = ContextVar('libro_diferido', default=False)
+
+
+@contextmanager
+def libro_diferido():
+    """
+    Pausa los receptores del libro y del resumen diario (ver signals.py) para escrituras
+    masivas que luego recalculan los periodos afectados de una vez (ej: lote de la API).
+    """
+    token = _diferido.set(True)
+    try:
+        yield
+    finally:
+        _diferido.reset(token)
+
+
+def libro_en_pausa():
+    return _diferido.get()
+
+
+def presupuestos_afectados(usuario_id, fecha, categoria_id):
+    """
+    QuerySet de los presupuestos que suman un gasto de esa fecha y categoría:
+    a) Presupuesto Global (sin categorías)
+    b) Presupuesto que incluye explícitamente la categoría
+    c) Presupuesto que incluye al PADRE de la categoría
+    """
+    filtro = Q(categorias=None)
+    if categoria_id:
+        filtro |= Q(categorias=categoria_id) | Q(categorias__subcategorias=categoria_id)
+
+    ids = Presupuesto.objects.filter(
+        usuario_id=usuario_id,
+        anio=fecha.year,
+        mes=fecha.month
+    ).filter(filtro).values('pk')
+
+    # Usamos una subconsulta para no duplicar filas por el JOIN del M2M
+    return Presupuesto.objects.filter(pk__in=ids)
+
+
+def estado_contable(transaccion):
+    """Foto de los campos de una transacción que influyen en el libro de presupuestos."""
+    if transaccion.tipo != 'GASTO':
+        return None
+    return (transaccion.usuario_id, transaccion.fecha, transaccion.categoria_id, transaccion.monto)
+
+
+def aplicar_movimiento(anterior, nuevo):
+    """
+    Mueve el monto de un gasto en el libro: lo resta de los presupuestos del estado
+    anterior y lo suma a los del nuevo. Cubre cambios de monto, categoría, mes o tipo.
+    """
+    if anterior == nuevo:
+        return
+
+    if anterior:
+        usuario_id, fecha, categoria_id, monto = anterior
+        presupuestos_afectados(usuario_id, fecha, categoria_id).update(gastado=F('gastado') - monto, actualizado_en=timezone.now())
+
+    if nuevo:
+        usuario_id, fecha, categoria_id, monto = nuevo
+        presupuestos_afectados(usuario_id, fecha, categoria_id).update(gastado=F('gastado') + monto, actualizado_en=timezone.now())
+
+
+def gastos_por_presupuesto(presupuestos):
+    """
+    Motor de progreso: calcula en UNA pasada lo gastado en cada presupuesto.
+
+    Hace un solo GROUP BY (anio, mes, categoria, categoria_padre) sobre los gastos de los
+    usuarios y periodos involucrados, y luego cruza en memoria cada grupo contra el set de
+    categorías del presupuesto (idealmente ya prefetcheado). Retorna {presupuesto.pk: total}.
+    """
+    presupuestos = list(presupuestos)
+    if not presupuestos:
+        return {}
+
+    # Acotamos por usuarios y por el rango de meses que cubren los presupuestos
+    desde = min((p.anio, p.mes) for p in presupuestos)
+    hasta = max((p.anio, p.mes) for p in presupuestos)
+
+    grupos = Transaccion.objects.filter(
+        usuario_id__in={p.usuario_id for p in presupuestos},
+        tipo='GASTO',
+        fecha__gte=rango_mes(*desde)[0],
+        fecha__lt=rango_mes(*hasta)[1]
+    ).values(
+        'usuario_id', 'categoria_id', 'categoria__categoria_padre_id',
+        anio=ExtractYear('fecha'), mes=ExtractMonth('fecha')
+    ).annotate(total=Sum('monto')).order_by()
+
+    # {(usuario, anio, mes): [(categoria, padre, total), ...]}
+    por_periodo = defaultdict(list)
+    for g in grupos:
+        por_periodo[(g['usuario_id'], g['anio'], g['mes'])].append(
+            (g['categoria_id'], g['categoria__categoria_padre_id'], g['total'])
+        )
+
+    resultado = {}
+    for p in presupuestos:
+        cats_ids = {c.pk for c in p.categorias.all()}
+        total = 0
+        for categoria_id, padre_id, monto in por_periodo[(p.usuario_id, p.anio, p.mes)]:
+            # Global (sin categorías) suma todo; si no, la categoría o su padre deben estar incluidos
+            if not cats_ids or categoria_id in cats_ids or padre_id in cats_ids:
+                total += monto
+        resultado[p.pk] = total
+    return resultado
+
+
+def calcular_gastado(presupuesto):
+    """Suma desde cero los gastos de un presupuesto (fuente de verdad del libro)."""
+    return gastos_por_presupuesto([presupuesto])[presupuesto.pk]
+
+
+def recalcular_gastado(presupuestos):
+    """Reconstruye el libro para los presupuestos indicados. Retorna cuántos se corrigieron."""
+    presupuestos = list(presupuestos)
+    totales = gastos_por_presupuesto(presupuestos)
+
+    corregidos = 0
+    for presupuesto in presupuestos:
+        total = totales[presupuesto.pk]
+        if total > presupuesto.gastado:
+            # Subió lo gastado sin pasar por un save() de gasto: también hay que revisar alertas
+            encolar_verificacion(presupuesto.usuario_id, presupuesto.anio, presupuesto.mes)
+        if total != presupuesto.gastado:
+            Presupuesto.objects.filter(pk=presupuesto.pk).update(gastado=total, actualizado_en=timezone.now())
+            versiones.marcar(versiones.FINANZAS, presupuesto.usuario_id)
+            presupuesto.gastado = total
+            corregidos += 1
+    return corregidos
+
+
+def recalcular_presupuestos_usuario(usuario_id):
+    presupuestos = Presupuesto.objects.filter(usuario_id=usuario_id).prefetch_related('categorias')
+    return recalcular_gastado(presupuestos)
+
+
+# --- RESUMEN DIARIO (gráficos del dashboard) ---
+# Igual que el libro de presupuestos: cada escritura de una Transacción mueve su monto
+# entre filas de ResumenDiario con F(), así el dashboard suma ~31 filas por categoría en
+# vez de recorrer todas las transacciones del mes.
+
+TAMANO_LOTE_RESUMEN = 1000
+
+
+def fila_resumen(transaccion, categoria_padre_id=None):
+    """Foto (usuario, fecha, categoría principal, tipo, monto) de una transacción."""
+    if categoria_padre_id is None and transaccion.categoria_id:
+        # La categoría suele venir ya cargada (form, API, bot); si no, es una consulta
+        try:
+            categoria = transaccion.categoria
+            categoria_padre_id = categoria.categoria_padre_id or categoria.pk
+        except Categoria.DoesNotExist:
+            pass # Borrada en la misma cascada (p. ej. al eliminar la cuenta)
+    return (transaccion.usuario_id, transaccion.fecha, categoria_padre_id, transaccion.tipo, transaccion.monto)
+
+
+def aplicar_resumen(anterior, nuevo):
+    """Resta la fila anterior del resumen y suma la nueva (crear, editar o borrar)."""
+    if anterior == nuevo:
+        return
+
+    if anterior:
+        usuario_id, fecha, categoria_padre_id, tipo, monto = anterior
+        filas = ResumenDiario.objects.filter(
+            usuario_id=usuario_id, fecha=fecha, categoria_padre_id=categoria_padre_id, tipo=tipo
+        )
+        filas.update(total=F('total') - monto, cantidad=F('cantidad') - 1)
+        filas.filter(cantidad__lte=0).delete() # El día quedó sin transacciones
+
+    if nuevo:
+        usuario_id, fecha, categoria_padre_id, tipo, monto = nuevo
+        clave = dict(usuario_id=usuario_id, fecha=fecha, categoria_padre_id=categoria_padre_id, tipo=tipo)
+        if ResumenDiario.objects.filter(**clave).update(total=F('total') + monto, cantidad=F('cantidad') + 1):
+            return
+        try:
+            with transaction.atomic():
+                ResumenDiario.objects.create(total=monto, cantidad=1, **clave)
+        except IntegrityError:
+            # Otro proceso creó la fila entre el UPDATE y el INSERT
+            ResumenDiario.objects.filter(**clave).update(total=F('total') + monto, cantidad=F('cantidad') + 1)
+
+
+def reconstruir_resumen(usuario_id=None, fechas=None):
+    """
+    Regenera el resumen diario desde las transacciones. Retorna cuántas filas quedaron.
+    `fechas` acota la reconstrucción a esos días (ej: los que tocó un lote de la API).
+    """
+    transacciones = Transaccion.objects.all()
+    filas = ResumenDiario.objects.all()
+    if usuario_id is not None:
+        transacciones = transacciones.filter(usuario_id=usuario_id)
+        filas = filas.filter(usuario_id=usuario_id)
+    if fechas is not None:
+        transacciones = transacciones.filter(fecha__in=fechas)
+        filas = filas.filter(fecha__in=fechas)
+
+    grupos = transacciones.values(
+        'usuario_id', 'fecha', 'tipo',
+        raiz=Coalesce('categoria__categoria_padre_id', 'categoria_id')
+    ).annotate(suma=Sum('monto'), cantidad=Count('id')).order_by()
+
+    creadas = 0
+    with transaction.atomic():
+        filas.delete()
+        lote = []
+        for g in grupos.iterator(chunk_size=TAMANO_LOTE_RESUMEN):
+            lote.append(ResumenDiario(
+                usuario_id=g['usuario_id'], fecha=g['fecha'], categoria_padre_id=g['raiz'],
+                tipo=g['tipo'], total=g['suma'], cantidad=g['cantidad']
+            ))
+            if len(lote) >= TAMANO_LOTE_RESUMEN:
+                creadas += len(ResumenDiario.objects.bulk_create(lote))
+                lote = []
+        creadas += len(ResumenDiario.objects.bulk_create(lote))
+    return creadas
+
+
+def resumen_mes(usuario, anio, mes):
+    """Filas del resumen diario de un mes (rango semiabierto, usa el índice único)."""
+    inicio, fin = rango_mes(anio, mes)
+    return ResumenDiario.objects.filter(usuario=usuario, fecha__gte=inicio, fecha__lt=fin)
+
+
+def totales_por_tipo(resumen):
+    """{'INGRESO': total, 'GASTO': total} a partir de filas del resumen."""
+    totales = {'INGRESO': 0, 'GASTO': 0}
+    for fila in resumen.values('tipo').annotate(suma=Sum('total')).order_by():
+        totales[fila['tipo']] = fila['suma'] or 0
+    return totales
+
+
+def gastos_por_dia(resumen):
+    """{día del mes: total gastado} a partir de filas del resumen."""
+    filas = resumen.filter(tipo='GASTO').values('fecha').annotate(suma=Sum('total')).order_by()
+    return {fila['fecha'].day: float(fila['suma']) for fila in filas}
+
+
+# --- GRÁFICO DE TORTA ---
+
+def datos_torta(gastos, top=None, sin_categoria='Otros', etiqueta_resto='Otros',
+                campos_nombre=('categoria__categoria_padre__nombre', 'categoria__nombre'), campo_monto='monto'):
+    """
+    Agrupa montos por categoría principal en UNA consulta y retorna [{"name", "value"}, ...]
+    ordenado de mayor a menor.
+
+    - gastos: QuerySet ya filtrado (por defecto de Transaccion; para ResumenDiario usar
+      campos_nombre=('categoria_padre__nombre',) y campo_monto='total').
+    - campos_nombre: se usa el primero que no sea NULL (padre, luego la propia categoría).
+    - top: deja las N porciones más grandes y junta el resto en `etiqueta_resto`.
+    """
+    filas = gastos.values(
+        nombre=Coalesce(*campos_nombre, Value(sin_categoria))
+    ).annotate(valor=Sum(campo_monto)).order_by('-valor', 'nombre')
+
+    datos = [{"name": f['nombre'], "value": float(f['valor'])} for f in filas]
+    if not top or len(datos) <= top:
+        return datos
+
+    principales, resto = datos[:top], datos[top:]
+    sobrante = sum(d['value'] for d in resto)
+    for d in principales:
+        if d['name'] == etiqueta_resto:
+            d['value'] += sobrante
+            break
+    else:
+        principales.append({"name": etiqueta_resto, "value": sobrante})
+    return principales
+
+
+# --- PROGRESO DE PRESUPUESTOS (vistas web, dashboard y API) ---
+
+def calcular_porcentaje(gastado, limite):
+    if limite <= 0:
+        return 0
+    # Usamos int() para redondear y quitar decimales
+    return int((gastado * 100) / limite)
+
+
+def progreso_presupuestos(presupuestos):
+    """
+    Arma los datos de progreso (gastado, porcentaje, restante...) de varios presupuestos.
+    Lee el libro ya materializado, así que no hace consultas por presupuesto: pasar un
+    QuerySet con prefetch_related('categorias') si el template va a mostrarlas.
+    """
+    datos = []
+    for p in presupuestos:
+        porcentaje = calcular_porcentaje(p.gastado, p.monto_limite)
+        datos.append({
+            'presupuesto': p,
+            'gastado': p.gastado,
+            'porcentaje': porcentaje,
+            'porcentaje_visual': min(porcentaje, 100), # Tope visual para el CSS
+            'excedido': porcentaje > 100,
+            'restante': p.monto_limite - p.gastado,
+            'estado': 'danger' if porcentaje > 90 else 'warning' if porcentaje > 70 else 'success'
+        })
+    return datos
@@ -0,0 +1,42 @@
+import threading
+from django.db import transaction
+
+# --- TRABAJO AGRUPADO AL CONFIRMAR LA TRANSACCIÓN ---
+# Lo usan verificacion.py (alertas por periodo), versiones.py (sellos) y signals.py (recalcular
+# los usuarios afectados por borrar categorías): las señales anotan claves mientras dura el
+# atomic() y el trabajo corre UNA vez por clave al confirmar.
+#
+# Las claves pendientes viven aquí (por hilo y por conexión), no en la lista interna de
+# callbacks de Django. Cada anotación registra un on_commit barato: el primero que corre
+# procesa todas las claves y los demás no encuentran nada. Si un savepoint se revierte,
+# Django descarta sus callbacks pero quedan los de afuera; a lo más se procesa de más una
+# clave revertida, y todos los usos toleran eso (revisar un periodo, mover un sello o
+# recalcular un usuario de más).
+
+
+class LoteAlConfirmar:
+    def __init__(self, procesar):
+        self.procesar = procesar # (claves ordenadas) -> None
+        self._local = threading.local()
+
+    def _pendientes(self):
+        if not hasattr(self._local, 'por_conexion'):
+            self._local.por_conexion = {}
+        return self._local.por_conexion
+
+    def agregar(self, clave, using=None):
+        conexion = transaction.get_connection(using)
+        if not conexion.in_atomic_block:
+            # Autocommit: no hay nada que esperar. Lo que quedara anotado es de una
+            # transacción revertida completa (si no, su callback ya lo habría procesado)
+            self._pendientes().pop(conexion.alias, None)
+            self.procesar([clave])
+            return
+
+        self._pendientes().setdefault(conexion.alias, set()).add(clave)
+        transaction.on_commit(lambda: self._confirmar(conexion.alias), using=using)
+
+    def _confirmar(self, alias):
+        claves = self._pendientes().pop(alias, None)
+        if claves:
+            self.procesar(sorted(claves))
@@ -0,0 +1,62 @@
+import hashlib
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from app_finanzas import versiones
+
+# --- GET CONDICIONAL (ETag / Last-Modified) ---
+# La App vuelve a pedir dashboard-data, categorías y presupuestos cada vez que pasa a primer
+# plano. El ETag se arma solo con los sellos de versiones.py (caché, sin tocar la BD), así
+# que si nada cambió se responde 304 antes de ejecutar ninguna consulta de agregados.
+#
+# Sin caché compartida (versiones.compartidos()) no hay sellos confiables: se responde
+# siempre completo, sin ETag ni Last-Modified.
+#
+# El ETag es el validador principal: Last-Modified tiene resolución de 1 segundo (HTTP) y
+# solo se usa si el cliente no manda If-None-Match.
+
+
+class GetCondicionalMixin:
+    # Grupos de datos de los que depende la respuesta (ver versiones.py). Las categorías
+    # siempre incluyen también el sello de las globales.
+    recursos_version = ()
+
+    def variante_etag(self, request):
+        """Algo más que cambie la respuesta sin pasar por una escritura (ej: la fecha de hoy)."""
+        return ''
+
+    def validadores(self, request):
+        pares = []
+        for recurso in self.recursos_version:
+            pares.append((recurso, request.user.pk))
+            if recurso == versiones.CATEGORIAS:
+                pares.append((recurso, None))
+        sellos = versiones.actuales(pares)
+
+        # Misma URL (filtros, ?fields=), mismo formato pedido y mismos sellos = misma respuesta
+        base = '|'.join([
+            str(request.user.pk), *map(str, sellos), request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''), self.variante_etag(request),
+        ])
+        etag = '"%s"' % hashlib.sha1(base.encode()).hexdigest()
+        return etag, max(sellos) // 10**9
+
+    def get_condicional(self, request, generar):
+        """Responde 304 si el cliente ya tiene esta versión; si no, llama a generar()."""
+        if not versiones.compartidos():
+            respuesta = generar()
+        else:
+            etag, modificado = self.validadores(request)
+            respuesta = get_conditional_response(request, etag=etag, last_modified=modificado)
+            if respuesta is None:
+                respuesta = generar()
+
+            if respuesta.status_code in (200, 304):
+                respuesta['ETag'] = etag
+                respuesta['Last-Modified'] = http_date(modificado)
+        # Que el cliente guarde la respuesta pero revalide siempre; y que nunca se comparta entre usuarios
+        patch_cache_control(respuesta, private=True, no_cache=True)
+        patch_vary_headers(respuesta, ('Authorization', 'Cookie'))
+        return respuesta
+
+    def list(self, request, *args, **kwargs):
+        return self.get_condicional(request, lambda: super(GetCondicionalMixin, self).list(request, *args, **kwargs))
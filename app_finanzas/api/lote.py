@@ -0,0 +1,163 @@
+import datetime
+from collections import Counter
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from app_finanzas.models import Transaccion, Presupuesto, ClaveIdempotencia
+from app_finanzas.agregados import libro_diferido, recalcular_gastado, reconstruir_resumen
+from app_finanzas.verificacion import encolar_verificacion
+from app_finanzas import versiones
+from .serializers import TransaccionSerializer
+
+# --- LOTE DE OPERACIONES (POST /api/v1/transacciones/lote/) ---
+# La App sincroniza lo capturado sin conexión en UN request en vez de uno por gasto.
+# Todo o nada: se valida el lote completo y, si no hay errores, se aplica en una sola
+# transacción con bulk_create / bulk_update. Las señales del libro quedan en pausa y al
+# final se recalculan solo los días y meses tocados; las alertas se revisan una vez por mes.
+
+
+class ClaveEnUso(Exception):
+    """Otro request con alguna de las mismas claves de idempotencia se confirmó primero."""
+
+
+def _resultado(indice, op, estado, **extra):
+    return {'indice': indice, 'op': op['op'], 'id': op.get('id'), 'estado': estado, **extra}
+
+
+def aplicar_lote(request, operaciones):
+    """
+    Valida y aplica las operaciones (ya validadas con OperacionLoteSerializer).
+    Retorna (resultados, aplicado): un resultado por operación, en el mismo orden.
+    """
+    usuario = request.user
+    contexto = {'request': request}
+    resultados = [None] * len(operaciones)
+    vigencia = timezone.now() - datetime.timedelta(days=settings.API_LOTE_DIAS_CLAVES)
+
+    # 1. Reintentos: si la clave ya se aplicó, se devuelve el resultado guardado
+    claves = [op['clave'] for op in operaciones if op.get('clave')]
+    previas = dict(
+        ClaveIdempotencia.objects.filter(usuario=usuario, clave__in=claves, creado_en__gte=vigencia)
+        .values_list('clave', 'resultado')
+    )
+
+    pendientes, vistas = [], set()
+    for i, op in enumerate(operaciones):
+        clave = op.get('clave')
+        if clave in previas:
+            resultados[i] = {**previas[clave], 'indice': i, 'repetida': True}
+        elif clave and clave in vistas:
+            resultados[i] = _resultado(i, op, 400, errores={'clave': ['Repetida dentro del mismo lote.']})
+        else:
+            vistas.add(clave)
+            pendientes.append(i)
+
+    # 2. Las transacciones a actualizar / eliminar se traen en una sola consulta
+    ids = Counter(operaciones[i]['id'] for i in pendientes if operaciones[i]['op'] != 'crear')
+    existentes = Transaccion.objects.filter(usuario=usuario)\
+        .select_related('categoria__categoria_padre').in_bulk(list(ids))
+
+    crear, actualizar, eliminar = [], [], []
+    for i in pendientes:
+        op = operaciones[i]
+        if op['op'] == 'crear':
+            crear.append(i)
+        elif op['id'] not in existentes:
+            resultados[i] = _resultado(i, op, 404, errores={'id': ['No existe.']})
+        elif ids[op['id']] > 1:
+            resultados[i] = _resultado(i, op, 400, errores={'id': ['La transacción aparece en más de una operación del lote.']})
+        elif op['op'] == 'actualizar':
+            actualizar.append(i)
+        else:
+            eliminar.append(i)
+
+    # 3. Validación: las creaciones en un solo TransaccionSerializer(many=True)
+    nuevas = TransaccionSerializer(data=[operaciones[i]['datos'] for i in crear], many=True, context=contexto)
+    if not nuevas.is_valid():
+        for i, errores in zip(crear, nuevas.errors):
+            if errores:
+                resultados[i] = _resultado(i, operaciones[i], 400, errores=errores)
+
+    cambios = {}
+    for i in actualizar:
+        op = operaciones[i]
+        serializer = TransaccionSerializer(existentes[op['id']], data=op['datos'], partial=True, context=contexto)
+        if serializer.is_valid():
+            cambios[i] = serializer.validated_data
+        else:
+            resultados[i] = _resultado(i, op, 400, errores=serializer.errors)
+
+    if any(r and r['estado'] >= 400 for r in resultados):
+        for i, op in enumerate(operaciones):
+            if resultados[i] is None:
+                resultados[i] = _resultado(i, op, 424, errores={
+                    'non_field_errors': ['No se aplicó: otras operaciones del lote tienen errores.']
+                })
+        return resultados, False
+
+    # 4. Aplicar todo junto
+    fechas, meses_gasto = set(), set()
+
+    def tocar(t):
+        fechas.add(t.fecha)
+        if t.tipo == 'GASTO':
+            meses_gasto.add((t.fecha.year, t.fecha.month))
+
+    with transaction.atomic(), libro_diferido():
+        creadas = Transaccion.objects.bulk_create(
+            [Transaccion(usuario=usuario, **datos) for datos in nuevas.validated_data]
+        )
+        for i, t in zip(crear, creadas):
+            tocar(t)
+            resultados[i] = _resultado(i, operaciones[i], 201, id=t.pk, datos=TransaccionSerializer(t, context=contexto).data)
+
+        if actualizar:
+            campos, ahora = {'actualizado_en'}, timezone.now()
+            for i in actualizar:
+                t = existentes[operaciones[i]['id']]
+                tocar(t) # Estado anterior (de dónde sale el monto)
+                for campo, valor in cambios[i].items():
+                    setattr(t, campo, valor)
+                    campos.add(campo)
+                t.actualizado_en = ahora # bulk_update no aplica auto_now
+                tocar(t)
+            Transaccion.objects.bulk_update([existentes[operaciones[i]['id']] for i in actualizar], campos)
+            for i in actualizar:
+                t = existentes[operaciones[i]['id']]
+                resultados[i] = _resultado(i, operaciones[i], 200, datos=TransaccionSerializer(t, context=contexto).data)
+
+        if eliminar:
+            for i in eliminar:
+                tocar(existentes[operaciones[i]['id']])
+                resultados[i] = _resultado(i, operaciones[i], 204)
+            Transaccion.objects.filter(pk__in=[operaciones[i]['id'] for i in eliminar]).delete()
+
+        # Libro y resumen diario: solo los días y meses que tocó el lote
+        if fechas:
+            reconstruir_resumen(usuario.pk, fechas=fechas)
+        if meses_gasto:
+            periodos = Q()
+            for anio, mes in meses_gasto:
+                periodos |= Q(anio=anio, mes=mes)
+            recalcular_gastado(Presupuesto.objects.filter(periodos, usuario=usuario).prefetch_related('categorias'))
+            for anio, mes in meses_gasto:
+                encolar_verificacion(usuario.pk, anio, mes) # Se evalúa una vez por mes, al confirmar
+
+        # bulk_create / bulk_update no disparan señales: movemos a mano el sello de los ETag
+        versiones.marcar(versiones.FINANZAS, usuario.pk)
+
+        # Claves de esta vuelta (y limpieza de las vencidas del usuario)
+        ClaveIdempotencia.objects.filter(usuario=usuario, creado_en__lt=vigencia).delete()
+        try:
+            ClaveIdempotencia.objects.bulk_create([
+                ClaveIdempotencia(
+                    usuario=usuario, clave=operaciones[i]['clave'],
+                    resultado={k: v for k, v in resultados[i].items() if k != 'indice'}
+                )
+                for i in pendientes if operaciones[i].get('clave')
+            ])
+        except IntegrityError:
+            raise ClaveEnUso()
+
+    return resultados, True
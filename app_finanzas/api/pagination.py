@@ -0,0 +1,10 @@
+from rest_framework.pagination import CursorPagination
+
+# PAGINACIÓN POR CURSOR (keyset) para la sincronización de la App.
+# A diferencia de ?page=N, el cursor se posiciona con WHERE (fecha, id) < (...),
+# así que pedir la página 500 cuesta lo mismo que pedir la primera.
+class TransaccionCursorPagination(CursorPagination):
+    ordering = ('-fecha', '-id') # El id desempata los gastos del mismo día
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
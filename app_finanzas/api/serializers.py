@@ -1,6 +1,8 @@
 from rest_framework import serializers
+from django.conf import settings
 from app_finanzas.models import Categoria, Transaccion, Presupuesto
-from django.db.models import Sum, Q
+from app_finanzas.agregados import calcular_porcentaje
+from app_finanzas.cache_categorias import arbol_usuario
 
 # 1. SERIALIZER DE CATEGORÍAS
 class CategoriaSerializer(serializers.ModelSerializer):
@@ -35,8 +37,35 @@ class CategoriaSerializer(serializers.ModelSerializer):
 
         return data
 
+# SELECCIÓN DE CAMPOS (?fields=id,monto,fecha)
+class CamposDinamicosMixin:
+    """Permite a la App pedir solo los campos que necesita en las lecturas (respuestas más livianas)."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if not request or request.method != 'GET':
+            return
+
+        campos = request.query_params.get('fields')
+        if campos:
+            pedidos = {c.strip() for c in campos.split(',') if c.strip()}
+            for nombre in set(self.fields) - pedidos:
+                self.fields.pop(nombre)
+
+class CategoriaVisibleField(serializers.PrimaryKeyRelatedField):
+    """
+    ID de una categoría Global o del usuario. Se resuelve con la caché del árbol de
+    categorías: validar un lote de N transacciones no hace N consultas a Categoria.
+    """
+    def to_internal_value(self, data):
+        categoria = arbol_usuario(self.context['request'].user).obtener(data)
+        if categoria is None:
+            self.fail('does_not_exist', pk_value=data)
+        return categoria
+
 # 2. SERIALIZER DE TRANSACCIONES
-class TransaccionSerializer(serializers.ModelSerializer):
+class TransaccionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    categoria = CategoriaVisibleField(queryset=Categoria.objects.all(), allow_null=True, required=False)
     # Campos de solo lectura para mostrar nombres bonitos en la App
     categoria_nombre = serializers.CharField(source='categoria.nombre', read_only=True)
     categoria_padre_nombre = serializers.CharField(source='categoria.categoria_padre.nombre', read_only=True, allow_null=True)
@@ -57,6 +86,32 @@ class TransaccionSerializer(serializers.ModelSerializer):
         validated_data['usuario'] = usuario
         return super().create(validated_data)
 
+# LOTE DE OPERACIONES (POST transacciones/lote/)
+class OperacionLoteSerializer(serializers.Serializer):
+    OPERACIONES = ['crear', 'actualizar', 'eliminar']
+
+    op = serializers.ChoiceField(choices=OPERACIONES)
+    id = serializers.IntegerField(required=False) # Para actualizar / eliminar
+    # Clave única por operación generada en la App (ej: UUID) para reintentar sin duplicar
+    clave = serializers.CharField(max_length=64, required=False)
+    datos = serializers.DictField(required=False) # Campos de TransaccionSerializer
+
+    def validate(self, data):
+        if data['op'] != 'crear' and not data.get('id'):
+            raise serializers.ValidationError({'id': ['Obligatorio para actualizar o eliminar.']})
+        if data['op'] != 'eliminar' and not data.get('datos'):
+            raise serializers.ValidationError({'datos': ['Obligatorio para crear o actualizar.']})
+        return data
+
+class LoteTransaccionesSerializer(serializers.Serializer):
+    operaciones = OperacionLoteSerializer(many=True, allow_empty=False)
+
+    def validate_operaciones(self, operaciones):
+        maximo = settings.API_LOTE_MAX_OPERACIONES
+        if len(operaciones) > maximo:
+            raise serializers.ValidationError(f"Máximo {maximo} operaciones por lote.")
+        return operaciones
+
 # 3. SERIALIZER DE PRESUPUESTOS
 class PresupuestoSerializer(serializers.ModelSerializer):
     # Serializamos las categorías anidadas para ver sus nombres en el detalle
@@ -71,36 +126,12 @@ class PresupuestoSerializer(serializers.ModelSerializer):
         fields = ['id', 'nombre', 'monto_limite', 'mes', 'anio', 'categorias', 'categorias_detalle','gastado', 'porcentaje']
     
     def get_gastado(self, obj):
-        # 1. Filtramos gastos del usuario y del periodo del presupuesto
-        gastos = Transaccion.objects.filter(
-            usuario=obj.usuario,
-            tipo='GASTO',
-            fecha__year=obj.anio,
-            fecha__month=obj.mes
-        )
-        
-        # 2. Filtramos por categorías asociadas (si existen)
-        cats = obj.categorias.all()
-        if cats.exists():
-            gastos = gastos.filter(
-                Q(categoria__in=cats) | 
-                Q(categoria__categoria_padre__in=cats)
-            )
-            
-        # 3. Sumamos
-        total = gastos.aggregate(Sum('monto'))['monto__sum'] or 0
-        return total
+        # El total se mantiene en el libro del presupuesto (ver app_finanzas/agregados.py)
+        return obj.gastado
 
     def get_porcentaje(self, obj):
-        limit = obj.monto_limite
-        if limit <= 0:
-            return 0
-        
-        # Reutilizamos la lógica de gasto (o llamamos a self.get_gastado(obj))
-        # Para eficiencia, aquí repetimos la llamada rápida o calculamos sobre el valor ya obtenido
-        gastado = self.get_gastado(obj) 
-        
-        return int((gastado * 100) / limit)
+        # Misma regla de porcentaje que las vistas web (app_finanzas/agregados.py)
+        return calcular_porcentaje(obj.gastado, obj.monto_limite)
 
     def create(self, validated_data):
         usuario = self.context['request'].user
@@ -0,0 +1,99 @@
+import datetime
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+from app_finanzas.models import Categoria, Transaccion, Presupuesto, Eliminacion
+
+# --- SINCRONIZACIÓN INCREMENTAL (GET /api/v1/sync/?since=<cursor>) ---
+# La App guarda el cursor de la última respuesta y en la siguiente pide solo lo que cambió
+# (actualizado_en) y lo que se borró (lápidas de Eliminacion) desde entonces.
+#
+# El cursor es opaco (firmado) y nunca retrocede. Internamente es la posición
+# (actualizado_en, id) hasta donde la App ya recibió transacciones. Al terminar, no se
+# fija en "ahora" sino en "ahora - SYNC_MARGEN_SEGUNDOS": una transacción de la BD que
+# todavía no se confirmaba (con un actualizado_en anterior) llega en la siguiente
+# sincronización. Por eso pueden repetirse registros: la App debe aplicarlos como upsert.
+
+_SAL = 'app_finanzas.sync'
+_EPOCA = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def _a_micro(momento):
+    return (momento - _EPOCA) // datetime.timedelta(microseconds=1)
+
+
+def codificar_cursor(momento, ultimo_id=0):
+    return signing.dumps([_a_micro(momento), ultimo_id], salt=_SAL, compress=True)
+
+
+def leer_cursor(token):
+    """Cursor -> (momento, ultimo_id). Lanza CursorInvalido si no lo emitimos nosotros."""
+    try:
+        micro, ultimo_id = signing.loads(token, salt=_SAL)
+        return _EPOCA + datetime.timedelta(microseconds=int(micro)), int(ultimo_id)
+    except (signing.BadSignature, TypeError, ValueError):
+        raise CursorInvalido('Cursor de sincronización inválido.')
+
+
+def cambios_desde(usuario, cursor=None, limite=None):
+    """
+    Lo que cambió para el usuario desde `cursor` (None = todo). Retorna un dict con:
+      completo: True si hay que reemplazar los datos locales (primera vez o cursor más
+                viejo que las lápidas guardadas)
+      transacciones / categorias / presupuestos: QuerySets de lo creado o modificado
+      eliminados: {'transaccion': [ids], 'categoria': [ids], 'presupuesto': [ids]}
+      hay_mas: quedan transacciones; pedir de nuevo de inmediato con el cursor nuevo
+      cursor: token para la próxima llamada
+    """
+    limite = limite or settings.SYNC_LIMITE
+    ahora = timezone.now()
+
+    desde, desde_id = cursor if cursor else (None, 0)
+    completo = desde is None or desde < ahora - datetime.timedelta(days=settings.SYNC_DIAS_ELIMINACIONES)
+    if completo:
+        desde, desde_id = None, 0
+
+    # Transacciones: por páginas, en orden (actualizado_en, id)
+    transacciones = Transaccion.objects.filter(usuario=usuario)
+    if desde:
+        transacciones = transacciones.filter(
+            Q(actualizado_en__gt=desde) | Q(actualizado_en=desde, id__gt=desde_id)
+        )
+    transacciones = list(
+        transacciones.select_related('categoria__categoria_padre').order_by('actualizado_en', 'id')[:limite + 1]
+    )
+    hay_mas = len(transacciones) > limite
+    transacciones = transacciones[:limite]
+
+    # Categorías y presupuestos son pocos: van completos en cada página
+    categorias = Categoria.objects.filter(Q(usuario=None) | Q(usuario=usuario)).select_related('categoria_padre')
+    presupuestos = Presupuesto.objects.filter(usuario=usuario).prefetch_related('categorias')
+    eliminados = {modelo: [] for modelo, _ in Eliminacion.MODELOS}
+    if desde:
+        categorias = categorias.filter(actualizado_en__gte=desde)
+        presupuestos = presupuestos.filter(actualizado_en__gte=desde)
+        lapidas = Eliminacion.objects.filter(Q(usuario=None) | Q(usuario=usuario), eliminado_en__gte=desde)
+        for modelo, objeto_id in lapidas.values_list('modelo', 'objeto_id').order_by('id'):
+            eliminados[modelo].append(objeto_id)
+
+    if hay_mas:
+        siguiente = (transacciones[-1].actualizado_en, transacciones[-1].pk)
+    else:
+        siguiente = (ahora - datetime.timedelta(seconds=settings.SYNC_MARGEN_SEGUNDOS), 0)
+        if desde and (desde, desde_id) > siguiente:
+            siguiente = (desde, desde_id) # Monótono: nunca antes de lo ya entregado
+
+    return {
+        'completo': completo,
+        'transacciones': transacciones,
+        'categorias': categorias.order_by('id'),
+        'presupuestos': presupuestos.order_by('id'),
+        'eliminados': eliminados,
+        'hay_mas': hay_mas,
+        'cursor': codificar_cursor(*siguiente),
+    }
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CategoriaViewSet, TransaccionViewSet, PresupuestoViewSet, WhatsAppWebhookView,DashboardDataView
+from .views import CategoriaViewSet, TransaccionViewSet, PresupuestoViewSet, WhatsAppWebhookView,DashboardDataView, SyncView, EstadisticasCacheView
 
 # El Router crea las rutas REST automáticamente
 router = DefaultRouter()
@@ -12,4 +12,6 @@ urlpatterns = [
     path('', include(router.urls)),
     path('webhook-whatsapp/', WhatsAppWebhookView.as_view(), name='webhook_whatsapp'),
     path('dashboard-data/', DashboardDataView.as_view(), name='api_dashboard_data'),
+    path('sync/', SyncView.as_view(), name='api_sync'),
+    path('cache/estadisticas/', EstadisticasCacheView.as_view(), name='api_cache_estadisticas'),
 ]
\ No newline at end of file
@@ -1,25 +1,45 @@
 from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q,Sum
-from django.db.models.functions import ExtractDay
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from app_finanzas.models import Categoria, Transaccion, Presupuesto
-from .serializers import CategoriaSerializer, TransaccionSerializer, PresupuestoSerializer
+from .serializers import CategoriaSerializer, TransaccionSerializer, PresupuestoSerializer, LoteTransaccionesSerializer
+from .lote import aplicar_lote, ClaveEnUso
+from .sync import cambios_desde, leer_cursor, CursorInvalido
+from .condicional import GetCondicionalMixin
+from app_finanzas import versiones
+from app_finanzas.cache_usuario import CacheUsuario
+from .pagination import TransaccionCursorPagination
+from app_finanzas.agregados import resumen_mes, totales_por_tipo, datos_torta, gastos_por_dia
 from app_finanzas.models import WhatsAppLog
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework.views import APIView
-from app_finanzas.services import WhatsAppService
+from rest_framework.exceptions import ValidationError
+from app_finanzas.services import WhatsAppService, extraer_mensaje
+from app_finanzas.importador import importar_transacciones, ErrorImportacion
+from app_finanzas.exportador import (
+    FORMATOS, ENCABEZADO_TRANSACCIONES, ENCABEZADO_REPORTE,
+    filas_transacciones, filas_reporte_presupuestos, respuesta_exportacion
+)
+from app_finanzas.utils import parsear_mes, validar_periodo
 import logging
 from django.conf import settings
+from presuApp.cache import estadisticas as estadisticas_cache
+from presuApp.metricas import WEBHOOK_SEGUNDOS, WEBHOOK_DESCARTADOS
 from django.http import HttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 
 
 # VISTA API: CATEGORÍAS
-class CategoriaViewSet(viewsets.ModelViewSet):
+class CategoriaViewSet(GetCondicionalMixin, viewsets.ModelViewSet):
     serializer_class = CategoriaSerializer
     permission_classes = [IsAuthenticated] # Solo usuarios logueados (con Token)
+    recursos_version = [versiones.CATEGORIAS] # ETag del listado (304 si no cambió nada)
 
     def get_queryset(self):
         # Si es una vista falsa (generación de docu), retornamos vacío para no romper nada. SWAGGER
@@ -38,37 +58,156 @@ class CategoriaViewSet(viewsets.ModelViewSet):
 class TransaccionViewSet(viewsets.ModelViewSet):
     serializer_class = TransaccionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TransaccionCursorPagination
 
     def get_queryset(self):
         # PARCHE PARA SWAGGER
         if getattr(self, 'swagger_fake_view', False):
             return Transaccion.objects.none()
-        # El usuario solo ve SUS gastos
-        return Transaccion.objects.filter(usuario=self.request.user).order_by('-fecha')
+        # El usuario solo ve SUS gastos.
+        # select_related evita 2 consultas por fila para categoria_nombre / categoria_padre_nombre
+        queryset = Transaccion.objects.filter(usuario=self.request.user)\
+            .select_related('categoria__categoria_padre')
+
+        # Filtros opcionales (?fecha_desde=2025-01-01&fecha_hasta=2025-01-31&tipo=GASTO&categoria=5)
+        params = self.request.query_params
+
+        fecha_desde = self._leer_fecha(params, 'fecha_desde')
+        if fecha_desde:
+            queryset = queryset.filter(fecha__gte=fecha_desde)
+
+        fecha_hasta = self._leer_fecha(params, 'fecha_hasta')
+        if fecha_hasta:
+            queryset = queryset.filter(fecha__lte=fecha_hasta)
+
+        tipo = params.get('tipo')
+        if tipo:
+            if tipo not in dict(Transaccion.TIPO_CHOICES):
+                raise ValidationError({'tipo': ['Debe ser INGRESO o GASTO.']})
+            queryset = queryset.filter(tipo=tipo)
+
+        categoria_id = params.get('categoria')
+        if categoria_id:
+            if not categoria_id.isdigit():
+                raise ValidationError({'categoria': ['Debe ser un ID numérico.']})
+            # Igual que en la web: la categoría exacta o sus hijas (si es un padre)
+            queryset = queryset.filter(
+                Q(categoria_id=categoria_id) | Q(categoria__categoria_padre_id=categoria_id)
+            )
+
+        return queryset.order_by('-fecha', '-id')
+
+    def _leer_fecha(self, params, nombre):
+        valor = params.get(nombre)
+        if not valor:
+            return None
+        try:
+            fecha = parse_date(valor)
+        except ValueError:
+            fecha = None
+        if not fecha:
+            raise ValidationError({nombre: ['Formato de fecha inválido, usa AAAA-MM-DD.']})
+        return fecha
     
     # Asignar usuario al crear
     def perform_create(self, serializer):
         serializer.save(usuario=self.request.user)
 
+    # POST /api/v1/transacciones/import/ (multipart: archivo=<cartola>, formato=csv|ofx opcional)
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def importar(self, request):
+        archivo = request.FILES.get('archivo')
+        if not archivo:
+            raise ValidationError({'archivo': ['Adjunta una cartola CSV u OFX.']})
+
+        try:
+            # archivo.file: el archivo subido tal cual (en disco si es grande), se lee en streaming
+            resultado = importar_transacciones(
+                request.user, archivo.file,
+                formato=request.data.get('formato'),
+                nombre=archivo.name,
+                encoding=request.data.get('encoding'),
+            )
+        except (ErrorImportacion, LookupError) as e:
+            raise ValidationError({'archivo': [str(e)]})
+
+        return Response(resultado, status=status.HTTP_201_CREATED if resultado['importadas'] else status.HTTP_200_OK)
+
+    # POST /api/v1/transacciones/lote/
+    # {"operaciones": [{"op": "crear", "clave": "<uuid>", "datos": {...}},
+    #                  {"op": "actualizar", "id": 5, "datos": {"monto": "1500"}},
+    #                  {"op": "eliminar", "id": 7}]}
+    @action(detail=False, methods=['post'], url_path='lote', serializer_class=LoteTransaccionesSerializer)
+    def lote(self, request):
+        lote = self.get_serializer(data=request.data)
+        lote.is_valid(raise_exception=True)
+
+        try:
+            resultados, aplicado = aplicar_lote(request, lote.validated_data['operaciones'])
+        except ClaveEnUso:
+            return Response(
+                {'detail': 'Otro request está aplicando las mismas claves. Reintenta el lote.'},
+                status=status.HTTP_409_CONFLICT
+            )
+        # Si alguna operación falla no se aplica ninguna: cada resultado trae su estado y errores
+        return Response({'resultados': resultados}, status=status.HTTP_200_OK if aplicado else status.HTTP_400_BAD_REQUEST)
+
+    # GET /api/v1/transacciones/export/?formato=csv|xlsx (+ los mismos filtros del listado)
+    @action(detail=False, methods=['get'], url_path='export')
+    def exportar(self, request):
+        formato = leer_formato(request.query_params)
+        # Sin paginar: el archivo se escribe en streaming mientras se recorre la consulta
+        filas = filas_transacciones(self.get_queryset())
+        return respuesta_exportacion(ENCABEZADO_TRANSACCIONES, filas, formato, 'transacciones', hoja='Transacciones')
+
 # VISTA API: PRESUPUESTOS
-class PresupuestoViewSet(viewsets.ModelViewSet):
+class PresupuestoViewSet(GetCondicionalMixin, viewsets.ModelViewSet):
     serializer_class = PresupuestoSerializer
     permission_classes = [IsAuthenticated]
+    # gastado cambia con cada transacción; categorias_detalle, con el árbol de categorías
+    recursos_version = [versiones.FINANZAS, versiones.CATEGORIAS]
 
     def get_queryset(self):
         # SWAGGER
         if getattr(self, 'swagger_fake_view', False):
             return Presupuesto.objects.none()
-        return Presupuesto.objects.filter(usuario=self.request.user).order_by('-anio', '-mes')
+        # El gastado de toda la página ya viene en cada fila (libro Presupuesto.gastado)
+        # y las categorías se traen en bloque para categorias_detalle: consultas fijas por página
+        return Presupuesto.objects.filter(usuario=self.request.user)\
+            .prefetch_related('categorias')\
+            .order_by('-anio', '-mes')
     # Asignar usuario al crear
     def perform_create(self, serializer):
         serializer.save(usuario=self.request.user)
 
+    # GET /api/v1/presupuestos/reporte/?formato=csv|xlsx&desde=AAAA-MM&hasta=AAAA-MM
+    @action(detail=False, methods=['get'], url_path='reporte')
+    def reporte(self, request):
+        formato = leer_formato(request.query_params)
+        rango = {}
+        for nombre in ('desde', 'hasta'):
+            try:
+                rango[nombre] = parsear_mes(request.query_params.get(nombre))
+            except ValueError:
+                raise ValidationError({nombre: ['Formato inválido, usa AAAA-MM.']})
+
+        filas = filas_reporte_presupuestos(request.user, rango['desde'], rango['hasta'])
+        return respuesta_exportacion(ENCABEZADO_REPORTE, filas, formato, 'reporte_presupuestos', hoja='Presupuestos')
+
+
+def leer_formato(params):
+    # Ojo: ?format= lo usa DRF para elegir el renderer, por eso el parámetro es ?formato=
+    formato = params.get('formato', 'csv')
+    if formato not in FORMATOS:
+        raise ValidationError({'formato': [f"Debe ser uno de: {', '.join(FORMATOS)}."]})
+    return formato
+
 logger = logging.getLogger(__name__)
 
 class WhatsAppWebhookView(APIView):
-    # Permitimos acceso sin Token, porque Meta no usa nuestros JWT
+    # Permitimos acceso sin Token, porque Meta no usa nuestros JWT (ni sesión: no se autentica nada)
     permission_classes = [AllowAny] 
+    authentication_classes = []
 
     # 1. VERIFICACIÓN (Meta te pregunta: "¿Eres tú?")
     def get(self, request):
@@ -93,43 +232,96 @@ class WhatsAppWebhookView(APIView):
 
     # 2. RECEPCIÓN DE MENSAJES
     def post(self, request):
+        with WEBHOOK_SEGUNDOS.medir(estado='500') as etiquetas:
+            respuesta = self.recibir(request)
+            etiquetas['estado'] = str(respuesta.status_code)
+        return respuesta
+
+    def recibir(self, request):
         try:
             data = request.data
+
+            mensaje = extraer_mensaje(data)
+            if mensaje is None:
+                # Callbacks de estado (sent / delivered / read) y otros eventos: no se guardan
+                WEBHOOK_DESCARTADOS.inc(motivo='sin_mensaje')
+                return Response({"status": "ignored"}, status=status.HTTP_200_OK)
+
+            # 1. Guardar Log (queda encolado: procesado=False). Si Meta reintenta la entrega
+            # trae el mismo messages[0].id y choca con el índice único: ya lo tenemos
+            try:
+                with transaction.atomic():
+                    log = WhatsAppLog.objects.create(
+                        payload=data, mensaje_id=(mensaje.get('id') or None), telefono=str(mensaje.get('from') or '')[:20]
+                    )
+            except IntegrityError:
+                WEBHOOK_DESCARTADOS.inc(motivo='duplicado')
+                return Response({"status": "duplicate"}, status=status.HTTP_200_OK)
             
-            # 1. Guardar Log
-            log = WhatsAppLog.objects.create(payload=data)
-            
-            # 2. Procesar (Disparar el cerebro)
-            service = WhatsAppService()
-            service.procesar_log(log.id)
+            # 2. Procesar: lo hace el worker (manage.py procesar_cola_whatsapp) fuera del request,
+            # así Meta recibe el 200 de inmediato aunque la Graph API esté lenta.
+            # En desarrollo se puede procesar en línea con WHATSAPP_PROCESAR_EN_LINEA=True
+            if settings.WHATSAPP_PROCESAR_EN_LINEA:
+                try:
+                    WhatsAppService().procesar_log(log.id)
+                except Exception:
+                    pass # El error queda guardado en el log y el worker lo reintenta
 
             return Response({"status": "received"}, status=status.HTTP_200_OK)
         
-        except Exception as e:
-            logger.error(f"Error en Webhook: {e}")
+        except Exception:
+            logger.exception("error_webhook")
             return Response({"status": "error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class DashboardDataView(APIView):
+# Respuesta del dashboard por usuario y periodo; se invalida sola con los sellos de versiones.py
+_cache_dashboard: CacheUsuario[dict] = CacheUsuario(
+    'dashboard', timeout=60 * 60, depende_de=[versiones.FINANZAS, versiones.CATEGORIAS]
+)
+
+class DashboardDataView(GetCondicionalMixin, APIView):
     permission_classes = [IsAuthenticated]
+    recursos_version = [versiones.FINANZAS, versiones.CATEGORIAS]
+
+    def variante_etag(self, request):
+        # Sin ?mes/&anio el periodo es el mes actual: cambia con la fecha aunque no haya escrituras
+        return timezone.now().date().isoformat()
 
     def get(self, request):
+        # Si la App ya tiene esta versión: 304 sin ejecutar ninguna consulta de agregados
+        return self.get_condicional(request, lambda: self.datos_dashboard(request))
+
+    def datos_dashboard(self, request):
         usuario = request.user
         hoy = timezone.now()
         
         # Filtros de fecha (por defecto mes actual)
-        mes = int(request.query_params.get('mes', hoy.month))
-        anio = int(request.query_params.get('anio', hoy.year))
+        mes = request.query_params.get('mes', hoy.month)
+        anio = request.query_params.get('anio', hoy.year)
+        try:
+            anio, mes = validar_periodo(anio, mes)
+        except ValueError:
+            raise ValidationError({'periodo': ['mes debe estar entre 1 y 12 y anio entre 1 y 9998.']})
 
-        # Transacciones del mes
-        transacciones = Transaccion.objects.filter(
-            usuario=usuario,
-            fecha__month=mes,
-            fecha__year=anio
+        top = request.query_params.get('top')
+        if top is not None:
+            if not top.isdigit() or int(top) < 1:
+                raise ValidationError({'top': ['Debe ser un entero positivo.']})
+            top = int(top)
+
+        # Lo comparten todos los dispositivos del usuario mientras no haya escrituras
+        datos = _cache_dashboard.obtener_o_calcular(
+            usuario.pk, lambda: self.calcular_dashboard(usuario, anio, mes, top), sub=f"{anio}-{mes}-{top or 0}"
         )
+        return Response(datos)
+
+    def calcular_dashboard(self, usuario, anio, mes, top):
+        # Totales y gráficos salen del resumen diario (~31 filas por categoría), no de las transacciones
+        resumen = resumen_mes(usuario, anio, mes)
 
         # 1. TOTALES (Tarjetas)
-        ingresos = transacciones.filter(tipo='INGRESO').aggregate(Sum('monto'))['monto__sum'] or 0
-        gastos = transacciones.filter(tipo='GASTO').aggregate(Sum('monto'))['monto__sum'] or 0
+        totales = totales_por_tipo(resumen)
+        ingresos = totales['INGRESO']
+        gastos = totales['GASTO']
 
         presupuesto_global = 0
         presu_obj = Presupuesto.objects.filter(
@@ -147,41 +339,27 @@ class DashboardDataView(APIView):
 
     
 
-        # 2. DATOS PARA GRÁFICO DE TORTA (Gastos por Categoría)
-        # Agrupamos manualmente para simplificar la respuesta JSON
-        gastos_query = transacciones.filter(tipo='GASTO').select_related('categoria')
-        data_torta = {}
-        
-        for g in gastos_query:
-            # Usamos el nombre del Padre si existe, o el nombre de la categoría
-            nombre = "Otros"
-            if g.categoria:
-                if g.categoria.categoria_padre:
-                    nombre = g.categoria.categoria_padre.nombre
-                else:
-                    nombre = g.categoria.nombre
-            
-            data_torta[nombre] = data_torta.get(nombre, 0) + float(g.monto)
-
+        # 2. DATOS PARA GRÁFICO DE TORTA (Gastos por Categoría padre)
         # Formato lista para Flutter: [{"name": "Comida", "value": 5000}, ...]
-        lista_torta = [{"name": k, "value": v} for k, v in data_torta.items()]
+        # ?top=N deja las N categorías más grandes y junta el resto en "Otros"
+        lista_torta = datos_torta(
+            resumen.filter(tipo='GASTO'),
+            top=top,
+            campos_nombre=('categoria_padre__nombre',),
+            campo_monto='total'
+        )
 
         # 3. DATOS PARA GRÁFICO DE LÍNEA (Gastos por Día)
-        gastos_dia = transacciones.filter(tipo='GASTO')\
-            .annotate(dia=ExtractDay('fecha'))\
-            .values('dia')\
-            .annotate(total=Sum('monto'))\
-            .order_by('dia')
+        gastos_dia = gastos_por_dia(resumen)
             
         # Creamos un mapa de días {1: 0, 2: 500, ... 31: 0}
         mapa_dias = {d: 0 for d in range(1, 32)}
-        for item in gastos_dia:
-            mapa_dias[item['dia']] = float(item['total'])
+        mapa_dias.update(gastos_dia)
             
         # Formato lista simple para el gráfico: [0, 500, 200, 0, ...]
         lista_dias = [mapa_dias[d] for d in sorted(mapa_dias.keys())]
 
-        return Response({
+        return {
             "totales": {
                 "ingresos": ingresos, # Lo mandamos por si quieres usarlo luego
                 "gastos": gastos,
@@ -190,4 +368,51 @@ class DashboardDataView(APIView):
             },
             "grafico_torta": lista_torta, # Asegúrate de tener las variables lista_torta
             "grafico_linea": lista_dias   # y lista_dias definidas como antes
-        })
\ No newline at end of file
+        }
+
+
+# VISTA API: SINCRONIZACIÓN INCREMENTAL
+class SyncView(APIView):
+    """
+    GET /api/v1/sync/?since=<cursor>  (sin `since` = descarga completa)
+
+    La App aplica primero los registros recibidos (upsert por id), luego borra los de
+    `eliminados` y guarda `cursor` para la próxima vez. Si `completo` es true, reemplaza
+    sus datos locales; si `hay_mas` es true, vuelve a llamar de inmediato con el cursor.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        token = request.query_params.get('since')
+        try:
+            cursor = leer_cursor(token) if token else None
+        except CursorInvalido as e:
+            raise ValidationError({'since': [str(e)]})
+
+        cambios = cambios_desde(request.user, cursor)
+        contexto = {'request': request}
+        return Response({
+            'cursor': cambios['cursor'],
+            'completo': cambios['completo'],
+            'hay_mas': cambios['hay_mas'],
+            'transacciones': TransaccionSerializer(cambios['transacciones'], many=True, context=contexto).data,
+            'categorias': CategoriaSerializer(cambios['categorias'], many=True, context=contexto).data,
+            'presupuestos': PresupuestoSerializer(cambios['presupuestos'], many=True, context=contexto).data,
+            'eliminados': {
+                'transacciones': cambios['eliminados']['transaccion'],
+                'categorias': cambios['eliminados']['categoria'],
+                'presupuestos': cambios['eliminados']['presupuesto'],
+            },
+        })
+
+
+# VISTA API: ESTADÍSTICAS DE LA CACHÉ (solo staff)
+class EstadisticasCacheView(APIView):
+    """Aciertos / fallos de la caché por espacio, del worker que atiende el request."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'backend': settings.CACHES['default']['BACKEND'],
+            'espacios': estadisticas_cache(),
+        })
@@ -0,0 +1,36 @@
+from .models import Alerta
+from .cache_usuario import CacheUsuario
+from . import versiones
+
+# --- RESUMEN DE ALERTAS NO LEÍDAS (campanita del menú) ---
+# El context processor lo pedía a la BD en cada render. Ahora se guarda en la caché de
+# Django por usuario y se reescribe (write-through) cada vez que una alerta se crea,
+# se marca como leída o se limpian todas, así la lectura casi nunca toca la BD.
+# Sin caché compartida (versiones.compartidos()) no se guarda nada: se calcula al leer.
+
+RECIENTES = 5
+TIMEOUT = 60 * 60 # Por si alguna escritura se salta las señales (ej: .update() desde el shell)
+
+_resumenes: CacheUsuario[dict] = CacheUsuario('alertas', timeout=TIMEOUT)
+
+
+def _calcular(usuario_id):
+    no_leidas = Alerta.objects.filter(usuario_id=usuario_id, leida=False)
+    recientes = list(
+        no_leidas.order_by('-fecha_creacion').values('id', 'titulo', 'mensaje', 'fecha_creacion')[:RECIENTES]
+    )
+    # Si hay menos de RECIENTES, ya sabemos el total sin hacer el COUNT
+    total = len(recientes) if len(recientes) < RECIENTES else no_leidas.count()
+    return {'total': total, 'recientes': recientes}
+
+
+def obtener_resumen(usuario_id):
+    """{'total': no leídas, 'recientes': [las últimas 5 como dicts]} del usuario."""
+    return _resumenes.obtener_o_calcular(usuario_id, lambda: _calcular(usuario_id))
+
+
+def refrescar(usuario_id):
+    """Recalcula el resumen y lo deja en la caché. Llamar después de cada escritura."""
+    if not versiones.compartidos():
+        return # Nadie lo leería: sin caché compartida obtener_resumen() siempre calcula
+    _resumenes.guardar(usuario_id, _calcular(usuario_id))
@@ -0,0 +1,143 @@
+import threading
+from collections import OrderedDict, defaultdict
+from django.db.models import Q
+from .models import Categoria
+from . import versiones
+
+# --- CACHÉ DEL ÁRBOL DE CATEGORÍAS ---
+# El árbol padre/hija casi no cambia, pero se consultaba en cada página, formulario y
+# mensaje de WhatsApp. Guardamos en memoria del proceso:
+#   - el árbol GLOBAL (usuario=None), una sola vez
+#   - el árbol combinado (global + personales) de cada usuario, en un LRU acotado
+#
+# Cada árbol se guarda junto a su "versión" (sellos de versiones.py, en la caché de Django).
+# Las señales de Categoria los mueven; un proceso que ve una versión distinta reconstruye su
+# copia. Sin caché compartida (versiones.compartidos()) este proceso no se enteraría de lo
+# que cambie otro (ej: el worker del bot), así que el árbol se arma cada vez (una consulta).
+
+MAX_USUARIOS = 512
+
+_lock = threading.Lock()
+_global = None                 # (version, [Categoria])
+_usuarios = OrderedDict()      # usuario_id -> ((version_global, version_usuario), ArbolCategorias)
+
+
+class NodoJerarquia:
+    """Padre con sus hijas visibles para un usuario (lo que recorren los templates)."""
+
+    def __init__(self, padre, hijas):
+        self.padre = padre
+        self.id = self.pk = padre.pk
+        self.nombre = padre.nombre
+        self.hijas = hijas
+
+
+class ArbolCategorias:
+    """Árbol de solo lectura. Las instancias se comparten entre requests: no modificarlas."""
+
+    def __init__(self, categorias):
+        self.por_id = {c.pk: c for c in categorias}
+        self._hijas = defaultdict(list)
+
+        for c in categorias:
+            if c.categoria_padre_id:
+                padre = self.por_id.get(c.categoria_padre_id)
+                if padre is None:
+                    continue # Hija de un padre que el usuario no ve
+                # Dejamos el padre en la caché del FK para que __str__ no consulte la BD
+                c.categoria_padre = padre
+                self._hijas[padre.pk].append(c)
+            else:
+                self._hijas[None].append(c)
+
+        for lista in self._hijas.values():
+            lista.sort(key=lambda c: c.nombre)
+
+        self.padres = self._hijas[None]
+        self.subcategorias = sorted(
+            (c for c in categorias if c.categoria_padre_id and c.categoria_padre_id in self.por_id),
+            key=lambda c: c.nombre
+        )
+        self.jerarquia = [NodoJerarquia(p, self._hijas[p.pk]) for p in self.padres]
+
+    def obtener(self, categoria_id):
+        try:
+            return self.por_id.get(int(categoria_id))
+        except (TypeError, ValueError):
+            return None
+
+    def hijas(self, padre_id):
+        """Hijas de un padre (o las categorías principales si padre_id es None)."""
+        if padre_id is None:
+            return self.padres
+        try:
+            return self._hijas.get(int(padre_id), [])
+        except (TypeError, ValueError):
+            return []
+
+
+# --- VERSIONES ---
+
+def _version(usuario_id=None):
+    return versiones.actual(versiones.CATEGORIAS, usuario_id)
+
+
+def invalidar(usuario_id=None):
+    """Marca como obsoleto el árbol global (usuario_id=None) o el de un usuario."""
+    versiones.marcar(versiones.CATEGORIAS, usuario_id)
+
+
+# --- LECTURA ---
+
+def _categorias_globales():
+    global _global
+    version = _version()
+    actual = _global
+    if actual and actual[0] == version:
+        return version, actual[1]
+
+    categorias = list(Categoria.objects.filter(usuario=None))
+    _global = (version, categorias)
+    return version, categorias
+
+
+def arbol_usuario(usuario):
+    """Árbol de categorías visible para el usuario (globales + personales)."""
+    usuario_id = getattr(usuario, 'pk', usuario)
+    if not versiones.compartidos():
+        return ArbolCategorias(list(Categoria.objects.filter(Q(usuario=None) | Q(usuario_id=usuario_id))))
+
+    version_global, globales = _categorias_globales()
+    version = (version_global, _version(usuario_id))
+
+    with _lock:
+        entrada = _usuarios.get(usuario_id)
+        if entrada and entrada[0] == version:
+            _usuarios.move_to_end(usuario_id)
+            return entrada[1]
+
+    # Copiamos las globales: el árbol de cada usuario enlaza padres/hijas en sus propias instancias
+    categorias = [_copiar(c) for c in globales]
+    categorias += list(Categoria.objects.filter(usuario_id=usuario_id))
+    arbol = ArbolCategorias(categorias)
+
+    with _lock:
+        _usuarios[usuario_id] = (version, arbol)
+        _usuarios.move_to_end(usuario_id)
+        while len(_usuarios) > MAX_USUARIOS:
+            _usuarios.popitem(last=False)
+    return arbol
+
+
+def _copiar(categoria):
+    copia = Categoria(
+        id=categoria.pk,
+        nombre=categoria.nombre,
+        icono=categoria.icono,
+        usuario_id=categoria.usuario_id,
+        categoria_padre_id=categoria.categoria_padre_id,
+    )
+    # Igual que una fila leída de la BD (para asignarla a un FK o compararla)
+    copia._state.adding = False
+    copia._state.db = categoria._state.db
+    return copia
@@ -0,0 +1,67 @@
+from typing import Callable, Generic, Iterable, Optional, TypeVar
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from . import versiones
+
+# --- CACHÉ POR USUARIO ---
+# Envoltorio chico sobre la caché de Django para valores de un usuario:
+#   clave = "{espacio}:{usuario_id}[:{sellos}][:{sub}]"
+# - espacio: nombre del grupo de valores (sale así en las estadísticas de presuApp/cache.py)
+# - timeout: por defecto el de CACHES (CACHE_TIMEOUT); None = sin vencimiento
+# - version: subirla cuando cambia la forma del valor guardado (invalida todo el espacio)
+# - depende_de: recursos de versiones.py; si una escritura mueve alguno de esos sellos, la
+#   clave cambia y la entrada vieja simplemente deja de leerse (expira con su timeout)
+#
+# Sin caché compartida (versiones.compartidos()) no se guarda ni se lee nada: una escritura
+# en otro proceso no invalidaría la copia de este, así que siempre se calcula.
+
+T = TypeVar('T')
+
+_AUSENTE = object()
+
+
+class CacheUsuario(Generic[T]):
+
+    def __init__(self, espacio: str, timeout: Optional[float] = DEFAULT_TIMEOUT, version: int = 1,
+                 depende_de: Iterable[str] = ()):
+        self.espacio = espacio
+        self.timeout = timeout
+        self.version = version
+        self.depende_de = tuple(depende_de)
+
+    def clave(self, usuario_id: int, sub: str = '') -> str:
+        partes = [self.espacio, str(usuario_id)]
+        if self.depende_de:
+            pares = []
+            for recurso in self.depende_de:
+                pares.append((recurso, usuario_id))
+                if recurso == versiones.CATEGORIAS:
+                    pares.append((recurso, None)) # Las globales también
+            partes.append('.'.join(str(sello) for sello in versiones.actuales(pares)))
+        if sub:
+            partes.append(sub)
+        return ':'.join(partes)
+
+    def obtener(self, usuario_id: int, sub: str = '') -> Optional[T]:
+        if not versiones.compartidos():
+            return None
+        return cache.get(self.clave(usuario_id, sub), version=self.version)
+
+    def guardar(self, usuario_id: int, valor: T, sub: str = '') -> None:
+        # None no se puede distinguir de "no está": no se guarda
+        if valor is not None and versiones.compartidos():
+            cache.set(self.clave(usuario_id, sub), valor, self.timeout, version=self.version)
+
+    def obtener_o_calcular(self, usuario_id: int, calcular: Callable[[], T], sub: str = '') -> T:
+        if not versiones.compartidos():
+            return calcular()
+        clave = self.clave(usuario_id, sub)
+        valor = cache.get(clave, _AUSENTE, version=self.version)
+        if valor is _AUSENTE:
+            valor = calcular()
+            cache.set(clave, valor, self.timeout, version=self.version)
+        return valor
+
+    def borrar(self, usuario_id: int, sub: str = '') -> None:
+        if versiones.compartidos():
+            cache.delete(self.clave(usuario_id, sub), version=self.version)
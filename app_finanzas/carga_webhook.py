@@ -0,0 +1,247 @@
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count, Q
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+import requests
+from .models import Categoria, Transaccion, WhatsAppLog, WhatsAppSession
+from .cliente_graph import ClienteGraph
+from .cola_whatsapp import WorkerColaWhatsApp
+from .simulador_graph import ServidorGraphSimulado
+
+# --- PRUEBA DE CARGA DEL WEBHOOK DE WHATSAPP ---
+# Reproduce conversaciones completas (hola -> Registrar Gasto -> monto -> padre -> hija)
+# de muchos teléfonos a la vez contra WhatsAppWebhookView, con payloads como los de Meta.
+# Las respuestas del bot van a un ServidorGraphSimulado (con latencia y errores al azar) y
+# la cola se procesa con un WorkerColaWhatsApp en este mismo proceso.
+#
+# Mide la latencia del ACK del webhook (lo que Meta espera), el throughput, cuánto tarda la
+# cola en vaciarse y compara los gastos registrados con los esperados: uno por conversación.
+# Lo usa `manage.py probar_carga_webhook`. Con SQLite los hilos se bloquean entre sí: para
+# números representativos usar la misma base de datos que producción (PostgreSQL).
+
+
+# Los payloads de la prueba llevan entry[0].id = "carga" (no se confunden con tráfico real)
+_DE_LA_PRUEBA = Q(payload__entry__0__id='carga')
+
+
+def _payload(telefono, wamid, mensaje):
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{
+            "id": "carga",
+            "changes": [{
+                "field": "messages",
+                "value": {
+                    "messaging_product": "whatsapp",
+                    "metadata": {"display_phone_number": "56900000000", "phone_number_id": "carga"},
+                    "contacts": [{"profile": {"name": "Carga"}, "wa_id": telefono}],
+                    "messages": [{"from": telefono, "id": wamid, "timestamp": str(int(time.time())), **mensaje}],
+                },
+            }],
+        }],
+    }
+
+
+def _texto(cuerpo):
+    return {"type": "text", "text": {"body": cuerpo}}
+
+
+def _respuesta(tipo, id_opcion):
+    # button_reply (botones del menú) o list_reply (listas de categorías)
+    return {"type": "interactive", "interactive": {"type": tipo, tipo: {"id": id_opcion, "title": id_opcion}}}
+
+
+def guion_conversaciones(telefono, flujos, hijas, azar):
+    """Payloads de `flujos` registros de gasto completos de un teléfono, en orden."""
+    payloads = []
+    for flujo in range(flujos):
+        hija = azar.choice(hijas)
+        pasos = [
+            _texto("hola"),
+            _respuesta("button_reply", "BTN_NUEVO_GASTO"),
+            _texto(str(azar.randrange(500, 60000, 10))),
+            _respuesta("list_reply", f"padre_{hija.categoria_padre_id}"),
+            _respuesta("list_reply", f"cat_{hija.pk}"),
+        ]
+        for paso, mensaje in enumerate(pasos):
+            payloads.append(_payload(telefono, f"wamid.carga.{telefono}.{flujo}.{paso}", mensaje))
+    return payloads
+
+
+class ReproductorWebhook:
+    """
+    Envía los guiones: un hilo por conversación activa (hasta `hilos`); los mensajes de un
+    mismo teléfono salen en orden y separados por `pausa` segundos (lo que tarda la persona
+    en leer y tocar la opción). Con `tasa_reenvios` algunos mensajes se mandan dos veces,
+    como hace Meta cuando no recibe el ACK a tiempo.
+    """
+
+    def __init__(self, hilos=16, pausa=0.0, tasa_reenvios=0.0, url=None, semilla=None):
+        self.hilos = hilos
+        self.pausa = pausa
+        self.tasa_reenvios = tasa_reenvios
+        self.url = url
+        self._azar = random.Random(semilla)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.latencias = []
+        self.errores = 0
+        self.reenvios = 0
+
+    def _enviar(self, payload):
+        inicio = time.perf_counter()
+        try:
+            if self.url:
+                if not hasattr(self._local, 'sesion'):
+                    self._local.sesion = requests.Session()
+                estado = self._local.sesion.post(self.url, json=payload, timeout=30).status_code
+            else:
+                if not hasattr(self._local, 'cliente'):
+                    self._local.cliente = Client()
+                estado = self._local.cliente.post(
+                    reverse('webhook_whatsapp'), payload, content_type='application/json'
+                ).status_code
+        except requests.RequestException:
+            estado = None
+        ms = (time.perf_counter() - inicio) * 1000
+
+        with self._lock:
+            if estado == 200:
+                self.latencias.append(ms)
+            else:
+                self.errores += 1
+
+    def _conversacion(self, payloads):
+        try:
+            for payload in payloads:
+                self._enviar(payload)
+                with self._lock:
+                    reenviar = self._azar.random() < self.tasa_reenvios
+                    self.reenvios += reenviar
+                if reenviar:
+                    self._enviar(payload)
+                if self.pausa:
+                    time.sleep(self.pausa)
+        finally:
+            close_old_connections()
+
+    def ejecutar(self, guiones):
+        with ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='carga') as hilos:
+            list(hilos.map(self._conversacion, guiones))
+
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return round(ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))], 2)
+
+
+def probar_carga(usuarios, flujos=3, hilos=16, pausa=0.0, tasa_reenvios=0.0, url=None,
+                 latencia_graph=None, tasa_errores_graph=0.0, concurrencia_worker=4, worker=True,
+                 espera_maxima=120, semilla=None, limpiar=True):
+    """
+    Corre la prueba con los teléfonos de `usuarios` (UsuarioCustom con numero_telefono).
+    Retorna el reporte como dict.
+    """
+    azar = random.Random(semilla)
+    hijas = list(Categoria.objects.filter(usuario=None).exclude(categoria_padre=None))
+    telefonos = {u.pk: u.numero_telefono.lstrip('+') for u in usuarios}
+    guiones = [guion_conversaciones(telefono, flujos, hijas, azar) for telefono in telefonos.values()]
+    inicio = timezone.now()
+
+    servidor = ServidorGraphSimulado(latencia=latencia_graph, tasa_errores=tasa_errores_graph, semilla=semilla)
+    cola = WorkerColaWhatsApp(
+        concurrencia=concurrencia_worker, backoff=0.5, intervalo=0.05,
+        cliente=ClienteGraph(api_url=servidor.url, token='simulado'),
+        # Solo los mensajes de la prueba: en una BD compartida los de usuarios reales siguen
+        # esperando a su worker (y sus respuestas no terminan en el simulador)
+        filtro=_DE_LA_PRUEBA,
+    )
+    reproductor = ReproductorWebhook(hilos=hilos, pausa=pausa, tasa_reenvios=tasa_reenvios, url=url, semilla=semilla)
+
+    with servidor, override_settings(
+        ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], # Host del Client de Django
+        WHATSAPP_PROCESAR_EN_LINEA=False, # El ACK no debe esperar a la Graph API
+    ):
+        hilo_cola = threading.Thread(target=cola.ejecutar, name='carga-cola', daemon=True)
+        if worker:
+            hilo_cola.start()
+
+        t0 = time.perf_counter()
+        reproductor.ejecutar(guiones)
+        duracion_envio = time.perf_counter() - t0
+
+        # Esperamos a que la cola quede vacía (o se acabe el tiempo)
+        pendientes = WhatsAppLog.objects.filter(
+            _DE_LA_PRUEBA, fecha_creacion__gte=inicio, procesado=False, intentos__lt=cola.max_intentos
+        )
+        limite = time.perf_counter() + espera_maxima
+        while pendientes.exists() and time.perf_counter() < limite and (hilo_cola.is_alive() or not worker):
+            time.sleep(0.2)
+        duracion_total = time.perf_counter() - t0
+        sin_procesar = pendientes.count()
+
+        if worker:
+            cola.detener()
+            hilo_cola.join()
+
+    # Un gasto por conversación completa
+    creadas = dict(
+        Transaccion.objects.filter(usuario_id__in=telefonos, creado_en__gte=inicio, descripcion__startswith='WhatsApp Bot')
+        .values_list('usuario_id').annotate(n=Count('id')).order_by()
+    )
+    perdidas = sum(max(0, flujos - creadas.get(usuario_id, 0)) for usuario_id in telefonos)
+    duplicadas = sum(max(0, n - flujos) for n in creadas.values())
+
+    enviados = len(reproductor.latencias) + reproductor.errores
+    reporte = {
+        'fecha': timezone.now().isoformat(timespec='seconds'),
+        'modo': url or 'en_proceso',
+        'telefonos': len(telefonos),
+        'flujos_por_telefono': flujos,
+        'mensajes_enviados': enviados,
+        'reenvios': reproductor.reenvios,
+        'ack': {
+            'ok': len(reproductor.latencias),
+            'errores': reproductor.errores,
+            'p50_ms': _percentil(reproductor.latencias, 50),
+            'p99_ms': _percentil(reproductor.latencias, 99),
+            'media_ms': round(statistics.fmean(reproductor.latencias), 2) if reproductor.latencias else None,
+            'mensajes_por_segundo': round(enviados / duracion_envio, 1) if duracion_envio else None,
+        },
+        'cola': {
+            **cola.estadisticas,
+            'sin_procesar': sin_procesar,
+            'segundos_hasta_vaciar': round(duracion_total, 2),
+            'mensajes_por_segundo': round(enviados / duracion_total, 1) if duracion_total else None,
+        },
+        'graph_api': {
+            'intentos': servidor.intentos,
+            'errores_inyectados': servidor.errores_inyectados,
+            'mensajes_recibidos': len(servidor.recibidos),
+        },
+        'transacciones': {
+            'esperadas': flujos * len(telefonos),
+            'creadas': sum(creadas.values()),
+            'perdidas': perdidas,
+            'duplicadas': duplicadas,
+        },
+    }
+
+    if limpiar:
+        # Uno a uno (por las señales): el libro de presupuestos y el resumen diario quedan como antes
+        for t in Transaccion.objects.filter(usuario_id__in=telefonos, creado_en__gte=inicio, descripcion__startswith='WhatsApp Bot'):
+            t.delete()
+        WhatsAppLog.objects.filter(_DE_LA_PRUEBA, fecha_creacion__gte=inicio).delete()
+        WhatsAppSession.objects.filter(usuario_id__in=telefonos).update(estado='INICIO', datos_temporales={})
+
+    return reporte
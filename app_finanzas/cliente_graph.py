@@ -0,0 +1,132 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+from presuApp.metricas import GRAPH_API_SEGUNDOS
+
+# --- CLIENTE HTTP PARA LA GRAPH API DE WHATSAPP ---
+# Una sola requests.Session por proceso: reutiliza las conexiones keep-alive (sin un
+# handshake TLS por mensaje), con timeouts de conexión/lectura y reintentos acotados
+# con jitter ante 429/5xx. La URL sale de settings, así se puede apuntar a un servidor
+# local de pruebas (ver simulador_graph.py).
+
+logger = logging.getLogger(__name__)
+
+_compartido = None
+_lock = threading.Lock()
+
+
+class ClienteGraph:
+    ESTADOS_REINTENTABLES = (429, 500, 502, 503, 504)
+
+    def __init__(self, api_url=None, token=None, timeout=None, reintentos=None, tamano_pool=None):
+        self.api_url = api_url or settings.WHATSAPP_API_URL
+        self.timeout = timeout or (settings.WHATSAPP_TIMEOUT_CONEXION, settings.WHATSAPP_TIMEOUT_LECTURA)
+
+        if reintentos is None:
+            reintentos = settings.WHATSAPP_REINTENTOS
+        self.tamano_pool = tamano_pool = tamano_pool or settings.WHATSAPP_TAMANO_POOL
+        self._ejecutor = None
+
+        reintento = Retry(
+            total=reintentos,
+            connect=reintentos,
+            read=0, # Si Meta ya recibió el mensaje y se cortó la respuesta, no lo mandamos de nuevo
+            status=reintentos,
+            status_forcelist=self.ESTADOS_REINTENTABLES,
+            allowed_methods=frozenset(['POST']),
+            backoff_factor=0.5, # 0.5s, 1s, 2s...
+            backoff_jitter=0.25,
+            backoff_max=5,
+            respect_retry_after_header=True,
+            raise_on_status=False, # Al agotar reintentos retornamos la última respuesta
+        )
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=tamano_pool, max_retries=reintento)
+
+        self.sesion = requests.Session()
+        self.sesion.mount('https://', adaptador)
+        self.sesion.mount('http://', adaptador)
+        self.sesion.headers.update({
+            "Authorization": f"Bearer {token if token is not None else settings.WHATSAPP_TOKEN}",
+            "Content-Type": "application/json"
+        })
+
+    @classmethod
+    def compartido(cls):
+        """Cliente único del proceso (lo comparten los hilos de gunicorn y del worker)."""
+        global _compartido
+        if _compartido is None:
+            with _lock:
+                if _compartido is None:
+                    _compartido = cls()
+        return _compartido
+
+    def enviar(self, data):
+        """Envía un mensaje. Nunca lanza excepción: un fallo de envío no debe romper el flujo."""
+        with GRAPH_API_SEGUNDOS.medir(resultado='error_red') as etiquetas:
+            try:
+                respuesta = self.sesion.post(self.api_url, json=data, timeout=self.timeout)
+            except requests.RequestException as e:
+                logger.warning("graph_api_error_red", extra={'error': str(e)})
+                return None
+            etiquetas['resultado'] = 'ok' if respuesta.status_code < 400 else f'http_{respuesta.status_code}'
+
+        if respuesta.status_code >= 400:
+            logger.warning("graph_api_error", extra={'estado': respuesta.status_code, 'respuesta': respuesta.text[:200]})
+        return respuesta
+
+    def enviar_lote(self, mensajes):
+        """
+        Envía un lote de mensajes y retorna las respuestas en el mismo orden.
+        WhatsApp los muestra en el orden en que llegan a Meta, así que los de un mismo
+        destinatario ("to") salen uno tras otro; los de destinatarios distintos van en
+        paralelo por el pool de conexiones.
+        """
+        por_destinatario = {}
+        for i, data in enumerate(mensajes):
+            por_destinatario.setdefault(data.get('to'), []).append(i)
+
+        if len(por_destinatario) <= 1:
+            # Lo normal: un turno le responde a una sola persona
+            return [self.enviar(data) for data in mensajes]
+
+        respuestas = [None] * len(mensajes)
+
+        def enviar_en_orden(indices):
+            for i in indices:
+                respuestas[i] = self.enviar(mensajes[i])
+
+        for futuro in [self._hilos().submit(enviar_en_orden, indices) for indices in por_destinatario.values()]:
+            futuro.result()
+        return respuestas
+
+    def _hilos(self):
+        # Uno por conexión del pool: más hilos solo esperarían una conexión libre
+        if self._ejecutor is None:
+            with _lock:
+                if self._ejecutor is None:
+                    self._ejecutor = ThreadPoolExecutor(max_workers=self.tamano_pool, thread_name_prefix='graph')
+        return self._ejecutor
+
+
+class BufferSalida:
+    """
+    Acumula los mensajes salientes de un turno y los envía juntos al final, cuando la
+    transacción del turno se confirma (ver WhatsAppService.procesar_log). Si el
+    procesamiento falla a mitad de camino no se envía nada, así el reintento de la cola
+    no le repite al usuario los mensajes que ya había recibido.
+    """
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+        self.mensajes = []
+
+    def agregar(self, data):
+        self.mensajes.append(data)
+
+    def enviar(self):
+        mensajes, self.mensajes = self.mensajes, []
+        return self.cliente.enviar_lote(mensajes)
@@ -0,0 +1,154 @@
+import logging
+import random
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+from django.db import DatabaseError, transaction, close_old_connections
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+from presuApp.metricas import WHATSAPP_PROCESADOS
+from .models import WhatsAppLog
+from .services import WhatsAppService, extraer_mensaje
+
+logger = logging.getLogger(__name__)
+
+# --- COLA DE TRABAJO PARA EL WEBHOOK DE WHATSAPP ---
+# El webhook solo guarda el WhatsAppLog y responde 200 a Meta. La tabla de logs funciona
+# como cola durable: un worker (`manage.py procesar_cola_whatsapp`) reclama los pendientes
+# con SELECT ... FOR UPDATE SKIP LOCKED, así varios workers nunca toman el mismo log.
+#
+# Al reclamar un log se corre `disponible_en` hacia el futuro (tiempo de visibilidad):
+# si el worker muere a mitad de camino, el log vuelve a estar disponible solo.
+#
+# Orden por conversación: un log no se reclama mientras exista uno ANTERIOR del mismo
+# teléfono sin terminar (en curso, esperando su reintento o aún sin tomar). Así, si el
+# "monto" falla y queda para más tarde, el "padre" / "hija" que llegaron después esperan
+# en vez de correr contra el estado equivocado. Los descartados (sin más intentos) ya no
+# bloquean, pero recién cuando vence su visibilidad: en su último intento un worker todavía
+# lo puede tener en curso. Consecuencia: cada lote trae a lo más un mensaje por teléfono.
+
+
+def reclamar_lote(tamano, visibilidad, max_intentos, filtro=None):
+    """
+    Reclama hasta `tamano` logs pendientes. Retorna [(id, payload, intento), ...]
+    donde `intento` es el número de este intento (1 = primera vez).
+    `filtro` (Q) acota qué logs se pueden reclamar (ej: solo los de la prueba de carga).
+    """
+    ahora = timezone.now()
+    anterior_sin_terminar = WhatsAppLog.objects.filter(
+        Q(intentos__lt=max_intentos) | Q(disponible_en__gt=ahora), # Con intentos o reclamado ahora
+        procesado=False, telefono=OuterRef('telefono'), id__lt=OuterRef('id')
+    )
+    with transaction.atomic():
+        pendientes = list(
+            WhatsAppLog.objects.select_for_update(skip_locked=True)
+            .filter(procesado=False, disponible_en__lte=ahora, intentos__lt=max_intentos)
+            .filter(Q(telefono='') | ~Exists(anterior_sin_terminar))
+            .filter(filtro or Q())
+            .order_by('id')
+            .values_list('id', 'payload', 'intentos')[:tamano]
+        )
+        if pendientes:
+            WhatsAppLog.objects.filter(id__in=[p[0] for p in pendientes]).update(
+                disponible_en=ahora + timedelta(seconds=visibilidad),
+                intentos=F('intentos') + 1
+            )
+    return [(log_id, payload, intentos + 1) for log_id, payload, intentos in pendientes]
+
+
+def programar_reintento(log_id, intento, backoff):
+    """Backoff exponencial con jitter: backoff, 2*backoff, 4*backoff... (+ hasta 50% al azar)."""
+    espera = backoff * (2 ** (intento - 1))
+    espera += random.uniform(0, espera / 2)
+    WhatsAppLog.objects.filter(id=log_id).update(
+        disponible_en=timezone.now() + timedelta(seconds=espera)
+    )
+
+
+class WorkerColaWhatsApp:
+    """
+    Vacía la cola con `concurrencia` carriles (hilos). El orden de cada conversación
+    (menú -> monto -> padre -> hija) lo garantiza reclamar_lote: nunca entrega el mensaje
+    siguiente de un teléfono mientras el anterior no haya terminado.
+    """
+
+    def __init__(self, concurrencia=4, max_intentos=5, backoff=2.0, visibilidad=60, lote=None, intervalo=1.0,
+                 cliente=None, filtro=None):
+        self.concurrencia = max(1, concurrencia)
+        self.max_intentos = max_intentos
+        self.backoff = backoff
+        self.visibilidad = visibilidad
+        self.lote = lote or self.concurrencia * 4
+        self.intervalo = intervalo
+        self.cliente = cliente # ClienteGraph a usar; por defecto el compartido del proceso
+        self.filtro = filtro   # Q: solo estos logs (ver reclamar_lote)
+
+        self.estadisticas = {'procesados': 0, 'reintentos': 0, 'descartados': 0}
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+
+    def ejecutar(self, una_vez=False):
+        """Procesa hasta que se llame a detener(). Con una_vez=True termina cuando la cola queda vacía."""
+        carriles = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'whatsapp-{i}')
+            for i in range(self.concurrencia)
+        ]
+        try:
+            while not self._detener.is_set():
+                try:
+                    pendientes = reclamar_lote(self.lote, self.visibilidad, self.max_intentos, self.filtro)
+                except DatabaseError as e:
+                    # Conexión caída, bloqueo, failover...: no botamos el worker, reintentamos en un rato
+                    logger.warning("error_reclamando_cola", extra={'error': str(e)})
+                    close_old_connections()
+                    self._detener.wait(self.intervalo)
+                    continue
+                if not pendientes:
+                    if una_vez:
+                        break
+                    self._detener.wait(self.intervalo)
+                    continue
+
+                futuros = [
+                    carriles[self._carril(payload)].submit(self._procesar, log_id, intento)
+                    for log_id, payload, intento in pendientes
+                ]
+                # Esperamos el lote completo antes de reclamar otro (el tiempo de visibilidad sigue corriendo)
+                wait(futuros)
+        finally:
+            for carril in carriles:
+                carril.shutdown(wait=True)
+            close_old_connections()
+
+        return self.estadisticas
+
+    def detener(self):
+        self._detener.set()
+
+    def _carril(self, payload):
+        mensaje = extraer_mensaje(payload) or {}
+        telefono = mensaje.get('from') or ''
+        return zlib.crc32(telefono.encode()) % self.concurrencia
+
+    def _procesar(self, log_id, intento):
+        try:
+            WhatsAppService(cliente=self.cliente).procesar_log(log_id)
+            self._contar('procesados')
+        except Exception:
+            if intento >= self.max_intentos:
+                # Queda con procesado=False y su error guardado, visible en el admin. Se
+                # libera de inmediato para que no siga bloqueando a los siguientes del teléfono
+                WhatsAppLog.objects.filter(id=log_id).update(disponible_en=timezone.now())
+                self._contar('descartados')
+            else:
+                programar_reintento(log_id, intento, self.backoff)
+                self._contar('reintentos')
+        finally:
+            # Cada hilo tiene su propia conexión: respetamos CONN_MAX_AGE igual que en un request
+            close_old_connections()
+
+    def _contar(self, clave):
+        WHATSAPP_PROCESADOS.inc(resultado=clave)
+        with self._lock:
+            self.estadisticas[clave] += 1
@@ -0,0 +1,201 @@
+import csv
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from .models import Presupuesto
+from .agregados import calcular_porcentaje
+
+# --- EXPORTACIÓN EN STREAMING (CSV / XLSX) ---
+# Las filas salen de values_list(...).iterator(chunk_size=...) y se escriben a medida que
+# se generan: la memoria no crece con el historial y el navegador empieza a recibir el
+# archivo de inmediato (el encabezado se envía antes de ejecutar la consulta).
+#
+# XLSX sin dependencias: un .xlsx es un ZIP con unos pocos XML. zipfile sabe escribir
+# en modo streaming (sin seek), así que la hoja se comprime y se envía fila a fila.
+
+TAMANO_LOTE = 2000
+
+FORMATOS = ('csv', 'xlsx')
+
+TIPOS_CONTENIDO = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+ENCABEZADO_TRANSACCIONES = ['Fecha', 'Tipo', 'Monto', 'Categoría', 'Subcategoría', 'Descripción']
+
+ENCABEZADO_REPORTE = ['Año', 'Mes', 'Presupuesto', 'Categorías', 'Límite', 'Gastado', 'Restante', '% Usado', 'Estado']
+
+
+# --- FILAS ---
+
+def filas_transacciones(transacciones):
+    """Filas para exportar un QuerySet de Transaccion (nombres de categoría por JOIN, sin N+1)."""
+    filas = transacciones.values_list(
+        'fecha', 'tipo', 'monto', 'categoria__nombre', 'categoria__categoria_padre__nombre', 'descripcion'
+    ).iterator(chunk_size=TAMANO_LOTE)
+
+    for fecha, tipo, monto, categoria, padre, descripcion in filas:
+        # Igual que en mis_gastos: si la categoría tiene padre, la principal es el padre
+        if padre:
+            principal, subcategoria = padre, categoria
+        else:
+            principal, subcategoria = categoria or 'Sin Categoría', ''
+        yield [fecha, tipo, monto, principal, subcategoria, descripcion]
+
+
+def filas_reporte_presupuestos(usuario, desde=None, hasta=None):
+    """
+    Reporte mensual presupuesto vs. real. `desde`/`hasta` son (anio, mes) opcionales.
+    Lo gastado sale del libro (Presupuesto.gastado): no hay agregaciones por fila.
+    """
+    presupuestos = Presupuesto.objects.filter(usuario=usuario)
+    if desde:
+        presupuestos = presupuestos.filter(Q(anio__gt=desde[0]) | Q(anio=desde[0], mes__gte=desde[1]))
+    if hasta:
+        presupuestos = presupuestos.filter(Q(anio__lt=hasta[0]) | Q(anio=hasta[0], mes__lte=hasta[1]))
+
+    presupuestos = presupuestos.prefetch_related('categorias').order_by('anio', 'mes', 'nombre', 'id')
+
+    # Con chunk_size, prefetch_related se resuelve por cada bloque
+    for p in presupuestos.iterator(chunk_size=500):
+        categorias = ', '.join(sorted(c.nombre for c in p.categorias.all())) or 'General (todo el mes)'
+        yield [
+            p.anio, p.mes, p.nombre, categorias,
+            p.monto_limite, p.gastado, p.monto_limite - p.gastado,
+            calcular_porcentaje(p.gastado, p.monto_limite),
+            'Excedido' if p.gastado > p.monto_limite else 'OK',
+        ]
+
+
+# --- ESCRITORES ---
+
+class _Eco:
+    """Objeto tipo archivo que retorna lo escrito (csv.writer -> generador)."""
+
+    def write(self, valor):
+        return valor
+
+
+# Excel interpreta como fórmula el texto que empieza con estos caracteres. Descripciones y
+# nombres de categoría vienen de cartolas importadas y del bot de WhatsApp: un "=HYPERLINK(...)"
+# no debe llegar vivo a la planilla de nadie
+_INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _celda_csv(valor):
+    # Solo el texto: los montos negativos son números y se dejan tal cual
+    if isinstance(valor, str) and valor.startswith(_INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+
+def generar_csv(encabezado, filas):
+    escritor = csv.writer(_Eco())
+    # BOM para que Excel abra bien las tildes
+    yield '\ufeff' + escritor.writerow(encabezado)
+    for fila in filas:
+        yield escritor.writerow([_celda_csv(valor) for valor in fila])
+
+
+class _Buffer:
+    """Destino no buscable para zipfile: acumula bytes que el generador va vaciando."""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self.partes)
+        self.partes = []
+        return datos
+
+
+_NO_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_XLSX_FIJOS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _celda(valor):
+    if isinstance(valor, (int, float, Decimal)) and not isinstance(valor, bool):
+        return f'<c><v>{valor}</v></c>'
+    # Texto (y fechas, en formato AAAA-MM-DD) como cadena en línea: no hace falta sharedStrings
+    texto = escape(_NO_XML.sub('', '' if valor is None else str(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _fila_xml(fila):
+    return ('<row>' + ''.join(_celda(v) for v in fila) + '</row>').encode()
+
+
+def generar_xlsx(encabezado, filas, hoja='Datos'):
+    salida = _Buffer()
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as libro:
+        for nombre, contenido in _XLSX_FIJOS.items():
+            libro.writestr(nombre, contenido)
+        libro.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(hoja[:31])}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+        ))
+        yield salida.vaciar()
+
+        with libro.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as hoja_xml:
+            hoja_xml.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            hoja_xml.write(_fila_xml(encabezado))
+            yield salida.vaciar()
+
+            for i, fila in enumerate(filas, start=1):
+                hoja_xml.write(_fila_xml(fila))
+                if i % TAMANO_LOTE == 0:
+                    yield salida.vaciar()
+            hoja_xml.write(b'</sheetData></worksheet>')
+
+    yield salida.vaciar()
+
+
+def respuesta_exportacion(encabezado, filas, formato, nombre_archivo, hoja='Datos'):
+    """StreamingHttpResponse con el archivo (`formato` ya validado contra FORMATOS)."""
+    if formato == 'xlsx':
+        contenido = generar_xlsx(encabezado, filas, hoja=hoja)
+    else:
+        contenido = generar_csv(encabezado, filas)
+
+    respuesta = StreamingHttpResponse(contenido, content_type=TIPOS_CONTENIDO[formato])
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre_archivo}.{formato}"'
+    return respuesta
@@ -2,22 +2,70 @@ from django import forms
 from django.db.models import Q
 from django.utils import timezone
 from .models import Transaccion, Categoria,Presupuesto
-
-class SubcategoriaChoiceField(forms.ModelChoiceField):
+from .cache_categorias import arbol_usuario
+
+class OpcionesCacheIterator(forms.models.ModelChoiceIterator):
+    # Recorre la lista ya cargada en vez de ejecutar el queryset
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for obj in self.field.opciones:
+            yield self.choice(obj)
+
+    def __len__(self):
+        return len(self.field.opciones) + (1 if self.field.empty_label is not None else 0)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.field.opciones)
+
+class CategoriaCacheChoiceField(forms.ModelChoiceField):
+    """
+    ModelChoiceField que toma sus opciones del árbol de categorías en caché
+    (cache_categorias) en vez de consultar la BD al renderizar y al validar.
+    """
+    iterator = OpcionesCacheIterator
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('queryset', Categoria.objects.none())
+        super().__init__(*args, **kwargs)
+        self._opciones = []
+
+    @property
+    def opciones(self):
+        return self._opciones
+
+    @opciones.setter
+    def opciones(self, lista):
+        self._opciones = list(lista)
+        self.widget.choices = self.choices
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, Categoria):
+            value = value.pk
+        for obj in self._opciones:
+            if str(obj.pk) == str(value):
+                return obj
+        raise forms.ValidationError(
+            self.error_messages['invalid_choice'],
+            code='invalid_choice',
+            params={'value': value},
+        )
+
+class SubcategoriaChoiceField(CategoriaCacheChoiceField):
     def label_from_instance(self, obj):
         return obj.nombre
 
 class TransaccionForm(forms.ModelForm):
     # Campo extra solo para la UI
-    categoria_padre = forms.ModelChoiceField(
-        queryset=Categoria.objects.none(),
+    categoria_padre = CategoriaCacheChoiceField(
         label="Categoría Principal",
         required=False,
         widget=forms.Select(attrs={'class': 'form-select'})
     )
 
     categoria = SubcategoriaChoiceField(
-        queryset=Categoria.objects.none(),
         label="Subcategoría",
         required=True, # La subcategoría es obligatoria para guardar
         widget=forms.Select(attrs={'class': 'form-select'})
@@ -41,19 +89,16 @@ class TransaccionForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         
         # --- LOGICA DE CATEGORÍA PADRE Y FILTROS ---
+        # Las opciones salen del árbol en caché (globales + del usuario), sin consultas
+        arbol = arbol_usuario(user)
         
         # 1. Cargar opciones del Padre
-        self.fields['categoria_padre'].queryset = Categoria.objects.filter(
-            Q(usuario=None) | Q(usuario=user),
-            categoria_padre=None 
-        ).order_by('nombre')
         self.fields['categoria_padre'].empty_label = "Selecciona un grupo..."
+        self.fields['categoria_padre'].opciones = arbol.padres
 
         # 2. Cargar opciones del Hijo
-        self.fields['categoria'].queryset = Categoria.objects.filter(
-            Q(usuario=None) | Q(usuario=user)
-        ).exclude(categoria_padre=None).order_by('nombre')
         self.fields['categoria'].empty_label = "Selecciona una opción..."
+        self.fields['categoria'].opciones = arbol.subcategorias
 
         # --- VALORES POR DEFECTO (CREAR NUEVO) ---
         if not self.instance.pk:
@@ -67,16 +112,14 @@ class TransaccionForm(forms.ModelForm):
                 self.fields['fecha'].initial = self.instance.fecha
 
             # Pre-llenar categorías
-            if self.instance.categoria:
-                padre_actual = self.instance.categoria.categoria_padre
+            categoria_actual = arbol.obtener(self.instance.categoria_id)
+            if categoria_actual:
+                padre_actual = categoria_actual.categoria_padre if categoria_actual.categoria_padre_id else None
                 if padre_actual:
                     self.fields['categoria_padre'].initial = padre_actual
                 
                 # Filtramos la lista de hijos para mostrar solo los hermanos
-                self.fields['categoria'].queryset = Categoria.objects.filter(
-                    Q(usuario=None) | Q(usuario=user),
-                    categoria_padre=padre_actual
-                ).order_by('nombre')
+                self.fields['categoria'].opciones = arbol.hijas(padre_actual.pk if padre_actual else None)
 
     def clean_monto(self):
         monto = self.cleaned_data.get('monto')
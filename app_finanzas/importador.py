@@ -0,0 +1,364 @@
+import csv
+import datetime
+import hashlib
+import io
+import os
+import re
+import unicodedata
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.db.models import Max, Q
+from .models import Transaccion, ReglaCategoria
+from .cache_categorias import arbol_usuario
+from .agregados import recalcular_presupuestos_usuario, reconstruir_resumen
+from . import versiones
+
+# --- IMPORTACIÓN MASIVA DE CARTOLAS (CSV / OFX) ---
+# El archivo se lee fila a fila (nunca entero en memoria) y se guarda en lotes con
+# bulk_create. bulk_create no dispara señales, así que el libro de presupuestos, el
+# resumen diario y las alertas se recalculan UNA vez al final para el usuario.
+#
+# Duplicados: una fila se salta si ya existía (antes de empezar esta importación) una
+# transacción del usuario con la misma (fecha, monto, tipo, huella de la descripción). Se
+# cuentan como multiconjunto: dos cafés iguales el mismo día se importan los dos, pero
+# reimportar la cartola no crea nada nuevo. Por eso si una importación se corta a mitad, se
+# puede volver a correr sin miedo. Lo que crea la propia importación nunca cuenta como
+# existente, así que el archivo no necesita venir ordenado por fecha.
+
+TAMANO_LOTE = 1000
+MAX_ERRORES = 100 # Errores que se detallan en el resultado (el total se cuenta igual)
+
+FORMATOS = ('csv', 'ofx')
+
+FORMATOS_FECHA = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d', '%d/%m/%y', '%Y%m%d')
+
+# Nombres de columna aceptados en el CSV (sin tildes ni mayúsculas)
+COLUMNAS = {
+    'fecha': ('fecha', 'date', 'fecha operacion', 'fecha_operacion'),
+    'monto': ('monto', 'amount', 'importe', 'valor'),
+    'cargo': ('cargo', 'cargos', 'debito', 'debit'),
+    'abono': ('abono', 'abonos', 'credito', 'credit'),
+    'descripcion': ('descripcion', 'detalle', 'glosa', 'description', 'concepto'),
+    'tipo': ('tipo', 'type'),
+    'categoria': ('categoria', 'category'),
+}
+
+TIPOS = {
+    'gasto': 'GASTO', 'cargo': 'GASTO', 'debito': 'GASTO', 'egreso': 'GASTO', 'debit': 'GASTO',
+    'ingreso': 'INGRESO', 'abono': 'INGRESO', 'credito': 'INGRESO', 'credit': 'INGRESO',
+}
+
+
+class ErrorImportacion(ValueError):
+    """El archivo completo no se puede importar (formato desconocido, sin columnas...)."""
+
+
+def normalizar_texto(texto):
+    # "Café  LIDER" -> "cafe lider"
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.casefold().split())
+
+
+def huella(descripcion):
+    return hashlib.sha1(normalizar_texto(descripcion).encode()).hexdigest()
+
+
+# --- LECTORES (generadores de (linea, {campo: texto})) ---
+
+def leer_csv(archivo, encoding='utf-8-sig'):
+    texto = io.TextIOWrapper(archivo, encoding=encoding, errors='replace', newline='')
+    encabezado = texto.readline()
+    if not encabezado.strip():
+        raise ErrorImportacion('El archivo está vacío.')
+
+    # El separador más frecuente del encabezado (los bancos chilenos suelen usar ";")
+    delimitador = max(',;\t|', key=encabezado.count)
+    columnas = [normalizar_texto(c) for c in next(csv.reader([encabezado], delimiter=delimitador))]
+
+    indices = {}
+    for campo, alias in COLUMNAS.items():
+        for i, columna in enumerate(columnas):
+            if columna in alias:
+                indices[campo] = i
+                break
+
+    if 'fecha' not in indices or not indices.keys() & {'monto', 'cargo', 'abono'}:
+        raise ErrorImportacion('El CSV debe tener una columna "fecha" y una de "monto" o "cargo"/"abono".')
+
+    lector = csv.reader(texto, delimiter=delimitador)
+    for fila in lector:
+        if not any(celda.strip() for celda in fila):
+            continue
+        yield lector.line_num + 1, {campo: fila[i] if i < len(fila) else '' for campo, i in indices.items()}
+
+
+_ETIQUETA_OFX = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+def leer_ofx(archivo, encoding=None):
+    # OFX 1.x (SGML, etiquetas sin cerrar) y 2.x (XML). Leemos línea a línea en binario
+    # para respetar el CHARSET del encabezado (cp1252 en casi todos los bancos).
+    encoding = encoding or 'utf-8'
+    actual = None
+    inicio = 0
+    for numero, crudo in enumerate(archivo, start=1):
+        if actual is None and crudo.strip().upper().startswith(b'CHARSET:1252'):
+            encoding = 'cp1252'
+        linea = crudo.decode(encoding, errors='replace')
+
+        for cierre, etiqueta, valor in _ETIQUETA_OFX.findall(linea):
+            etiqueta = etiqueta.upper()
+            if etiqueta == 'STMTTRN':
+                if cierre and actual is not None:
+                    yield inicio, {
+                        'fecha': actual.get('DTPOSTED', '')[:8],
+                        'monto': actual.get('TRNAMT', ''),
+                        'descripcion': actual.get('NAME') or actual.get('MEMO', ''),
+                    }
+                actual = None if cierre else {}
+                inicio = numero
+            elif actual is not None and not cierre and valor.strip():
+                actual[etiqueta] = valor.strip()
+
+
+def detectar_formato(archivo, nombre=''):
+    extension = os.path.splitext(nombre or '')[1].lower()
+    if extension in ('.ofx', '.qfx'):
+        return 'ofx'
+    if extension in ('.csv', '.txt'):
+        return 'csv'
+
+    # Sin extensión conocida: miramos el comienzo y volvemos al inicio
+    inicio = archivo.read(512)
+    archivo.seek(0)
+    if b'OFXHEADER' in inicio or b'<OFX' in inicio.upper():
+        return 'ofx'
+    return 'csv'
+
+
+# --- NORMALIZACIÓN DE FILAS ---
+
+def parsear_fecha(valor):
+    valor = (valor or '').strip()
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.datetime.strptime(valor, formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f'Fecha inválida: "{valor}"')
+
+
+def parsear_monto(valor):
+    """'$ -12.500' -> Decimal('-12500.00'); '1.234,56' -> Decimal('1234.56')."""
+    texto = re.sub(r'[^\d,.\-()]', '', valor or '')
+    negativo = texto.startswith('-') or texto.endswith('-') or (texto.startswith('(') and texto.endswith(')'))
+    texto = texto.strip('-()')
+    if not texto:
+        raise ValueError(f'Monto inválido: "{valor}"')
+
+    if ',' in texto and '.' in texto:
+        # El separador que aparece último es el decimal
+        if texto.rfind(',') > texto.rfind('.'):
+            texto = texto.replace('.', '').replace(',', '.')
+        else:
+            texto = texto.replace(',', '')
+    elif ',' in texto:
+        enteros, _, decimales = texto.rpartition(',')
+        texto = f'{enteros.replace(",", "")}.{decimales}' if len(decimales) <= 2 else texto.replace(',', '')
+    elif texto.count('.') > 1 or ('.' in texto and len(texto.rpartition('.')[2]) == 3):
+        texto = texto.replace('.', '') # "12.500" en pesos son miles
+
+    try:
+        monto = Decimal(texto).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f'Monto inválido: "{valor}"')
+    return -monto if negativo else monto
+
+
+_CAMPO_MONTO = Transaccion._meta.get_field('monto')
+# Lo más grande que cabe en la columna; más que eso sería un DataError al guardar el lote
+MONTO_MAXIMO = Decimal(10) ** (_CAMPO_MONTO.max_digits - _CAMPO_MONTO.decimal_places)
+
+
+def normalizar_fila(datos):
+    """{campo: texto} -> {fecha, monto (positivo), tipo, descripcion, categoria}."""
+    fecha = parsear_fecha(datos.get('fecha'))
+
+    # Cartolas con columnas separadas de cargo/abono (la vacía o en 0 no cuenta)
+    cargo = abs(parsear_monto(datos['cargo'])) if datos.get('cargo', '').strip() else 0
+    abono = abs(parsear_monto(datos['abono'])) if datos.get('abono', '').strip() else 0
+
+    if cargo:
+        monto, tipo = cargo, 'GASTO'
+    elif abono:
+        monto, tipo = abono, 'INGRESO'
+    else:
+        monto = parsear_monto(datos.get('monto'))
+        tipo = 'GASTO' if monto < 0 else 'INGRESO'
+        monto = abs(monto)
+
+    if datos.get('tipo', '').strip():
+        tipo = TIPOS.get(normalizar_texto(datos['tipo']))
+        if not tipo:
+            raise ValueError(f'Tipo inválido: "{datos["tipo"]}"')
+
+    if not monto:
+        raise ValueError('Monto en cero')
+    if monto >= MONTO_MAXIMO:
+        raise ValueError(f'Monto fuera de rango: "{monto}"')
+
+    descripcion = ' '.join((datos.get('descripcion') or '').split())
+    return {
+        'fecha': fecha,
+        'monto': monto,
+        'tipo': tipo,
+        'descripcion': descripcion[:Transaccion._meta.get_field('descripcion').max_length],
+        'categoria': (datos.get('categoria') or '').strip(),
+    }
+
+
+# --- CATEGORIZACIÓN POR REGLAS ---
+
+class Categorizador:
+    """
+    Elige la categoría de cada fila:
+    1. La columna "categoria" del CSV, si coincide con una categoría visible ("Hija" o "Padre > Hija")
+    2. La primera ReglaCategoria cuyo patrón aparece en la descripción (las del usuario primero)
+    """
+
+    def __init__(self, usuario):
+        arbol = arbol_usuario(usuario)
+
+        self.por_nombre = {}
+        # Primero las subcategorías: ante nombres repetidos gana la más específica
+        for categoria in arbol.subcategorias + arbol.padres:
+            self.por_nombre.setdefault(normalizar_texto(categoria.nombre), categoria.pk)
+            self.por_nombre.setdefault(normalizar_texto(str(categoria)), categoria.pk)
+
+        reglas = ReglaCategoria.objects.filter(Q(usuario=usuario) | Q(usuario=None))
+        self.reglas = [
+            (normalizar_texto(r.patron), r.categoria_id)
+            for r in sorted(reglas, key=lambda r: (r.usuario_id is None, -r.prioridad, r.id))
+            if arbol.obtener(r.categoria_id) and r.patron.strip()
+        ]
+
+    def categoria_id(self, descripcion, nombre=''):
+        if nombre:
+            categoria_id = self.por_nombre.get(normalizar_texto(nombre))
+            if categoria_id:
+                return categoria_id
+
+        texto = normalizar_texto(descripcion)
+        for patron, categoria_id in self.reglas:
+            if patron in texto:
+                return categoria_id
+        return None
+
+
+# --- IMPORTACIÓN ---
+
+def importar_transacciones(usuario, archivo, formato=None, nombre='', encoding=None, tamano_lote=TAMANO_LOTE):
+    """
+    Importa un CSV u OFX (archivo binario abierto) a las transacciones del usuario.
+    Retorna {'leidas', 'importadas', 'duplicadas', 'categorizadas', 'con_error', 'errores': [...]}
+    """
+    formato = (formato or detectar_formato(archivo, nombre)).lower()
+    if formato not in FORMATOS:
+        raise ErrorImportacion(f'Formato no soportado: "{formato}". Usa CSV u OFX.')
+
+    if formato == 'csv':
+        filas = leer_csv(archivo, encoding=encoding or 'utf-8-sig')
+    else:
+        filas = leer_ofx(archivo, encoding=encoding)
+
+    resultado = {'leidas': 0, 'importadas': 0, 'duplicadas': 0, 'categorizadas': 0, 'con_error': 0, 'errores': []}
+    categorizador = Categorizador(usuario)
+    previas = _TransaccionesPrevias(usuario)
+
+    try:
+        lote = []
+        for linea, datos in filas:
+            resultado['leidas'] += 1
+            try:
+                fila = normalizar_fila(datos)
+            except ValueError as e:
+                resultado['con_error'] += 1
+                if len(resultado['errores']) < MAX_ERRORES:
+                    resultado['errores'].append({'linea': linea, 'error': str(e)})
+                continue
+
+            # Cortamos el lote en un cambio de fecha: en una cartola ordenada cada día se
+            # consulta en un solo lote (la deduplicación no depende de esto)
+            lleno = len(lote) >= tamano_lote and fila['fecha'] != lote[-1]['fecha']
+            if lleno or len(lote) >= tamano_lote * 10:
+                _guardar_lote(usuario, lote, categorizador, previas, resultado)
+                lote = []
+            lote.append(fila)
+
+        if lote:
+            _guardar_lote(usuario, lote, categorizador, previas, resultado)
+    finally:
+        # Aunque el archivo falle a mitad, lo ya guardado debe quedar reflejado
+        if resultado['importadas']:
+            with transaction.atomic():
+                recalcular_presupuestos_usuario(usuario.pk) # Encola las alertas de los meses que subieron
+                reconstruir_resumen(usuario.pk)
+                versiones.marcar(versiones.FINANZAS, usuario.pk) # bulk_create no dispara señales
+
+    return resultado
+
+
+class _TransaccionesPrevias:
+    """
+    Las transacciones que el usuario ya tenía al empezar la importación (id <= tope), como
+    multiconjunto de claves, descontando las que ya taparon una fila de un lote anterior.
+    """
+
+    def __init__(self, usuario):
+        self.usuario = usuario
+        self.tope = Transaccion.objects.filter(usuario=usuario).aggregate(tope=Max('pk'))['tope'] or 0
+        self.usadas = Counter()
+
+    def en_rango(self, desde, hasta):
+        existentes = Counter(
+            (fecha, monto, tipo, huella(descripcion))
+            for fecha, monto, tipo, descripcion in Transaccion.objects.filter(
+                usuario=self.usuario, pk__lte=self.tope, fecha__gte=desde, fecha__lte=hasta
+            ).values_list('fecha', 'monto', 'tipo', 'descripcion').iterator()
+        )
+        return existentes - self.usadas
+
+    def usar(self, clave):
+        self.usadas[clave] += 1
+
+
+def _guardar_lote(usuario, lote, categorizador, previas, resultado):
+    fechas = [fila['fecha'] for fila in lote]
+    existentes = previas.en_rango(min(fechas), max(fechas))
+
+    nuevas = []
+    for fila in lote:
+        clave = (fila['fecha'], fila['monto'], fila['tipo'], huella(fila['descripcion']))
+        if existentes[clave] > 0:
+            existentes[clave] -= 1
+            previas.usar(clave)
+            resultado['duplicadas'] += 1
+            continue
+
+        categoria_id = categorizador.categoria_id(fila['descripcion'], fila['categoria'])
+        if categoria_id:
+            resultado['categorizadas'] += 1
+        nuevas.append(Transaccion(
+            usuario=usuario,
+            tipo=fila['tipo'],
+            monto=fila['monto'],
+            fecha=fila['fecha'],
+            descripcion=fila['descripcion'],
+            categoria_id=categoria_id,
+        ))
+
+    with transaction.atomic():
+        Transaccion.objects.bulk_create(nuevas, batch_size=500)
+    resultado['importadas'] += len(nuevas)
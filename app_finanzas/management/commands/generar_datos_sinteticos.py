@@ -0,0 +1,154 @@
+import datetime
+import random
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from usuarios.models import UsuarioCustom
+from app_finanzas.models import Categoria, Presupuesto, Transaccion
+from app_finanzas.agregados import recalcular_presupuestos_usuario, reconstruir_resumen
+from app_finanzas import versiones
+
+# Monto típico de un gasto por categoría padre (CLP): (mínimo, máximo, peso en la mezcla)
+PERFILES = {
+    "Comida y bebida": (2000, 45000, 40),
+    "Compras": (5000, 80000, 12),
+    "Vivienda": (15000, 450000, 6),
+    "Transporte": (800, 12000, 20),
+    "Vehiculos": (3000, 60000, 6),
+    "Vida y entretenimiento": (3000, 50000, 10),
+    "PC, Comunicaciones": (5000, 35000, 3),
+    "Inversiones": (20000, 300000, 1),
+    "Otros": (1000, 30000, 2),
+}
+
+SUBCATEGORIAS_PROPIAS = ["Colaciones", "Cumpleaños", "Farmacia", "Panadería", "Peajes", "Veterinario", "Cursos"]
+
+TAMANO_LOTE = 5000
+
+
+class Command(BaseCommand):
+    help = 'Genera usuarios sintéticos con categorías, presupuestos y años de transacciones (para benchmarks)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=10, help='Cantidad de usuarios a crear')
+        parser.add_argument('--meses', type=int, default=24, help='Meses de historia hacia atrás (incluye el actual)')
+        parser.add_argument('--gastos-mes', type=int, default=60, help='Gastos promedio por usuario y mes')
+        parser.add_argument('--presupuestos-mes', type=int, default=5, help='Presupuestos por usuario y mes')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla del generador (mismos datos en cada corrida)')
+        parser.add_argument('--prefijo', default='sintetico', help='Prefijo del username/email de los usuarios generados')
+        parser.add_argument('--borrar', action='store_true', help='Eliminar antes los usuarios con el mismo prefijo')
+
+    def handle(self, *args, **options):
+        azar = random.Random(options['semilla'])
+        prefijo = options['prefijo']
+
+        if options['borrar']:
+            borrados, _ = UsuarioCustom.objects.filter(username__startswith=prefijo).delete()
+            self.stdout.write(f"Eliminados {borrados} registros de corridas anteriores.")
+
+        # Categorías globales (idempotente)
+        call_command('cargar_categorias', stdout=self.stdout)
+        padres = {c.nombre: c for c in Categoria.objects.filter(usuario=None, categoria_padre=None)}
+        hijas = {}
+        for c in Categoria.objects.filter(usuario=None).exclude(categoria_padre=None):
+            hijas.setdefault(c.categoria_padre_id, []).append(c)
+
+        # Se continúa la numeración si ya hay usuarios con el prefijo (sin choques de email/teléfono)
+        inicio = UsuarioCustom.objects.filter(username__startswith=prefijo).count()
+        clave = make_password('sintetico') # Un solo hash para todos: el hasher es lento a propósito
+        usuarios = UsuarioCustom.objects.bulk_create([
+            UsuarioCustom(
+                username=f"{prefijo}{i}@ejemplo.cl", email=f"{prefijo}{i}@ejemplo.cl", password=clave,
+                first_name=f"Usuario {i}", rol=UsuarioCustom.CLIENTE,
+                numero_telefono=f"+5699{i:07d}", telefono_e164=f"5699{i:07d}", # bulk_create no pasa por save()
+            )
+            for i in range(inicio, inicio + options['usuarios'])
+        ])
+
+        meses = self._meses(options['meses'])
+        total_transacciones = 0
+        for usuario in usuarios:
+            # Una transacción por usuario: las verificaciones de alertas corren una vez por mes al confirmar
+            with transaction.atomic():
+                total_transacciones += self._poblar_usuario(usuario, azar, meses, padres, hijas, options)
+            versiones.marcar(versiones.FINANZAS, usuario.pk)
+            versiones.marcar(versiones.CATEGORIAS, usuario.pk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"¡Listo! {len(usuarios)} usuarios ({prefijo}{inicio}@ejemplo.cl ...) con {total_transacciones} "
+            f"transacciones en {len(meses)} meses. Clave de todos: 'sintetico'."
+        ))
+
+    def _meses(self, cantidad):
+        hoy = timezone.now().date()
+        meses = []
+        for atras in range(cantidad):
+            anio, mes = divmod(hoy.year * 12 + hoy.month - 1 - atras, 12)
+            meses.append((anio, mes + 1))
+        return meses
+
+    def _poblar_usuario(self, usuario, azar, meses, padres, hijas, options):
+        hoy = timezone.now().date()
+
+        # 1. Árbol de categorías: las globales + algunas subcategorías propias
+        propias = Categoria.objects.bulk_create([
+            Categoria(nombre=nombre, usuario=usuario, categoria_padre=azar.choice(list(padres.values())))
+            for nombre in azar.sample(SUBCATEGORIAS_PROPIAS, azar.randint(1, 4))
+        ])
+        opciones = {nombre: hijas.get(padre.pk, []) + [c for c in propias if c.categoria_padre_id == padre.pk]
+                    for nombre, padre in padres.items()}
+        nombres = [n for n in PERFILES if n in padres]
+        pesos = [PERFILES[n][2] for n in nombres]
+
+        # 2. Transacciones: sueldo a fin de mes + gastos repartidos según PERFILES
+        sueldo = azar.randrange(700_000, 3_500_000, 10_000)
+        transacciones = []
+        for anio, mes in meses:
+            ultimo_dia = (datetime.date(anio + mes // 12, mes % 12 + 1, 1) - datetime.timedelta(days=1)).day
+            if anio == hoy.year and mes == hoy.month:
+                ultimo_dia = hoy.day # El mes en curso solo hasta hoy
+
+            fecha_sueldo = datetime.date(anio, mes, min(ultimo_dia, 28))
+            transacciones.append(Transaccion(
+                usuario=usuario, tipo='INGRESO', monto=Decimal(sueldo), fecha=fecha_sueldo,
+                descripcion="Sueldo", categoria=None,
+            ))
+            for _ in range(max(0, int(azar.gauss(options['gastos_mes'], options['gastos_mes'] / 5)))):
+                nombre = azar.choices(nombres, weights=pesos)[0]
+                minimo, maximo, _peso = PERFILES[nombre]
+                candidatas = opciones[nombre]
+                categoria = azar.choice(candidatas) if candidatas and azar.random() > 0.05 else None
+                transacciones.append(Transaccion(
+                    usuario=usuario, tipo='GASTO',
+                    # Muchos gastos chicos y pocos grandes
+                    monto=Decimal(int(minimo + (maximo - minimo) * azar.random() ** 3)),
+                    fecha=datetime.date(anio, mes, azar.randint(1, ultimo_dia)),
+                    categoria=categoria, descripcion=categoria.nombre if categoria else nombre,
+                ))
+        Transaccion.objects.bulk_create(transacciones, batch_size=TAMANO_LOTE)
+
+        # 3. Presupuestos de cada mes, uno por categoría padre elegida
+        presupuestos, categorias = [], []
+        for anio, mes in meses:
+            for nombre in azar.sample(nombres, min(options['presupuestos_mes'], len(nombres))):
+                minimo, maximo, peso = PERFILES[nombre]
+                # Gasto esperado del mes en esa categoría, +-30%: algunos presupuestos se pasan
+                esperado = options['gastos_mes'] * peso / sum(pesos) * (minimo + (maximo - minimo) / 4)
+                presupuestos.append(Presupuesto(
+                    usuario=usuario, anio=anio, mes=mes, nombre=nombre[:50],
+                    monto_limite=Decimal(max(1000, int(esperado * azar.uniform(0.7, 1.3)))),
+                ))
+                categorias.append(padres[nombre])
+        presupuestos = Presupuesto.objects.bulk_create(presupuestos, batch_size=TAMANO_LOTE)
+        Relacion = Presupuesto.categorias.through
+        Relacion.objects.bulk_create([
+            Relacion(presupuesto_id=p.pk, categoria_id=c.pk) for p, c in zip(presupuestos, categorias)
+        ], batch_size=TAMANO_LOTE)
+
+        # bulk_create no pasa por las señales: libro y resumen diario se calculan al final
+        reconstruir_resumen(usuario.pk)
+        recalcular_presupuestos_usuario(usuario.pk)
+        return len(transacciones)
@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from app_finanzas.importador import importar_transacciones, ErrorImportacion, FORMATOS, TAMANO_LOTE
+
+class Command(BaseCommand):
+    help = 'Importa transacciones desde una cartola CSV u OFX (se lee en streaming, apto para archivos grandes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo CSV u OFX')
+        parser.add_argument('--usuario', required=True, help='ID o email del dueño de las transacciones')
+        parser.add_argument('--formato', choices=FORMATOS, help='Por defecto se detecta por la extensión / contenido')
+        parser.add_argument('--encoding', help='Codificación del archivo (ej: latin-1). Por defecto UTF-8')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Filas guardadas por bulk_create')
+
+    def handle(self, *args, **options):
+        Usuario = get_user_model()
+        valor = options['usuario']
+        try:
+            usuario = Usuario.objects.get(pk=valor) if valor.isdigit() else Usuario.objects.get(email__iexact=valor)
+        except Usuario.DoesNotExist:
+            raise CommandError(f'No existe el usuario "{valor}".')
+
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resultado = importar_transacciones(
+                    usuario, archivo,
+                    formato=options['formato'],
+                    nombre=options['archivo'],
+                    encoding=options['encoding'],
+                    tamano_lote=options['lote'],
+                )
+        except (OSError, LookupError, ErrorImportacion) as e:
+            raise CommandError(str(e))
+
+        for error in resultado['errores']:
+            self.stderr.write(f"Línea {error['linea']}: {error['error']}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"¡Listo! Leídas: {resultado['leidas']}, importadas: {resultado['importadas']}, "
+            f"duplicadas: {resultado['duplicadas']}, categorizadas: {resultado['categorizadas']}, "
+            f"con error: {resultado['con_error']}."
+        ))
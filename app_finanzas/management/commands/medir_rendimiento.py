@@ -0,0 +1,60 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from usuarios.models import UsuarioCustom
+from app_finanzas.rendimiento import ejecutar_benchmark, comparar
+
+class Command(BaseCommand):
+    help = 'Mide latencia y consultas SQL de las vistas principales y guarda el resultado en JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', default='sintetico0@ejemplo.cl', help='Email del usuario cuyos datos se usan')
+        parser.add_argument('--repeticiones', type=int, default=20, help='Mediciones por caso (después de una vuelta de calentamiento)')
+        parser.add_argument('--frio', action='store_true', help='Vaciar la caché antes de cada medición')
+        parser.add_argument('--solo', nargs='+', help='Nombres de los casos a correr (por defecto: todos)')
+        parser.add_argument('--salida', help='Archivo JSON donde guardar el resultado')
+        parser.add_argument('--comparar', help='JSON de una corrida anterior: falla si hay regresiones')
+        parser.add_argument('--tolerancia', type=float, default=0.2, help='Alza del p50 tolerada al comparar (0.2 = 20%%)')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = UsuarioCustom.objects.get(email=options['usuario'])
+        except UsuarioCustom.DoesNotExist:
+            raise CommandError(f"No existe el usuario {options['usuario']} (ver manage.py generar_datos_sinteticos).")
+
+        resultado = ejecutar_benchmark(usuario, options['repeticiones'], frio=options['frio'], solo=options['solo'])
+
+        self.stdout.write(f"{'caso':<22}{'estado':>7}{'consultas':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        fallidos = []
+        for nombre, datos in resultado['casos'].items():
+            if 'error' in datos:
+                fallidos.append(nombre)
+                self.stdout.write(self.style.ERROR(f"{nombre:<22}{datos['error']}"))
+                continue
+            self.stdout.write(
+                f"{nombre:<22}{datos['estado']:>7}{datos['consultas']:>10.1f}{datos['ms']['p50']:>10.1f}{datos['ms']['p95']:>10.1f}"
+            )
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resultado guardado en {options['salida']}")
+
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as archivo:
+                anterior = json.load(archivo)
+            distintos = [k for k in ('base_datos', 'cache', 'frio') if anterior.get(k) != resultado[k]]
+            if distintos:
+                self.stdout.write(self.style.WARNING(f"Ojo: las corridas difieren en {', '.join(distintos)}."))
+            regresiones = 0
+            self.stdout.write(f"\nComparación con {anterior.get('commit') or options['comparar']}:")
+            for nombre, metrica, antes, ahora, regresion in comparar(anterior, resultado, options['tolerancia']):
+                marca = '  <-- REGRESIÓN' if regresion else ''
+                self.stdout.write(f"{nombre:<22}{metrica:<10}{antes:>10}{ahora:>10}{marca}")
+                regresiones += regresion
+            if regresiones:
+                raise CommandError(f"{regresiones} regresiones respecto de {options['comparar']}.")
+
+        if fallidos:
+            raise CommandError(f"Casos que no respondieron 200: {', '.join(fallidos)}.")
+
+        self.stdout.write(self.style.SUCCESS("¡Listo!"))
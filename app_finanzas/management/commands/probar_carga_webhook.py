@@ -0,0 +1,72 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from usuarios.models import UsuarioCustom
+from app_finanzas.carga_webhook import probar_carga
+
+class Command(BaseCommand):
+    help = 'Prueba de carga del webhook de WhatsApp con conversaciones simuladas y una Graph API local'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--telefonos', type=int, default=20, help='Conversaciones simultáneas (usuarios con teléfono)')
+        parser.add_argument('--prefijo', default='sintetico', help='Usuarios a usar (ver manage.py generar_datos_sinteticos)')
+        parser.add_argument('--flujos', type=int, default=3, help='Gastos registrados por teléfono (5 mensajes cada uno)')
+        parser.add_argument('--hilos', type=int, default=16, help='Requests concurrentes al webhook')
+        parser.add_argument('--pausa', type=float, default=0.0, help='Segundos entre mensajes de un mismo teléfono')
+        parser.add_argument('--reenvios', type=float, default=0.0, help='Proporción de mensajes que se entregan dos veces (como Meta)')
+        parser.add_argument('--url', help='URL de un webhook ya levantado (por defecto: en este proceso)')
+        parser.add_argument('--latencia-graph', type=float, nargs=2, metavar=('MIN', 'MAX'), help='Segundos de demora de la Graph API simulada')
+        parser.add_argument('--errores-graph', type=float, default=0.0, help='Proporción de respuestas 429/5xx de la Graph API simulada')
+        parser.add_argument('--concurrencia-worker', type=int, default=4, help='Carriles del worker de la cola')
+        parser.add_argument('--sin-worker', action='store_true', help='No procesar la cola aquí (otro worker ya la está vaciando)')
+        parser.add_argument('--espera', type=float, default=120, help='Segundos máximos para que la cola se vacíe')
+        parser.add_argument('--semilla', type=int, default=None, help='Semilla para repetir la misma prueba')
+        parser.add_argument('--conservar', action='store_true', help='No borrar los gastos y logs generados')
+        parser.add_argument('--salida', help='Archivo JSON donde guardar el reporte')
+
+    def handle(self, *args, **options):
+        usuarios = list(
+            UsuarioCustom.objects.filter(username__startswith=options['prefijo'])
+            .exclude(numero_telefono=None).exclude(numero_telefono='').order_by('pk')[:options['telefonos']]
+        )
+        if len(usuarios) < options['telefonos']:
+            raise CommandError(
+                f"Solo hay {len(usuarios)} usuarios '{options['prefijo']}' con teléfono "
+                f"(crear más con manage.py generar_datos_sinteticos --usuarios N)."
+            )
+
+        self.stdout.write(
+            f"{len(usuarios)} teléfonos x {options['flujos']} gastos ({len(usuarios) * options['flujos'] * 5} mensajes)..."
+        )
+        reporte = probar_carga(
+            usuarios,
+            flujos=options['flujos'],
+            hilos=options['hilos'],
+            pausa=options['pausa'],
+            tasa_reenvios=options['reenvios'],
+            url=options['url'],
+            latencia_graph=options['latencia_graph'],
+            tasa_errores_graph=options['errores_graph'],
+            concurrencia_worker=options['concurrencia_worker'],
+            worker=not options['sin_worker'],
+            espera_maxima=options['espera'],
+            semilla=options['semilla'],
+            limpiar=not options['conservar'],
+        )
+
+        ack, cola, tx = reporte['ack'], reporte['cola'], reporte['transacciones']
+        self.stdout.write(f"ACK webhook: p50 {ack['p50_ms']} ms, p99 {ack['p99_ms']} ms, "
+                          f"{ack['mensajes_por_segundo']} msg/s, {ack['errores']} errores")
+        self.stdout.write(f"Cola: vacía en {cola['segundos_hasta_vaciar']} s ({cola['mensajes_por_segundo']} msg/s), "
+                          f"{cola['reintentos']} reintentos, {cola['descartados']} descartados, {cola['sin_procesar']} sin procesar")
+        self.stdout.write(f"Graph API: {reporte['graph_api']['intentos']} envíos, "
+                          f"{reporte['graph_api']['errores_inyectados']} errores inyectados")
+        self.stdout.write(f"Gastos: {tx['creadas']} de {tx['esperadas']} "
+                          f"({tx['perdidas']} perdidos, {tx['duplicadas']} duplicados)")
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump(reporte, archivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Reporte guardado en {options['salida']}")
+
+        estilo = self.style.SUCCESS if not (tx['perdidas'] or tx['duplicadas']) else self.style.WARNING
+        self.stdout.write(estilo("¡Listo!"))
@@ -0,0 +1,55 @@
+import signal
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.core.management.base import BaseCommand
+from app_finanzas.cola_whatsapp import WorkerColaWhatsApp
+
+class _Salud(BaseHTTPRequestHandler):
+    # Cloud Run exige que el contenedor escuche en $PORT aunque no atienda requests
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Procesa los mensajes de WhatsApp encolados por el webhook'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrencia', type=int, default=4, help='Conversaciones procesadas en paralelo')
+        parser.add_argument('--reintentos', type=int, default=5, help='Máximo de intentos por mensaje')
+        parser.add_argument('--backoff', type=float, default=2.0, help='Segundos de espera base entre reintentos (se duplica en cada intento)')
+        parser.add_argument('--visibilidad', type=int, default=60, help='Segundos que un mensaje reclamado queda oculto a otros workers')
+        parser.add_argument('--lote', type=int, default=None, help='Mensajes reclamados por vuelta (por defecto: 4 x concurrencia)')
+        parser.add_argument('--intervalo', type=float, default=1.0, help='Segundos de espera cuando la cola está vacía')
+        parser.add_argument('--una-vez', action='store_true', help='Vaciar la cola y terminar (útil para cron / jobs)')
+        parser.add_argument('--puerto', type=int, default=None, help='Responder 200 en este puerto (chequeo de salud de Cloud Run)')
+
+    def handle(self, *args, **options):
+        worker = WorkerColaWhatsApp(
+            concurrencia=options['concurrencia'],
+            max_intentos=options['reintentos'],
+            backoff=options['backoff'],
+            visibilidad=options['visibilidad'],
+            lote=options['lote'],
+            intervalo=options['intervalo'],
+        )
+
+        # Cloud Run / Docker envían SIGTERM: terminamos el lote en curso y salimos
+        signal.signal(signal.SIGTERM, lambda *_: worker.detener())
+        signal.signal(signal.SIGINT, lambda *_: worker.detener())
+
+        if options['puerto']:
+            servidor = ThreadingHTTPServer(('0.0.0.0', options['puerto']), _Salud)
+            threading.Thread(target=servidor.serve_forever, name='salud', daemon=True).start()
+
+        self.stdout.write(f"Procesando cola de WhatsApp con {worker.concurrencia} carriles...")
+        stats = worker.ejecutar(una_vez=options['una_vez'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"¡Listo! Procesados: {stats['procesados']}, reintentos: {stats['reintentos']}, descartados: {stats['descartados']}."
+        ))
@@ -0,0 +1,20 @@
+import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from app_finanzas.models import Eliminacion
+
+class Command(BaseCommand):
+    help = 'Borra las lápidas de sincronización más viejas que SYNC_DIAS_ELIMINACIONES'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=settings.SYNC_DIAS_ELIMINACIONES,
+                            help='Antigüedad mínima en días (por defecto: SYNC_DIAS_ELIMINACIONES)')
+
+    def handle(self, *args, **options):
+        # Los cursores más viejos que esto ya reciben una descarga completa (ver api/sync.py),
+        # así que nadie necesita estas lápidas
+        limite = timezone.now() - datetime.timedelta(days=options['dias'])
+        borradas, _ = Eliminacion.objects.filter(eliminado_en__lt=limite).delete()
+
+        self.stdout.write(self.style.SUCCESS(f'¡Listo! Se borraron {borradas} lápidas.'))
@@ -0,0 +1,36 @@
+import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from app_finanzas.retencion_whatsapp import MODOS, purgar
+
+class Command(BaseCommand):
+    help = 'Compacta, archiva o borra por lotes los logs de WhatsApp procesados más viejos que WHATSAPP_LOGS_DIAS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=settings.WHATSAPP_LOGS_DIAS,
+                            help='Antigüedad mínima en días (por defecto: WHATSAPP_LOGS_DIAS)')
+        parser.add_argument('--modo', choices=MODOS, default=settings.WHATSAPP_LOGS_MODO,
+                            help='Qué hacer con los logs viejos (por defecto: WHATSAPP_LOGS_MODO)')
+        parser.add_argument('--directorio', default=settings.WHATSAPP_LOGS_ARCHIVO,
+                            help='Dónde dejar los .jsonl.gz con --modo archivar (por defecto: WHATSAPP_LOGS_ARCHIVO)')
+        parser.add_argument('--lote', type=int, default=1000, help='Filas por transacción')
+        parser.add_argument('--pausa', type=float, default=0.1, help='Segundos de espera entre lotes')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+
+        corte = timezone.now() - datetime.timedelta(days=options['dias'])
+        stats = purgar(
+            corte,
+            modo=options['modo'],
+            directorio=options['directorio'],
+            lote=options['lote'],
+            pausa=options['pausa'],
+        )
+
+        detalle = f"compactados: {stats['compactados']}, archivados: {stats['archivados']}, borrados: {stats['borrados']}"
+        if options['modo'] == 'archivar':
+            detalle += f" (en {options['directorio']})"
+        self.stdout.write(self.style.SUCCESS(f"¡Listo! {stats['lotes']} lotes; {detalle}."))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from app_finanzas.models import Presupuesto
+from app_finanzas.agregados import recalcular_presupuestos_usuario
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero el total gastado (libro) de los presupuestos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', type=int, help='ID del usuario a recalcular (por defecto: todos)')
+
+    def handle(self, *args, **options):
+        presupuestos = Presupuesto.objects.all()
+        if options['usuario']:
+            presupuestos = presupuestos.filter(usuario_id=options['usuario'])
+
+        total = presupuestos.count()
+        corregidos = 0
+
+        # Un usuario a la vez: el motor calcula todos sus presupuestos con un solo GROUP BY
+        for usuario_id in presupuestos.values_list('usuario_id', flat=True).distinct().order_by():
+            corregidos += recalcular_presupuestos_usuario(usuario_id)
+
+        self.stdout.write(self.style.SUCCESS(f'¡Listo! Se revisaron {total} presupuestos y se corrigieron {corregidos}.'))
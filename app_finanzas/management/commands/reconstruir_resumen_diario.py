@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from app_finanzas.models import ResumenDiario, Transaccion
+from app_finanzas.agregados import reconstruir_resumen
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero el resumen diario que usan los gráficos del dashboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', type=int, help='ID del usuario a reconstruir (por defecto: todos)')
+
+    def handle(self, *args, **options):
+        if options['usuario']:
+            usuarios = [options['usuario']]
+        else:
+            usuarios = Transaccion.objects.values_list('usuario_id', flat=True).distinct().order_by('usuario_id')
+            # Filas huérfanas de usuarios que ya no tienen transacciones
+            ResumenDiario.objects.exclude(usuario_id__in=usuarios).delete()
+
+        # Un usuario a la vez: cada reconstrucción es una transacción corta
+        filas = 0
+        for usuario_id in usuarios:
+            filas += reconstruir_resumen(usuario_id)
+
+        self.stdout.write(self.style.SUCCESS(f'¡Listo! El resumen diario quedó con {filas} filas.'))
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:05
+
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def calcular_gastado_inicial(apps, schema_editor):
+    # Llenamos el libro de los presupuestos que ya existían
+    Presupuesto = apps.get_model('app_finanzas', 'Presupuesto')
+    Transaccion = apps.get_model('app_finanzas', 'Transaccion')
+
+    for presupuesto in Presupuesto.objects.all().iterator():
+        gastos = Transaccion.objects.filter(
+            usuario_id=presupuesto.usuario_id,
+            tipo='GASTO',
+            fecha__year=presupuesto.anio,
+            fecha__month=presupuesto.mes
+        )
+        cats = list(presupuesto.categorias.all())
+        if cats:
+            gastos = gastos.filter(Q(categoria__in=cats) | Q(categoria__categoria_padre__in=cats))
+
+        total = gastos.aggregate(Sum('monto'))['monto__sum'] or 0
+        Presupuesto.objects.filter(pk=presupuesto.pk).update(gastado=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_finanzas', '0007_alter_whatsappsession_estado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='presupuesto',
+            name='gastado',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=15),
+        ),
+        migrations.RunPython(calcular_gastado_inicial, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_finanzas', '0008_presupuesto_gastado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alerta',
+            index=models.Index(condition=models.Q(('leida', False)), fields=['usuario'], name='alerta_no_leida_usuario'),
+        ),
+        migrations.AddIndex(
+            model_name='presupuesto',
+            index=models.Index(fields=['usuario', 'anio', 'mes'], name='presupuesto_usuario_periodo'),
+        ),
+        migrations.AddIndex(
+            model_name='transaccion',
+            index=models.Index(fields=['usuario', 'fecha', 'tipo'], name='transaccion_usuario_fecha'),
+        ),
+    ]
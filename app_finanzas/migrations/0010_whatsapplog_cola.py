@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:09
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def cerrar_logs_antiguos(apps, schema_editor):
+    # Antes de la cola, los logs se procesaban en línea y algunos caminos (usuario
+    # desconocido, comandos globales) no marcaban `procesado`. Los damos por cerrados
+    # para que el worker no vuelva a procesar mensajes viejos.
+    WhatsAppLog = apps.get_model('app_finanzas', 'WhatsAppLog')
+    WhatsAppLog.objects.filter(procesado=False).update(procesado=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_finanzas', '0009_indices_compuestos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='whatsapplog',
+            name='disponible_en',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='whatsapplog',
+            name='intentos',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='whatsapplog',
+            index=models.Index(condition=models.Q(('procesado', False)), fields=['disponible_en'], name='whatsapplog_pendientes'),
+        ),
+        migrations.RunPython(cerrar_logs_antiguos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+
+
+def llenar_resumen_inicial(apps, schema_editor):
+    # Armamos el resumen diario con las transacciones que ya existían
+    Transaccion = apps.get_model('app_finanzas', 'Transaccion')
+    ResumenDiario = apps.get_model('app_finanzas', 'ResumenDiario')
+
+    grupos = Transaccion.objects.values(
+        'usuario_id', 'fecha', 'tipo',
+        raiz=Coalesce('categoria__categoria_padre_id', 'categoria_id')
+    ).annotate(suma=Sum('monto'), cantidad=Count('id')).order_by()
+
+    lote = []
+    for g in grupos.iterator(chunk_size=1000):
+        lote.append(ResumenDiario(
+            usuario_id=g['usuario_id'], fecha=g['fecha'], categoria_padre_id=g['raiz'],
+            tipo=g['tipo'], total=g['suma'], cantidad=g['cantidad']
+        ))
+        if len(lote) >= 1000:
+            ResumenDiario.objects.bulk_create(lote)
+            lote = []
+    ResumenDiario.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_finanzas', '0010_whatsapplog_cola'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('tipo', models.CharField(choices=[('INGRESO', 'Ingreso'), ('GASTO', 'Gasto')], max_length=10)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('categoria_padre', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app_finanzas.categoria')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'fecha', 'categoria_padre', 'tipo'), name='resumen_diario_unico')],
+            },
+        ),
+        migrations.RunPython(llenar_resumen_inicial, migrations.RunPython.noop),
+    ]
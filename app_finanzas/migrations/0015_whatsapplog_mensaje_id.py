@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:55
+
+from django.db import migrations, models
+
+
+def _mensaje_id(payload):
+    try:
+        return payload['entry'][0]['changes'][0]['value']['messages'][0]['id']
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def completar_mensaje_id(apps, schema_editor):
+    # Solo la primera aparición de cada id: las repetidas son justamente los reintentos de Meta
+    WhatsAppLog = apps.get_model('app_finanzas', 'WhatsAppLog')
+    vistos, lote = set(), []
+    for log in WhatsAppLog.objects.order_by('id').only('id', 'payload').iterator(chunk_size=2000):
+        mensaje_id = _mensaje_id(log.payload)
+        if mensaje_id and mensaje_id not in vistos:
+            vistos.add(mensaje_id)
+            log.mensaje_id = mensaje_id[:128]
+            lote.append(log)
+        if len(lote) >= 2000:
+            WhatsAppLog.objects.bulk_update(lote, ['mensaje_id'])
+            lote = []
+    WhatsAppLog.objects.bulk_update(lote, ['mensaje_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_finanzas', '0014_sincronizacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='whatsapplog',
+            name='mensaje_id',
+            field=models.CharField(blank=True, max_length=128, null=True, unique=True),
+        ),
+        migrations.RunPython(completar_mensaje_id, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_finanzas', '0015_whatsapplog_mensaje_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='whatsapplog',
+            index=models.Index(fields=['fecha_creacion'], name='whatsapplog_fecha'),
+        ),
+    ]
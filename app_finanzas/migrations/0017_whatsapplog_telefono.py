@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:07
+
+from django.db import migrations, models
+
+
+def completar_telefono(apps, schema_editor):
+    # Solo los pendientes: a los procesados nadie les pregunta el teléfono
+    WhatsAppLog = apps.get_model('app_finanzas', 'WhatsAppLog')
+    lote = []
+    for log in WhatsAppLog.objects.filter(procesado=False).only('id', 'payload').iterator(chunk_size=2000):
+        try:
+            telefono = log.payload['entry'][0]['changes'][0]['value']['messages'][0].get('from')
+        except (KeyError, IndexError, TypeError, AttributeError):
+            telefono = None
+        if telefono:
+            log.telefono = str(telefono)[:20]
+            lote.append(log)
+        if len(lote) >= 2000:
+            WhatsAppLog.objects.bulk_update(lote, ['telefono'])
+            lote = []
+    WhatsAppLog.objects.bulk_update(lote, ['telefono'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_finanzas', '0016_whatsapplog_fecha'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='whatsapplog',
+            name='telefono',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='whatsapplog',
+            index=models.Index(condition=models.Q(('procesado', False)), fields=['telefono', 'id'], name='whatsapplog_pend_telefono'),
+        ),
+        migrations.RunPython(completar_telefono, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def unir_filas_sin_categoria(apps, schema_editor):
+    # Filas "sin categoría" repetidas (la carrera que evita la nueva restricción): sus totales
+    # pueden estar sumados dos veces, así que se recalculan desde las transacciones
+    ResumenDiario = apps.get_model('app_finanzas', 'ResumenDiario')
+    Transaccion = apps.get_model('app_finanzas', 'Transaccion')
+    repetidas = (
+        ResumenDiario.objects.filter(categoria_padre=None)
+        .values('usuario_id', 'fecha', 'tipo').annotate(n=Count('id')).filter(n__gt=1)
+    )
+    for grupo in list(repetidas):
+        clave = dict(usuario_id=grupo['usuario_id'], fecha=grupo['fecha'], tipo=grupo['tipo'])
+        ResumenDiario.objects.filter(categoria_padre=None, **clave).delete()
+        datos = Transaccion.objects.filter(categoria=None, **clave).aggregate(total=Sum('monto'), cantidad=Count('id'))
+        if datos['cantidad']:
+            ResumenDiario.objects.create(categoria_padre=None, **datos, **clave)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_finanzas', '0017_whatsapplog_telefono'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resumendiario',
+            name='categoria_padre',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app_finanzas.categoria'),
+        ),
+        migrations.RunPython(unir_filas_sin_categoria, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='resumendiario',
+            constraint=models.UniqueConstraint(condition=models.Q(('categoria_padre', None)), fields=('usuario', 'fecha', 'tipo'), name='resumen_diario_unico_sin_categoria'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 # Create your models here.
 class Categoria(models.Model):
@@ -16,6 +17,9 @@ class Categoria(models.Model):
         blank=True, 
         related_name='subcategorias'
     )
+    # Para la sincronización incremental de la App (api/sync.py)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
     class Meta:
         # Ordenamos por padre y luego por nombre para que se vea ordenado
         ordering = ['categoria_padre__nombre', 'nombre'] 
@@ -27,6 +31,23 @@ class Categoria(models.Model):
             return f"{self.categoria_padre.nombre} > {self.nombre}"
         return self.nombre
 
+class ReglaCategoria(models.Model):
+    # Auto-categorización al importar cartolas: si la descripción contiene `patron`
+    # (sin distinguir mayúsculas ni tildes) la transacción queda en `categoria`.
+    # Si usuario es null, la regla es global. Las del usuario se aplican primero.
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
+    patron = models.CharField(max_length=100)
+    categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE)
+    prioridad = models.IntegerField(default=0) # Mayor prioridad = se prueba antes
+
+    class Meta:
+        ordering = ['-prioridad', 'id']
+        verbose_name = 'Regla de Categoría'
+        verbose_name_plural = 'Reglas de Categoría'
+
+    def __str__(self):
+        return f'"{self.patron}" -> {self.categoria}'
+
 class Presupuesto(models.Model):
     usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     # Si categoria es NULL, es el presupuesto GENERAL del mes
@@ -40,6 +61,19 @@ class Presupuesto(models.Model):
     nombre = models.CharField(max_length=50, default="Presupuesto Mensual")
 
     nivel_alerta_enviado = models.IntegerField(default=0)
+
+    # Total gastado del periodo. Se mantiene incrementalmente desde las señales de Transaccion
+    # (ver app_finanzas/agregados.py) para no recalcular un Sum() en cada lectura.
+    gastado = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    # Para la sincronización incremental de la App. Los .update() del libro también lo mueven
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Todas las lecturas filtran por usuario y periodo
+            models.Index(fields=['usuario', 'anio', 'mes'], name='presupuesto_usuario_periodo'),
+        ]
     
     def __str__(self):
         return f"{self.nombre} ({self.mes}/{self.anio})"
@@ -59,10 +93,94 @@ class Transaccion(models.Model):
     creado_en = models.DateTimeField(auto_now_add=True)
     actualizado_en = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Patrón de acceso de casi todas las consultas: usuario + rango de fechas (+ tipo).
+            # Filtrar con fecha__gte/fecha__lt (ver utils.rango_mes) para que se use.
+            models.Index(fields=['usuario', 'fecha', 'tipo'], name='transaccion_usuario_fecha'),
+            # Sincronización incremental: "lo que cambió desde T" (api/sync.py)
+            models.Index(fields=['usuario', 'actualizado_en'], name='transaccion_usuario_cambios'),
+        ]
+
     def __str__(self):
         return f"{self.descripcion} - ${self.monto}"
     
 
+class Eliminacion(models.Model):
+    """
+    Lápida de un registro borrado, para que la sincronización de la App (api/sync.py)
+    pueda avisar qué eliminar. La escriben las señales post_delete de cada modelo.
+    usuario NULL = categoría global (la ven todos).
+    """
+    MODELOS = [('transaccion', 'Transacción'), ('categoria', 'Categoría'), ('presupuesto', 'Presupuesto')]
+
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
+    modelo = models.CharField(max_length=20, choices=MODELOS)
+    objeto_id = models.BigIntegerField()
+    eliminado_en = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['usuario', 'eliminado_en'], name='eliminacion_usuario_fecha'),
+        ]
+
+    def __str__(self):
+        return f"{self.modelo} {self.objeto_id} ({self.eliminado_en})"
+
+
+class ClaveIdempotencia(models.Model):
+    """
+    Resultado de una operación del lote de la API (transacciones/lote/), guardado bajo la
+    clave que manda la App. Si la App reintenta el mismo lote (ej: se cortó la conexión
+    antes de recibir la respuesta), la operación no se repite: se devuelve este resultado.
+    """
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    clave = models.CharField(max_length=64)
+    resultado = models.JSONField(default=dict)
+    creado_en = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'clave'], name='clave_idempotencia_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario_id} {self.clave}"
+
+
+class ResumenDiario(models.Model):
+    """
+    Total y cantidad de transacciones por (usuario, día, categoría principal, tipo).
+    Lo mantienen las señales de Transaccion (ver agregados.py) y se reconstruye con
+    `manage.py reconstruir_resumen_diario`. Los gráficos del dashboard leen solo de aquí.
+    """
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    fecha = models.DateField()
+    # La categoría PADRE del gasto (o la propia si no tiene padre). NULL = sin categoría.
+    # CASCADE y no SET_NULL: pasar sus filas a NULL chocaría con las "sin categoría" del mismo
+    # día. Al borrar una categoría personal el resumen del usuario se reconstruye (signals.py)
+    categoria_padre = models.ForeignKey(Categoria, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    tipo = models.CharField(max_length=10, choices=Transaccion.TIPO_CHOICES)
+
+    total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    cantidad = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # También sirve de índice para las lecturas por usuario + rango de fechas
+            models.UniqueConstraint(fields=['usuario', 'fecha', 'categoria_padre', 'tipo'], name='resumen_diario_unico'),
+            # En un UNIQUE los NULL son todos distintos: sin esta, dos inserciones simultáneas
+            # "sin categoría" crearían dos filas y aplicar_resumen sumaría en ambas
+            models.UniqueConstraint(
+                fields=['usuario', 'fecha', 'tipo'], condition=models.Q(categoria_padre=None),
+                name='resumen_diario_unico_sin_categoria',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario_id} {self.fecha} {self.tipo}: ${self.total}"
+
+
 class Alerta(models.Model):
     usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     titulo = models.CharField(max_length=100)
@@ -70,12 +188,25 @@ class Alerta(models.Model):
     leida = models.BooleanField(default=False)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Índice parcial: solo las NO leídas (las que cuenta la campanita en cada página)
+            models.Index(fields=['usuario'], condition=models.Q(leida=False), name='alerta_no_leida_usuario'),
+        ]
+
     def __str__(self):
         return f"{self.titulo}"
 
 class WhatsAppLog(models.Model):
     # Guardamos el JSON completo tal cual llega
     payload = models.JSONField(default=dict) 
+
+    # messages[0].id de Meta (wamid...). Único: si Meta reintenta la entrega, el segundo
+    # INSERT falla y el webhook responde 200 sin volver a procesar
+    mensaje_id = models.CharField(max_length=128, unique=True, null=True, blank=True)
+    # messages[0].from: la cola no toma un mensaje mientras haya uno anterior del mismo
+    # teléfono sin terminar, así la conversación se procesa en orden
+    telefono = models.CharField(max_length=20, blank=True, default='')
     
     # Fecha de recepción
     fecha_creacion = models.DateTimeField(auto_now_add=True)
@@ -84,6 +215,21 @@ class WhatsAppLog(models.Model):
     procesado = models.BooleanField(default=False)
     error = models.TextField(blank=True, null=True) # Para guardar si falló el análisis
 
+    # Cola de trabajo (ver cola_whatsapp.py): el log es a la vez el mensaje encolado.
+    # disponible_en = cuándo lo puede tomar un worker (se corre al reclamarlo o al reintentar)
+    intentos = models.IntegerField(default=0)
+    disponible_en = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Solo los pendientes: es lo que consulta el worker en cada vuelta
+            models.Index(fields=['disponible_en'], condition=models.Q(procesado=False), name='whatsapplog_pendientes'),
+            # "¿Hay uno anterior de este teléfono pendiente?" (cola_whatsapp.reclamar_lote)
+            models.Index(fields=['telefono', 'id'], condition=models.Q(procesado=False), name='whatsapplog_pend_telefono'),
+            # Retención (retencion_whatsapp.py): buscar los logs viejos sin recorrer la tabla
+            models.Index(fields=['fecha_creacion'], name='whatsapplog_fecha'),
+        ]
+
     def __str__(self):
         return f"Log {self.id} - {self.fecha_creacion}"
     
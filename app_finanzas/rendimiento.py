@@ -0,0 +1,195 @@
+import datetime
+import statistics
+import subprocess
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from app_finanzas.models import Categoria, Transaccion, WhatsAppLog, WhatsAppSession
+from app_finanzas.cliente_graph import ClienteGraph
+from app_finanzas.services import WhatsAppService
+from app_finanzas.simulador_graph import ServidorGraphSimulado
+from presuApp.instrumentacion import Recolector
+
+# --- BENCHMARK DE LAS RUTAS CALIENTES ---
+# Mide latencia (ms) y consultas SQL de las vistas que más se usan, con los datos de un
+# usuario real o sintético (manage.py generar_datos_sinteticos). Lo usa el comando
+# `manage.py medir_rendimiento`, que guarda el resultado en JSON para comparar commits.
+#
+# Cada caso corre una vez sin medir (calienta cachés) y luego `repeticiones` veces
+# midiendo tiempo y consultas. Con frio=True se vacía la caché antes de cada
+# repetición (peor caso: primer request después de un deploy o de una escritura).
+
+
+class Caso:
+    def __init__(self, nombre, ejecutar, limpiar=None):
+        self.nombre = nombre
+        self.ejecutar = ejecutar # () -> código de estado
+        self.limpiar = limpiar
+
+
+def _pagina(cliente, url):
+    def ejecutar():
+        return cliente.get(url).status_code
+    return ejecutar
+
+
+def casos_vistas(cliente):
+    return [
+        Caso('dashboard', _pagina(cliente, reverse('dashboard'))),
+        Caso('api_dashboard_data', _pagina(cliente, reverse('api_dashboard_data'))),
+        Caso('presupuestos', _pagina(cliente, reverse('presupuestos'))),
+        Caso('mis_gastos', _pagina(cliente, reverse('mis_gastos'))),
+        Caso('mis_gastos_3_meses', _pagina(cliente, reverse('mis_gastos') + '?filtro=ultimos_3')),
+        Caso('api_transacciones', _pagina(cliente, reverse('api_transacciones-list'))),
+        Caso('api_presupuestos', _pagina(cliente, reverse('api_presupuestos-list'))),
+        Caso('api_categorias', _pagina(cliente, reverse('api_categorias-list'))),
+    ]
+
+
+def _payload(telefono, texto):
+    return {"entry": [{"changes": [{"value": {"messages": [
+        {"from": telefono, "type": "text", "text": {"body": texto}}
+    ]}}]}]}
+
+
+def caso_procesar_log(usuario, servidor):
+    """
+    Una conversación completa por cada 5 repeticiones (menú -> monto -> padre -> hija), así
+    se mide también el registro del gasto. Lo que crea se borra al terminar.
+    """
+    servicio = WhatsAppService(cliente=ClienteGraph(api_url=servidor.url, token='simulado', reintentos=0))
+    telefono = usuario.numero_telefono.lstrip('+')
+    hija = Categoria.objects.filter(usuario=None).exclude(categoria_padre=None).first()
+    pasos = ['hola', 'BTN_NUEVO_GASTO', '12990', f'padre_{hija.categoria_padre_id}', f'cat_{hija.pk}']
+    estado = {'paso': 0, 'desde': timezone.now(), 'logs': []}
+
+    def ejecutar():
+        texto = pasos[estado['paso'] % len(pasos)]
+        estado['paso'] += 1
+        log = WhatsAppLog.objects.create(payload=_payload(telefono, texto))
+        estado['logs'].append(log.id) # Solo estos se borran: puede estar llegando tráfico real
+        servicio.procesar_log(log.id)
+        return 200
+
+    def limpiar():
+        WhatsAppLog.objects.filter(id__in=estado['logs']).delete()
+        for t in Transaccion.objects.filter(usuario=usuario, creado_en__gte=estado['desde'], descripcion__startswith='WhatsApp Bot'):
+            t.delete() # Uno a uno: el libro y el resumen diario se descuentan por las señales
+        WhatsAppSession.objects.filter(usuario=usuario).update(estado='INICIO', datos_temporales={})
+
+    return Caso('procesar_log', ejecutar, limpiar)
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+class CasoFallido(Exception):
+    """Una ejecución del caso no respondió 200: medir una redirección o un error no sirve."""
+
+
+def _ejecutar(caso):
+    estado = caso.ejecutar()
+    if estado != 200:
+        raise CasoFallido(f"{caso.nombre} respondió {estado}")
+    return estado
+
+
+def medir(caso, repeticiones, frio=False):
+    # Las consultas se cuentan con un execute_wrapper: connection.queries se vacía al
+    # empezar cada request, así que CaptureQueriesContext no sirve con el Client
+    recolector = Recolector()
+    tiempos = []
+    try:
+        if frio:
+            cache.clear()
+        estado = _ejecutar(caso) # Calentamiento
+
+        with connection.execute_wrapper(recolector):
+            for _ in range(repeticiones):
+                if frio:
+                    cache.clear()
+                inicio = time.perf_counter()
+                _ejecutar(caso)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+    finally:
+        if caso.limpiar:
+            caso.limpiar()
+
+    return {
+        'estado': estado,
+        'consultas': round(recolector.cantidad / repeticiones, 1), # Promedio por ejecución
+        'sql_ms': round(recolector.tiempo * 1000 / repeticiones, 2),
+        'ms': {
+            'min': round(min(tiempos), 2),
+            'p50': round(statistics.median(tiempos), 2),
+            'p95': round(_percentil(tiempos, 95), 2),
+            'media': round(statistics.fmean(tiempos), 2),
+            'max': round(max(tiempos), 2),
+        },
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def ejecutar_benchmark(usuario, repeticiones=20, frio=False, solo=None):
+    """Corre todos los casos (o los de `solo`) para `usuario`. Retorna el dict que se guarda como JSON."""
+    resultados = {}
+    # El Client usa el host 'testserver'
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']), ServidorGraphSimulado() as servidor:
+        cliente = Client()
+        cliente.force_login(usuario)
+        casos = casos_vistas(cliente)
+        if usuario.numero_telefono:
+            casos.append(caso_procesar_log(usuario, servidor))
+
+        for caso in casos:
+            if solo and caso.nombre not in solo:
+                continue
+            try:
+                resultados[caso.nombre] = medir(caso, repeticiones, frio=frio)
+            except CasoFallido as e:
+                resultados[caso.nombre] = {'error': str(e)}
+
+    return {
+        'fecha': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': _commit(),
+        'base_datos': connection.vendor,
+        'cache': settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1],
+        'usuario': usuario.pk,
+        'transacciones_usuario': Transaccion.objects.filter(usuario=usuario).count(),
+        'repeticiones': repeticiones,
+        'frio': frio,
+        'casos': resultados,
+    }
+
+
+def comparar(anterior, actual, tolerancia=0.2):
+    """
+    Compara dos resultados caso a caso. Retorna [(caso, métrica, antes, ahora, regresion)].
+    Es regresión si el p50 sube más que `tolerancia` (proporción) o si aumentan las consultas.
+    Solo tiene sentido entre corridas con la misma base de datos, caché y modo (frio).
+    """
+    filas = []
+    for nombre, ahora in actual['casos'].items():
+        antes = anterior.get('casos', {}).get(nombre)
+        if not antes or 'error' in antes or 'error' in ahora:
+            continue # Los casos fallidos ya hacen fallar la corrida (ver medir_rendimiento)
+        p50_antes, p50_ahora = antes['ms']['p50'], ahora['ms']['p50']
+        filas.append((nombre, 'p50_ms', p50_antes, p50_ahora, p50_ahora > p50_antes * (1 + tolerancia)))
+        filas.append((nombre, 'consultas', antes['consultas'], ahora['consultas'], ahora['consultas'] > antes['consultas']))
+    return filas
@@ -0,0 +1,116 @@
+import gzip
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max
+from .models import WhatsAppLog
+from .services import extraer_mensaje
+
+logger = logging.getLogger(__name__)
+
+# --- RETENCIÓN DE WhatsAppLog ---
+# Cada entrega del webhook queda como un WhatsAppLog con el JSON completo de Meta, y una vez
+# procesado ya nadie lo lee (salvo para depurar). Los procesados más viejos que `dias` se:
+#   - compactan: el payload se reemplaza por un resumen chico (quién y qué tipo de mensaje).
+#     La fila queda, así que mensaje_id sigue deduplicando reintentos tardíos de Meta.
+#   - archivan: se escriben en <directorio>/whatsapp-AAAA-MM.jsonl.gz y se borran.
+#   - borran.
+# Siempre por lotes chicos (cada uno en su propia transacción corta) recorriendo por id, para
+# no tomar locks largos sobre la tabla que usa la cola. Lo usa `manage.py purgar_logs_whatsapp`.
+#
+# Los pendientes y los que la cola dejó de reintentar (procesado=False) no se tocan.
+
+MODOS = ('compactar', 'archivar', 'borrar')
+
+
+def _resumen(log):
+    mensaje = extraer_mensaje(log.payload) or {}
+    return {'compactado': True, 'de': mensaje.get('from'), 'tipo': mensaje.get('type')}
+
+
+def _linea(log):
+    return json.dumps({
+        'id': log.id,
+        'mensaje_id': log.mensaje_id,
+        'fecha_creacion': log.fecha_creacion,
+        'procesado': log.procesado,
+        'error': log.error,
+        'intentos': log.intentos,
+        'payload': log.payload,
+    }, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def _archivar(logs, directorio):
+    # Un .jsonl.gz por mes de recepción. Cada lote se agrega como un miembro gzip nuevo
+    # (gzip.open / zcat leen el archivo completo). Se sincroniza a disco antes de borrar:
+    # si algo falla entre medio, el lote se archiva dos veces, pero no se pierde
+    por_mes = {}
+    for log in logs:
+        por_mes.setdefault(log.fecha_creacion.strftime('%Y-%m'), []).append(log)
+    for mes, del_mes in por_mes.items():
+        with open(Path(directorio) / f'whatsapp-{mes}.jsonl.gz', 'ab') as archivo:
+            with gzip.GzipFile(fileobj=archivo, mode='wb') as comprimido:
+                comprimido.write(''.join(_linea(log) for log in del_mes).encode('utf-8'))
+            archivo.flush()
+            os.fsync(archivo.fileno())
+
+
+def purgar(corte, modo='compactar', directorio=None, lote=1000, pausa=0.0):
+    """
+    Aplica la retención a los logs procesados recibidos antes de `corte` (datetime).
+    Retorna {'compactados': n, 'archivados': n, 'borrados': n, 'lotes': n}.
+    """
+    if modo not in MODOS:
+        raise ValueError(f"Modo desconocido: {modo} (opciones: {', '.join(MODOS)})")
+    if modo == 'archivar':
+        Path(directorio).mkdir(parents=True, exist_ok=True)
+
+    viejos = WhatsAppLog.objects.filter(procesado=True, fecha_creacion__lt=corte)
+    if modo == 'compactar':
+        viejos = viejos.exclude(payload__has_key='compactado')
+
+    # Tope fijo al empezar: lo que llegue mientras corre queda para la próxima vez
+    tope = viejos.aggregate(tope=Max('id'))['tope']
+    stats = {'compactados': 0, 'archivados': 0, 'borrados': 0, 'lotes': 0}
+    ultimo = 0
+
+    while tope is not None and ultimo < tope:
+        with transaction.atomic():
+            pendientes = viejos.filter(id__gt=ultimo, id__lte=tope).order_by('id')
+            if modo == 'borrar':
+                ids = list(pendientes.values_list('id', flat=True)[:lote])
+                logs = []
+            else:
+                logs = list(pendientes[:lote])
+                ids = [log.id for log in logs]
+            if not ids:
+                break
+            ultimo = ids[-1]
+
+            if modo == 'compactar':
+                # Sin mensaje_id no hay nada que deduplicar (estados de entrega, logs anteriores
+                # a la deduplicación): no vale la pena guardar ni el resumen
+                sin_id = [log.id for log in logs if log.mensaje_id is None]
+                con_id = [log for log in logs if log.mensaje_id is not None]
+                for log in con_id:
+                    log.payload = _resumen(log)
+                WhatsAppLog.objects.bulk_update(con_id, ['payload'])
+                stats['compactados'] += len(con_id)
+                stats['borrados'] += WhatsAppLog.objects.filter(id__in=sin_id).delete()[0]
+            else:
+                if modo == 'archivar':
+                    _archivar(logs, directorio)
+                    stats['archivados'] += len(logs)
+                stats['borrados'] += WhatsAppLog.objects.filter(id__in=ids).delete()[0]
+
+        stats['lotes'] += 1
+        logger.info('retencion_lote', extra={'modo': modo, 'hasta_id': ultimo, 'filas': len(ids)})
+        if pausa:
+            # Deja respirar a la cola y a la replicación entre lotes
+            time.sleep(pausa)
+
+    return stats
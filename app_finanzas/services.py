@@ -1,76 +1,99 @@
-import requests
 import logging
-from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from django.db.models import Sum, Q # <--- Importante para los cálculos
-from usuarios.models import UsuarioCustom
+from usuarios.telefonos import usuario_por_telefono
 from app_finanzas.models import Transaccion, WhatsAppLog, WhatsAppSession, Categoria
+from app_finanzas.utils import rango_mes
+from app_finanzas.cliente_graph import ClienteGraph, BufferSalida
+from app_finanzas.cache_categorias import arbol_usuario
 
 logger = logging.getLogger(__name__)
 
+def extraer_mensaje(payload):
+    """Retorna el primer mensaje del payload de Meta, o None si es otro tipo de evento (ej: estados)."""
+    try:
+        value = payload.get('entry', [])[0].get('changes', [])[0].get('value', {})
+    except (AttributeError, IndexError):
+        return None
+    messages = value.get('messages') or []
+    return messages[0] if messages else None
+
 class WhatsAppService:
-    def __init__(self):
-        self.api_url = settings.WHATSAPP_API_URL
-        self.headers = {
-            "Authorization": f"Bearer {settings.WHATSAPP_TOKEN}",
-            "Content-Type": "application/json"
-        }
+    def __init__(self, cliente=None):
+        # Cliente HTTP compartido (pool keep-alive + timeouts + reintentos)
+        self.cliente = cliente or ClienteGraph.compartido()
+        # Mientras se procesa un log, los mensajes salientes se acumulan aquí
+        self.salida = None
 
     def procesar_log(self, log_id):
-        log = WhatsAppLog.objects.get(id=log_id)
-        try:
-            # ... (Lógica de extracción del mensaje igual que antes) ...
-            payload = log.payload
-            entry = payload.get('entry', [])[0]
-            changes = entry.get('changes', [])[0]
-            value = changes.get('value', {})
-            messages = value.get('messages', [])
-            
-            if not messages: return 
+        """
+        Procesa un log del webhook. Lo deja marcado como procesado si terminó (aunque no
+        haya hecho nada, ej: usuario desconocido). Si falla, guarda el error y relanza la
+        excepción para que la cola (cola_whatsapp.py) lo reintente.
 
-            mensaje = messages[0]
-            telefono = mensaje.get('from') 
-            
-            # Búsqueda flexible del usuario (con o sin +)
-            usuario = UsuarioCustom.objects.filter(
-                Q(numero_telefono=telefono) | Q(numero_telefono=f"+{telefono}")
-            ).first()
-
-            if not usuario:
-                print(f"⚠️ Usuario no encontrado: {telefono}")
-                return
-
-            sesion, created = WhatsAppSession.objects.get_or_create(
-                usuario=usuario, defaults={'telefono': telefono}
-            )
-
-            # Interpretar texto o selección
-            tipo_msg = mensaje.get('type')
-            texto_usuario = ""
-            if tipo_msg == 'text':
-                texto_usuario = mensaje.get('text', {}).get('body', '').strip()
-            elif tipo_msg == 'interactive':
-                interactivo = mensaje.get('interactive')
-                if interactivo.get('type') == 'button_reply':
-                    texto_usuario = interactivo['button_reply']['id']
-                elif interactivo.get('type') == 'list_reply':
-                    texto_usuario = interactivo['list_reply']['id']
-
-            # Comandos globales
-            if texto_usuario.lower() in ['hola', 'menu', 'inicio', 'cancelar', 'salir']:
-                self.resetear_sesion(sesion)
-                self.enviar_menu_principal(telefono, usuario.first_name)
-                return
+        Todo el turno (gasto, estado de la sesión y procesado=True) va en una sola
+        transacción: si algo falla no queda nada a medias y el reintento parte de cero.
+        Las respuestas salen recién cuando esa transacción se confirma.
+        """
+        salida = self.salida = BufferSalida(self.cliente)
+        try:
+            with transaction.atomic():
+                # El lock evita que otro worker lo procese a la vez (ej: venció la visibilidad)
+                log = WhatsAppLog.objects.select_for_update().get(id=log_id)
+                if log.procesado:
+                    return
+                self.procesar_payload(log.payload)
 
-            self.manejar_flujo(sesion, texto_usuario, telefono)
-            
-            log.procesado = True
-            log.save()
+                log.procesado = True
+                log.error = None
+                log.save(update_fields=['procesado', 'error'])
 
+                # Respuestas del turno, en orden y por la misma conexión
+                transaction.on_commit(salida.enviar)
         except Exception as e:
-            log.error = str(e)
-            log.save()
-            print(f"Error: {e}")
+            WhatsAppLog.objects.filter(id=log_id).update(error=str(e))
+            logger.warning("error_procesando_log", extra={'log_id': log_id, 'error': str(e)})
+            raise
+        finally:
+            self.salida = None
+
+    def procesar_payload(self, payload):
+        mensaje = extraer_mensaje(payload)
+        if not mensaje: return 
+
+        telefono = mensaje.get('from') 
+        
+        # Por el número normalizado (da igual si se guardó con o sin +)
+        usuario = usuario_por_telefono(telefono)
+
+        if not usuario:
+            logger.info("whatsapp_usuario_desconocido", extra={'telefono_final': (telefono or '')[-4:]})
+            return
+
+        sesion, created = WhatsAppSession.objects.get_or_create(
+            usuario=usuario, defaults={'telefono': telefono}
+        )
+
+        # Interpretar texto o selección
+        tipo_msg = mensaje.get('type')
+        texto_usuario = ""
+        if tipo_msg == 'text':
+            texto_usuario = mensaje.get('text', {}).get('body', '').strip()
+        elif tipo_msg == 'interactive':
+            interactivo = mensaje.get('interactive')
+            if interactivo.get('type') == 'button_reply':
+                texto_usuario = interactivo['button_reply']['id']
+            elif interactivo.get('type') == 'list_reply':
+                texto_usuario = interactivo['list_reply']['id']
+
+        # Comandos globales
+        if texto_usuario.lower() in ['hola', 'menu', 'inicio', 'cancelar', 'salir']:
+            self.resetear_sesion(sesion)
+            self.enviar_menu_principal(telefono, usuario.first_name)
+            return
+
+        self.manejar_flujo(sesion, texto_usuario, telefono)
 
     def manejar_flujo(self, sesion, input_usuario, telefono):
         
@@ -196,20 +219,21 @@ class WhatsAppService:
 
     def enviar_resumen_mensual(self, telefono, usuario):
         hoy = timezone.now()
+        inicio_mes, fin_mes = rango_mes(hoy.year, hoy.month)
         # Calculamos gastos del mes actual
         gastos = Transaccion.objects.filter(
             usuario=usuario,
             tipo='GASTO',
-            fecha__month=hoy.month,
-            fecha__year=hoy.year
+            fecha__gte=inicio_mes,
+            fecha__lt=fin_mes
         ).aggregate(Sum('monto'))['monto__sum'] or 0
         
         # Opcional: Calcular Ingresos también
         ingresos = Transaccion.objects.filter(
             usuario=usuario,
             tipo='INGRESO',
-            fecha__month=hoy.month,
-            fecha__year=hoy.year
+            fecha__gte=inicio_mes,
+            fecha__lt=fin_mes
         ).aggregate(Sum('monto'))['monto__sum'] or 0
         
         balance = ingresos - gastos
@@ -228,10 +252,7 @@ class WhatsAppService:
         self.enviar_menu_principal(telefono, usuario.first_name)
 
     def enviar_lista_padres(self, telefono, usuario):
-        padres = Categoria.objects.filter(
-            Q(usuario=None) | Q(usuario=usuario),
-            categoria_padre=None
-        ).order_by('nombre')[:9]
+        padres = arbol_usuario(usuario).padres[:9]
 
         rows = []
         for c in padres:
@@ -263,10 +284,7 @@ class WhatsAppService:
         self._enviar_api(data)
 
     def enviar_lista_hijas(self, telefono, usuario, padre_id):
-        hijas = Categoria.objects.filter(
-            Q(usuario=None) | Q(usuario=usuario),
-            categoria_padre_id=padre_id
-        ).order_by('nombre')[:8]
+        hijas = arbol_usuario(usuario).hijas(padre_id)[:8]
 
         rows = []
         for c in hijas:
@@ -301,7 +319,7 @@ class WhatsAppService:
         self._enviar_api(data)
 
     def _enviar_api(self, data):
-        try:
-            requests.post(self.api_url, headers=self.headers, json=data)
-        except Exception as e:
-            print(f"Error API: {e}")
\ No newline at end of file
+        if self.salida is not None:
+            self.salida.agregar(data)
+        else:
+            self.cliente.enviar(data)
\ No newline at end of file
@@ -1,149 +1,189 @@
-from django.db.models.signals import post_save
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, pre_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
-from django.db.models import Sum, Q
-from .models import Transaccion, Presupuesto, Alerta, Categoria
+from django.utils import timezone
+from .models import Transaccion, Presupuesto, Alerta, Categoria, Eliminacion
+from .agregados import (
+    estado_contable, aplicar_movimiento, recalcular_gastado, recalcular_presupuestos_usuario,
+    fila_resumen, aplicar_resumen, reconstruir_resumen, libro_en_pausa
+)
+from . import cache_categorias, cache_alertas, versiones
+from .verificacion import encolar_verificacion
+from .al_confirmar import LoteAlConfirmar
+
+# --- BORRADO DE CUENTA ---
+
+def _borrado_de_cuenta(origin):
+    # Si se elimina la cuenta completa no hay libro, resumen, contadores ni App que mantener:
+    # todo se va en cascada con el usuario (y el usuario ya no existe). origin es el usuario
+    # (user.delete()) o el QuerySet borrado (acción masiva del admin)
+    modelo = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(modelo, get_user_model())
+
+# --- LIBRO DE GASTOS (Presupuesto.gastado) ---
+# Estos receptores van ANTES de verificar_presupuestos para que las alertas lean el total ya actualizado.
+
+@receiver(pre_save, sender=Transaccion)
+def capturar_estado_anterior(sender, instance, raw=False, **kwargs):
+    # Guardamos cómo estaba la transacción en la BD para poder mover su monto después
+    instance._estado_anterior = None
+    instance._resumen_anterior = None
+    if raw or not instance.pk or libro_en_pausa():
+        return
+
+    valores = Transaccion.objects.filter(pk=instance.pk).values(
+        'usuario_id', 'tipo', 'fecha', 'categoria_id', 'monto', 'categoria__categoria_padre_id'
+    ).first()
+    if valores:
+        padre_id = valores.pop('categoria__categoria_padre_id')
+        anterior = Transaccion(**valores)
+        instance._estado_anterior = estado_contable(anterior)
+        instance._resumen_anterior = fila_resumen(anterior, padre_id or anterior.categoria_id)
 
 @receiver(post_save, sender=Transaccion)
-def verificar_presupuestos(sender, instance, created, **kwargs):
-    """
-    Se ejecuta automáticamente cada vez que se guarda una Transacción.
-    Verifica si se rompió algún presupuesto asociado.
-    """
-    # Solo nos interesa si es un GASTO y si fue creado (o editado)
-    if instance.tipo != 'GASTO':
+def actualizar_libro_presupuestos(sender, instance, raw=False, **kwargs):
+    if raw or libro_en_pausa():
         return
+    anterior = getattr(instance, '_estado_anterior', None)
+    aplicar_movimiento(anterior, estado_contable(instance))
+    instance._estado_anterior = estado_contable(instance)
 
-    usuario = instance.usuario
-    mes = instance.fecha.month
-    anio = instance.fecha.year
-    monto_gasto = instance.monto
-    categoria_gasto = instance.categoria
-
-    # 1. BUSCAR PRESUPUESTOS AFECTADOS
-    # Un gasto puede afectar a múltiples presupuestos:
-    # a) Presupuesto Global (sin categorías)
-    # b) Presupuesto que incluye explícitamente esta categoría
-    # c) Presupuesto que incluye al PADRE de esta categoría
-    
-    presupuestos_afectados = Presupuesto.objects.filter(
-        usuario=usuario,
-        mes=mes,
-        anio=anio
-    )
+    # Resumen diario de los gráficos (todas las transacciones, no solo gastos)
+    nueva = fila_resumen(instance)
+    aplicar_resumen(getattr(instance, '_resumen_anterior', None), nueva)
+    instance._resumen_anterior = nueva
 
-    for presupuesto in presupuestos_afectados:
-        es_afectado = False
-        cats_presupuesto = presupuesto.categorias.all()
-
-        # A. Chequeo de Global
-        if not cats_presupuesto.exists():
-            es_afectado = True
-        
-        # B. Chequeo de Categorías Específicas
-        elif categoria_gasto:
-            # Si la categoría del gasto está en el presupuesto
-            if categoria_gasto in cats_presupuesto:
-                es_afectado = True
-            # O si el PADRE de la categoría del gasto está en el presupuesto
-            elif categoria_gasto.categoria_padre in cats_presupuesto:
-                es_afectado = True
-        
-        if es_afectado:
-            verificar_niveles_alerta(presupuesto, usuario, mes, anio)
-
-def verificar_limite(presupuesto, usuario):
-    # 1. Calcular total gastado en ese presupuesto
-    cats = presupuesto.categorias.all()
-    gastos_query = Transaccion.objects.filter(
-        usuario=usuario,
-        tipo='GASTO',
-        fecha__year=presupuesto.anio,
-        fecha__month=presupuesto.mes
-    )
+@receiver(post_delete, sender=Transaccion)
+def descontar_del_libro(sender, instance, origin=None, **kwargs):
+    if libro_en_pausa() or _borrado_de_cuenta(origin):
+        return
+    aplicar_movimiento(estado_contable(instance), None)
+    aplicar_resumen(getattr(instance, '_resumen_anterior', None) or fila_resumen(instance), None)
+
+@receiver(post_save, sender=Presupuesto)
+def recalcular_presupuesto_guardado(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Si solo cambió el nivel de alerta o el propio libro, no hay nada que recalcular
+    if raw or (update_fields and set(update_fields) <= {'nivel_alerta_enviado', 'gastado'}):
+        return
+    recalcular_gastado([instance])
+
+@receiver(m2m_changed, sender=Presupuesto.categorias.through)
+def recalcular_por_cambio_categorias(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        recalcular_gastado([instance])
+    elif pk_set:
+        recalcular_gastado(Presupuesto.objects.filter(pk__in=pk_set))
 
-    if cats.exists():
-        gastos_query = gastos_query.filter(
-            Q(categoria__in=cats) | Q(categoria__categoria_padre__in=cats)
-        )
-    
-    total_gastado = gastos_query.aggregate(Sum('monto'))['monto__sum'] or 0
-
-    # 2. Comparar
-    if total_gastado > presupuesto.monto_limite:
-        diferencia = total_gastado - presupuesto.monto_limite
-        
-        # 3. Crear o Actualizar Alerta (Para no llenar de spam, buscamos si ya existe una alerta hoy)
-        titulo = f"⚠️ Límite Excedido: {presupuesto.nombre}"
-        mensaje = (f"Has superado tu presupuesto de ${presupuesto.monto_limite:,.0f} "
-                   f"por un monto de ${diferencia:,.0f}. "
-                   f"Total gastado: ${total_gastado:,.0f}")
-
-        # Buscamos si ya existe una alerta no leída para este presupuesto
-        # (Esto es opcional, evita crear 10 alertas si compras 10 chicles seguidos estando excedido)
-        Alerta.objects.create(
-            usuario=usuario,
-            titulo=titulo,
-            mensaje=mensaje,
-            leida=False
-        )
-        print(f"ALERTA GENERADA: {titulo}")
-
-def verificar_niveles_alerta(presupuesto, usuario, mes, anio):
-    # 1. Calcular total gastado
-    cats = presupuesto.categorias.all()
-    
-    gastos_query = Transaccion.objects.filter(
-        usuario=usuario,
-        tipo='GASTO',
-        fecha__year=anio,   # Usamos las variables pasadas
-        fecha__month=mes
+# Editar el padre o borrar una categoría puede mover gastos entre presupuestos y entre filas
+# del resumen diario (cambio de padre, reasignación a "General" o SET_NULL). Renombrarla no
+# mueve nada. El cambio de padre de una global se corrige con `manage.py recalcular_presupuestos`
+# / `reconstruir_resumen_diario`.
+
+@receiver(pre_save, sender=Categoria)
+def capturar_padre_anterior(sender, instance, raw=False, **kwargs):
+    instance._padre_anterior = None
+    if raw or not instance.pk or not instance.usuario_id:
+        return
+    instance._padre_anterior = Categoria.objects.filter(pk=instance.pk).values_list('categoria_padre_id', flat=True).first()
+
+@receiver(post_save, sender=Categoria)
+def recalcular_por_cambio_de_padre(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created or not instance.usuario_id:
+        return
+    if instance.categoria_padre_id == getattr(instance, '_padre_anterior', None):
+        return
+    instance._padre_anterior = instance.categoria_padre_id
+    recalcular_presupuestos_usuario(instance.usuario_id)
+    reconstruir_resumen(instance.usuario_id)
+
+def _recalcular_usuarios(usuario_ids):
+    for usuario_id in usuario_ids:
+        recalcular_presupuestos_usuario(usuario_id)
+        reconstruir_resumen(usuario_id)
+
+# Borrar un padre borra sus hijas en la misma cascada (un post_delete por cada una): cada
+# usuario afectado se recalcula UNA vez, al confirmar
+_recalculo_por_borrado = LoteAlConfirmar(_recalcular_usuarios)
+
+@receiver(pre_delete, sender=Categoria)
+def capturar_usuarios_afectados(sender, instance, origin=None, **kwargs):
+    instance._usuarios_afectados = ()
+    if _borrado_de_cuenta(origin):
+        return
+    if instance.usuario_id:
+        instance._usuarios_afectados = (instance.usuario_id,)
+        return
+    # Global: los usuarios con gastos en ella (SET_NULL) o con presupuestos que la incluyen
+    con_transacciones = Transaccion.objects.filter(categoria=instance).values_list('usuario_id', flat=True)
+    con_presupuestos = Presupuesto.objects.filter(categorias=instance).values_list('usuario_id', flat=True)
+    instance._usuarios_afectados = set(con_transacciones.distinct()) | set(con_presupuestos.distinct())
+
+@receiver(post_delete, sender=Categoria)
+def recalcular_por_categoria_borrada(sender, instance, **kwargs):
+    for usuario_id in getattr(instance, '_usuarios_afectados', ()):
+        _recalculo_por_borrado.agregar(usuario_id)
+
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def invalidar_arbol_categorias(sender, instance, **kwargs):
+    # Una categoría global cambia el árbol de todos; una personal, solo el de su dueño
+    cache_categorias.invalidar(instance.usuario_id)
+
+# --- SINCRONIZACIÓN DE LA APP (api/sync.py) ---
+
+@receiver(post_delete, sender=Transaccion)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_delete, sender=Presupuesto)
+def registrar_eliminacion(sender, instance, origin=None, **kwargs):
+    if _borrado_de_cuenta(origin):
+        return
+    Eliminacion.objects.create(
+        usuario_id=instance.usuario_id, modelo=sender._meta.model_name, objeto_id=instance.pk
     )
 
-    if cats.exists():
-        gastos_query = gastos_query.filter(
-            Q(categoria__in=cats) | Q(categoria__categoria_padre__in=cats)
-        )
-    
-    total_gastado = gastos_query.aggregate(Sum('monto'))['monto__sum'] or 0
-
-    # 2. Calcular porcentaje
-    limite = presupuesto.monto_limite
-    if limite <= 0: return
-
-    porcentaje = (total_gastado / limite) * 100
-    
-    # 3. Determinar nivel actual
-    nuevo_nivel = 0
-    titulo = ""
-    mensaje = ""
-
-    if porcentaje >= 100:
-        nuevo_nivel = 3
-        titulo = f"🚨 Límite Excedido: {presupuesto.nombre}"
-        mensaje = f"Has superado el 100% de tu presupuesto. Total: ${total_gastado:,.0f} / ${limite:,.0f}"
-    
-    elif porcentaje >= 95:
-        nuevo_nivel = 2
-        titulo = f"⚠️ Peligro (95%): {presupuesto.nombre}"
-        mensaje = f"Estás a punto de agotar tu presupuesto. Llevas gastado ${total_gastado:,.0f}."
-    
-    elif porcentaje >= 80:
-        nuevo_nivel = 1
-        titulo = f"📢 Atención (80%): {presupuesto.nombre}"
-        mensaje = f"Ya consumiste el 80% de tu presupuesto. Llevas ${total_gastado:,.0f}."
-
-    # 4. Enviar Alerta SOLO si subimos de nivel (Anti-Spam)
-    if nuevo_nivel > 0 and nuevo_nivel > presupuesto.nivel_alerta_enviado:
-        
-        Alerta.objects.create(
-            usuario=usuario,
-            titulo=titulo,
-            mensaje=mensaje,
-            leida=False
-        )
-        
-        # Actualizamos el presupuesto para recordar que ya avisamos este nivel
-        presupuesto.nivel_alerta_enviado = nuevo_nivel
-        presupuesto.save(update_fields=['nivel_alerta_enviado'])
-        
-        print(f"ALERTA GENERADA NIVEL {nuevo_nivel}: {titulo}")
\ No newline at end of file
+@receiver(pre_delete, sender=Categoria)
+def marcar_cambios_por_categoria(sender, instance, origin=None, **kwargs):
+    # El SET_NULL de las transacciones y el borrado del M2M de presupuestos no pasan por
+    # save(): movemos actualizado_en a mano para que la App reciba esos registros
+    if _borrado_de_cuenta(origin):
+        return
+    ahora = timezone.now()
+    Transaccion.objects.filter(categoria=instance).update(actualizado_en=ahora)
+    Presupuesto.objects.filter(categorias=instance).update(actualizado_en=ahora)
+
+@receiver(post_save, sender=Transaccion)
+@receiver(post_delete, sender=Transaccion)
+@receiver(post_save, sender=Presupuesto)
+@receiver(post_delete, sender=Presupuesto)
+def marcar_version_finanzas(sender, instance, raw=False, origin=None, **kwargs):
+    # Sello para los ETag de la API (dashboard-data, presupuestos): al confirmar la transacción
+    if not raw and not _borrado_de_cuenta(origin):
+        versiones.marcar(versiones.FINANZAS, instance.usuario_id)
+
+@receiver(m2m_changed, sender=Presupuesto.categorias.through)
+def marcar_version_por_categorias(sender, instance, action, reverse, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and not reverse:
+        versiones.marcar(versiones.FINANZAS, instance.usuario_id)
+
+@receiver(post_save, sender=Alerta)
+@receiver(post_delete, sender=Alerta)
+def refrescar_resumen_alertas(sender, instance, raw=False, origin=None, **kwargs):
+    # Write-through del contador de la campanita (alerta nueva, leída o borrada)
+    if not raw and not _borrado_de_cuenta(origin):
+        cache_alertas.refrescar(instance.usuario_id)
+
+@receiver(post_save, sender=Transaccion)
+def verificar_presupuestos(sender, instance, raw=False, **kwargs):
+    """
+    Se ejecuta automáticamente cada vez que se guarda una Transacción.
+    Encola la revisión de alertas de su mes: se evalúa UNA vez por (usuario, año, mes)
+    cuando la transacción de la BD se confirma (ver verificacion.py).
+    """
+    # Solo nos interesa si es un GASTO y si fue creado (o editado)
+    if raw or instance.tipo != 'GASTO':
+        return
+    encolar_verificacion(instance.usuario_id, instance.fecha.year, instance.fecha.month)
@@ -0,0 +1,96 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- SERVIDOR LOCAL QUE SIMULA LA GRAPH API ---
+# Para probar ClienteGraph / WhatsAppService sin salir a internet:
+#
+#   with ServidorGraphSimulado(errores=[503]) as servidor:
+#       cliente = ClienteGraph(api_url=servidor.url)
+#       cliente.enviar({...})
+#       servidor.recibidos  # -> lista de JSON recibidos, en orden
+#
+# Para pruebas de carga (ver carga_webhook.py) también puede demorar cada respuesta
+# (latencia=(mín, máx) en segundos) y responder errores al azar (tasa_errores=0.05).
+
+
+class ServidorGraphSimulado:
+    ERRORES_AL_AZAR = (429, 500, 503)
+
+    def __init__(self, errores=None, latencia=None, tasa_errores=0.0, semilla=None, puerto=0):
+        # Códigos de estado a responder (en orden) antes de empezar a responder 200
+        self.errores = list(errores or [])
+        self.latencia = latencia
+        self.tasa_errores = tasa_errores
+        self.recibidos = []
+        self.intentos = 0
+        self.errores_inyectados = 0
+        self._azar = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', puerto), self._crear_handler())
+        self._servidor.daemon_threads = True
+        self._hilo = None
+
+    @property
+    def url(self):
+        host, puerto = self._servidor.server_address
+        return f"http://{host}:{puerto}/v17.0/simulado/messages"
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
+
+    def _responder(self, cuerpo):
+        """Decide el código de respuesta y registra el mensaje si fue aceptado."""
+        with self._lock:
+            self.intentos += 1
+            if self.errores:
+                return self.errores.pop(0)
+            if self.tasa_errores and self._azar.random() < self.tasa_errores:
+                self.errores_inyectados += 1
+                return self._azar.choice(self.ERRORES_AL_AZAR)
+            self.recibidos.append(cuerpo)
+            return 200
+
+    def _esperar(self):
+        if self.latencia:
+            with self._lock:
+                segundos = self._azar.uniform(*self.latencia)
+            time.sleep(segundos)
+
+    def _crear_handler(self):
+        simulador = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1' # Keep-alive, como la API real
+
+            def do_POST(self):
+                largo = int(self.headers.get('Content-Length', 0))
+                cuerpo = json.loads(self.rfile.read(largo) or b'{}')
+                simulador._esperar()
+                estado = simulador._responder(cuerpo)
+
+                respuesta = json.dumps({"messages": [{"id": f"wamid.simulado.{simulador.intentos}"}]}).encode()
+                self.send_response(estado)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(respuesta)))
+                self.end_headers()
+                self.wfile.write(respuesta)
+
+            def log_message(self, *args):
+                pass # Silencioso
+
+        return Handler
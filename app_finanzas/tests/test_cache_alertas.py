@@ -0,0 +1,60 @@
+from django.test import TestCase
+from django.urls import reverse
+from app_finanzas.cache_alertas import obtener_resumen, refrescar
+from app_finanzas.models import Alerta
+from .utils import CacheCompartidaMixin, crear_usuario
+
+# --- CONTADOR DE ALERTAS NO LEÍDAS (cache_alertas.py) ---
+
+
+class ResumenAlertasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = crear_usuario()
+        for i in range(7):
+            Alerta.objects.create(usuario=cls.usuario, titulo=f'Alerta {i}', mensaje='...')
+
+    def test_total_y_recientes(self):
+        resumen = obtener_resumen(self.usuario.pk)
+        self.assertEqual(resumen['total'], 7)
+        self.assertEqual(len(resumen['recientes']), 5) # Solo las últimas RECIENTES
+
+    def test_con_pocas_alertas_no_hace_el_count(self):
+        otro = crear_usuario('beto@ejemplo.cl')
+        Alerta.objects.create(usuario=otro, titulo='Única', mensaje='...')
+        with self.assertNumQueries(1):
+            self.assertEqual(obtener_resumen(otro.pk)['total'], 1)
+
+    def test_sin_cache_compartida_escribir_no_calcula(self):
+        with self.assertNumQueries(0):
+            refrescar(self.usuario.pk)
+        alerta = Alerta.objects.filter(usuario=self.usuario).first()
+        with self.assertNumQueries(1): # Solo el UPDATE
+            alerta.leida = True
+            alerta.save(update_fields=['leida'])
+        self.assertEqual(obtener_resumen(self.usuario.pk)['total'], 6)
+
+
+class ResumenAlertasCompartidoTests(CacheCompartidaMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = crear_usuario()
+
+    def test_lectura_desde_la_cache_y_write_through(self):
+        alerta = Alerta.objects.create(usuario=self.usuario, titulo='Presupuesto al 80%', mensaje='...')
+        with self.assertNumQueries(0):
+            self.assertEqual(obtener_resumen(self.usuario.pk)['total'], 1)
+
+        alerta.leida = True
+        alerta.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(obtener_resumen(self.usuario.pk)['total'], 0)
+
+    def test_limpiar_todas_actualiza_la_campanita(self):
+        for i in range(3):
+            Alerta.objects.create(usuario=self.usuario, titulo=f'Alerta {i}', mensaje='...')
+        self.client.force_login(self.usuario)
+        self.client.get(reverse('limpiar_alertas'))
+        self.assertEqual(obtener_resumen(self.usuario.pk), {'total': 0, 'recientes': []})
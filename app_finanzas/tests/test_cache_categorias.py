@@ -0,0 +1,70 @@
+from unittest import mock
+from django.test import TestCase
+from app_finanzas import cache_categorias
+from app_finanzas.cache_categorias import arbol_usuario
+from app_finanzas.models import Categoria
+from .utils import CacheCompartidaMixin, crear_usuario
+
+# --- CACHÉ DEL ÁRBOL DE CATEGORÍAS (cache_categorias.py) ---
+
+
+class DatosArbol(TestCase):
+    """Globales Hogar > Luz; Ana tiene Piano (bajo Hogar) y Beto, Golf."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = crear_usuario('ana@ejemplo.cl')
+        cls.beto = crear_usuario('beto@ejemplo.cl')
+        cls.hogar = Categoria.objects.create(nombre='Hogar')
+        cls.luz = Categoria.objects.create(nombre='Luz', categoria_padre=cls.hogar)
+        cls.piano = Categoria.objects.create(nombre='Piano', usuario=cls.ana, categoria_padre=cls.hogar)
+        Categoria.objects.create(nombre='Golf', usuario=cls.beto)
+
+
+class ArbolCategoriasTests(DatosArbol):
+
+    def test_globales_y_personales_del_usuario(self):
+        arbol = arbol_usuario(self.ana)
+        self.assertEqual([c.nombre for c in arbol.padres], ['Hogar'])
+        self.assertEqual([c.nombre for c in arbol.hijas(self.hogar.pk)], ['Luz', 'Piano'])
+        self.assertIsNone(arbol.obtener('no es un id'))
+        self.assertEqual(str(arbol.obtener(self.piano.pk)), str(self.piano))
+
+    def test_sin_cache_compartida_consulta_cada_vez(self):
+        with self.assertNumQueries(1):
+            arbol_usuario(self.ana)
+        with self.assertNumQueries(1):
+            arbol_usuario(self.ana)
+
+
+class ArbolCategoriasCompartidoTests(CacheCompartidaMixin, DatosArbol):
+
+    def test_reutiliza_el_arbol(self):
+        primero = arbol_usuario(self.ana)
+        self.assertEqual([c.nombre for c in primero.hijas(self.hogar.pk)], ['Luz', 'Piano'])
+        with self.assertNumQueries(0):
+            self.assertIs(arbol_usuario(self.ana), primero)
+
+    def test_una_categoria_personal_invalida_solo_a_su_duenio(self):
+        de_beto = arbol_usuario(self.beto)
+        arbol_usuario(self.ana)
+        with self.captureOnCommitCallbacks(execute=True):
+            Categoria.objects.create(nombre='Guitarra', usuario=self.ana, categoria_padre=self.hogar)
+        self.assertIn('Guitarra', [c.nombre for c in arbol_usuario(self.ana).hijas(self.hogar.pk)])
+        with self.assertNumQueries(0):
+            self.assertIs(arbol_usuario(self.beto), de_beto)
+
+    def test_una_categoria_global_invalida_a_todos(self):
+        arbol_usuario(self.ana)
+        arbol_usuario(self.beto)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.luz.nombre = 'Electricidad'
+            self.luz.save()
+        for usuario in (self.ana, self.beto):
+            self.assertIn('Electricidad', [c.nombre for c in arbol_usuario(usuario).hijas(self.hogar.pk)])
+
+    def test_lru_acotado(self):
+        with mock.patch.object(cache_categorias, 'MAX_USUARIOS', 1):
+            arbol_usuario(self.ana)
+            arbol_usuario(self.beto)
+            self.assertEqual(list(cache_categorias._usuarios), [self.beto.pk])
@@ -0,0 +1,37 @@
+from unittest import mock
+from django.db.models import Count
+from django.test import TransactionTestCase
+from app_finanzas.carga_webhook import _DE_LA_PRUEBA, probar_carga
+from app_finanzas.cola_whatsapp import WorkerColaWhatsApp
+from app_finanzas.models import Categoria, Transaccion, WhatsAppLog
+from .utils import crear_usuario
+
+# --- PRUEBA DE CARGA DEL WEBHOOK (carga_webhook.py, manage.py probar_carga_webhook) ---
+
+
+class ProbarCargaTests(TransactionTestCase):
+    # El reproductor y los carriles del worker son hilos: los datos deben estar confirmados.
+    # Con SQLite los hilos que escriben a la vez se bloquean, así que aquí se envía con un
+    # solo hilo y la cola se vacía después (el escenario concurrente se mide con PostgreSQL)
+
+    def test_conversaciones_completas_sin_perdidas_ni_duplicados(self):
+        comida = Categoria.objects.create(nombre='Comida')
+        Categoria.objects.create(nombre='Supermercado', categoria_padre=comida)
+        usuarios = [crear_usuario(f'sintetico{i}@ejemplo.cl', telefono=f'+5691111000{i}') for i in range(2)]
+        real = WhatsAppLog.objects.create(payload={}, mensaje_id='wamid.real', telefono='56999999999')
+
+        reporte = probar_carga(
+            usuarios, flujos=2, hilos=1, tasa_reenvios=0.5, worker=False, espera_maxima=0, semilla=7, limpiar=False,
+        )
+        self.assertEqual(reporte['ack']['errores'], 0)
+        self.assertGreater(reporte['reenvios'], 0)
+        # Los reenvíos de "Meta" no crean logs nuevos
+        self.assertEqual(WhatsAppLog.objects.filter(_DE_LA_PRUEBA).count(), 2 * 2 * 5)
+        self.assertEqual(reporte['mensajes_enviados'], 2 * 2 * 5 + reporte['reenvios'])
+
+        WorkerColaWhatsApp(concurrencia=1, backoff=0, intervalo=0, cliente=mock.Mock(), filtro=_DE_LA_PRUEBA)\
+            .ejecutar(una_vez=True)
+        por_usuario = Transaccion.objects.values('usuario').annotate(n=Count('id')).values_list('n', flat=True)
+        self.assertEqual(list(por_usuario), [2, 2])
+        # El worker de la prueba no toca los mensajes de usuarios reales
+        self.assertFalse(WhatsAppLog.objects.get(pk=real.pk).procesado)
@@ -0,0 +1,62 @@
+import socket
+from django.test import SimpleTestCase
+from app_finanzas.cliente_graph import ClienteGraph, BufferSalida
+from app_finanzas.simulador_graph import ServidorGraphSimulado
+
+# --- CLIENTE DE LA GRAPH API (cliente_graph.py) CONTRA EL SIMULADOR LOCAL ---
+
+
+def mensaje(para, texto):
+    return {"messaging_product": "whatsapp", "to": para, "type": "text", "text": {"body": texto}}
+
+
+class ClienteGraphTests(SimpleTestCase):
+
+    def cliente(self, servidor, **opciones):
+        return ClienteGraph(api_url=servidor.url, token='prueba', timeout=(1, 2), **opciones)
+
+    def test_reintenta_errores_transitorios(self):
+        with ServidorGraphSimulado(errores=[503, 429]) as servidor:
+            respuesta = self.cliente(servidor, reintentos=3).enviar(mensaje('569111', 'hola'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(servidor.intentos, 3)
+        self.assertEqual(len(servidor.recibidos), 1)
+
+    def test_agotados_los_reintentos_retorna_la_ultima_respuesta(self):
+        with ServidorGraphSimulado(errores=[503, 503, 503]) as servidor:
+            respuesta = self.cliente(servidor, reintentos=1).enviar(mensaje('569111', 'hola'))
+        self.assertEqual(respuesta.status_code, 503)
+        self.assertEqual(servidor.intentos, 2)
+
+    def test_no_reintenta_errores_del_cliente(self):
+        with ServidorGraphSimulado(errores=[400]) as servidor:
+            respuesta = self.cliente(servidor, reintentos=3).enviar(mensaje('569111', 'hola'))
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(servidor.intentos, 1)
+
+    def test_error_de_red_no_lanza(self):
+        with socket.socket() as libre:
+            libre.bind(('127.0.0.1', 0))
+            puerto = libre.getsockname()[1]
+        cliente = ClienteGraph(api_url=f'http://127.0.0.1:{puerto}/', token='prueba', timeout=(0.5, 0.5), reintentos=0)
+        self.assertIsNone(cliente.enviar(mensaje('569111', 'hola')))
+
+    def test_lote_en_orden_por_destinatario(self):
+        mensajes = [mensaje(para, f'{para}-{i}') for i in range(4) for para in ('569111', '569222', '569333')]
+        with ServidorGraphSimulado(latencia=(0, 0.02), semilla=1) as servidor:
+            respuestas = self.cliente(servidor, tamano_pool=3).enviar_lote(mensajes)
+
+        self.assertEqual([r.status_code for r in respuestas], [200] * len(mensajes))
+        for para in ('569111', '569222', '569333'):
+            recibidos = [m['text']['body'] for m in servidor.recibidos if m['to'] == para]
+            self.assertEqual(recibidos, [f'{para}-{i}' for i in range(4)])
+
+    def test_buffer_envia_solo_al_final(self):
+        with ServidorGraphSimulado() as servidor:
+            salida = BufferSalida(self.cliente(servidor))
+            salida.agregar(mensaje('569111', 'uno'))
+            salida.agregar(mensaje('569111', 'dos'))
+            self.assertEqual(servidor.recibidos, [])
+            salida.enviar()
+        self.assertEqual([m['text']['body'] for m in servidor.recibidos], ['uno', 'dos'])
+        self.assertEqual(salida.mensajes, [])
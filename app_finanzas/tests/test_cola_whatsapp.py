@@ -0,0 +1,124 @@
+import datetime
+from unittest import mock
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from app_finanzas.models import Transaccion, WhatsAppLog
+from app_finanzas.cola_whatsapp import reclamar_lote, WorkerColaWhatsApp
+from app_finanzas.services import WhatsAppService
+from .utils import HOY, crear_usuario, payload_whatsapp
+
+# --- COLA DE WHATSAPP (cola_whatsapp.py) Y PROCESAMIENTO DE CADA LOG (services.py) ---
+
+
+def encolar(telefono, wamid, **campos):
+    return WhatsAppLog.objects.create(payload=payload_whatsapp(telefono, wamid), mensaje_id=wamid, telefono=telefono, **campos)
+
+
+def reclamados(max_intentos=5):
+    return [log_id for log_id, _, _ in reclamar_lote(10, visibilidad=60, max_intentos=max_intentos)]
+
+
+class ReclamarLoteTests(TestCase):
+
+    def test_un_mensaje_por_telefono_y_en_orden(self):
+        primero = encolar('569111', 'wamid.1')
+        segundo = encolar('569111', 'wamid.2')
+        otro = encolar('569222', 'wamid.3')
+
+        # El segundo mensaje de 569111 espera a que el primero termine
+        self.assertEqual(reclamados(), [primero.id, otro.id])
+        self.assertEqual(reclamados(), [])
+
+        WhatsAppLog.objects.filter(id=primero.id).update(procesado=True)
+        self.assertEqual(reclamados(), [segundo.id])
+
+    def test_el_que_espera_reintento_sigue_bloqueando(self):
+        encolar('569111', 'wamid.1', intentos=1, disponible_en=timezone.now() + datetime.timedelta(minutes=5))
+        encolar('569111', 'wamid.2')
+        self.assertEqual(reclamados(), [])
+
+    def test_el_ultimo_intento_en_curso_sigue_bloqueando(self):
+        # Otro worker lo reclamó en su último intento y aún no vence su visibilidad
+        encolar('569111', 'wamid.1', intentos=5, disponible_en=timezone.now() + datetime.timedelta(seconds=30))
+        encolar('569111', 'wamid.2')
+        self.assertEqual(reclamados(max_intentos=5), [])
+
+    def test_los_descartados_ya_no_bloquean(self):
+        encolar('569111', 'wamid.1', intentos=5, disponible_en=timezone.now() - datetime.timedelta(seconds=1))
+        siguiente = encolar('569111', 'wamid.2')
+        self.assertEqual(reclamados(max_intentos=5), [siguiente.id])
+
+    def test_reclamar_corre_la_visibilidad_y_cuenta_el_intento(self):
+        log = encolar('569111', 'wamid.1')
+        self.assertEqual(reclamar_lote(10, visibilidad=60, max_intentos=5)[0][2], 1)
+        log.refresh_from_db()
+        self.assertEqual(log.intentos, 1)
+        self.assertGreater(log.disponible_en, timezone.now() + datetime.timedelta(seconds=50))
+        self.assertEqual(reclamados(), []) # Invisible mientras dure la visibilidad
+
+
+class ProcesarLogTests(TestCase):
+
+    def test_falla_sin_dejar_nada_a_medias(self):
+        usuario = crear_usuario(telefono='+56933334444')
+        log = encolar('56933334444', 'wamid.1')
+        cliente = mock.Mock()
+
+        def gasto_y_error(servicio, payload):
+            Transaccion.objects.create(usuario=usuario, tipo='GASTO', monto=1000, fecha=HOY)
+            servicio.salida.agregar({'texto': 'registrado'})
+            raise RuntimeError('Graph caído')
+
+        with mock.patch.object(WhatsAppService, 'procesar_payload', gasto_y_error):
+            with self.captureOnCommitCallbacks(execute=True), self.assertRaises(RuntimeError):
+                WhatsAppService(cliente=cliente).procesar_log(log.id)
+
+        log.refresh_from_db()
+        self.assertFalse(log.procesado)
+        self.assertEqual(log.error, 'Graph caído')
+        self.assertFalse(Transaccion.objects.exists())
+        cliente.enviar_lote.assert_not_called()
+
+    def test_responde_al_confirmar(self):
+        crear_usuario(telefono='+56933334444')
+        log = encolar('56933334444', 'wamid.1')
+        cliente = mock.Mock()
+        with self.captureOnCommitCallbacks() as callbacks:
+            WhatsAppService(cliente=cliente).procesar_log(log.id)
+            cliente.enviar_lote.assert_not_called()
+        for callback in callbacks:
+            callback()
+        cliente.enviar_lote.assert_called_once()
+        self.assertTrue(cliente.enviar_lote.call_args.args[0]) # El menú del bot
+        log.refresh_from_db()
+        self.assertTrue(log.procesado)
+
+    def test_usuario_desconocido_queda_procesado(self):
+        log = encolar('56900000000', 'wamid.1')
+        WhatsAppService(cliente=mock.Mock()).procesar_log(log.id)
+        log.refresh_from_db()
+        self.assertTrue(log.procesado)
+
+    def test_un_log_procesado_no_se_repite(self):
+        log = encolar('56900000000', 'wamid.1', procesado=True)
+        with mock.patch.object(WhatsAppService, 'procesar_payload') as procesar:
+            WhatsAppService(cliente=mock.Mock()).procesar_log(log.id)
+        procesar.assert_not_called()
+
+
+class WorkerColaTests(TransactionTestCase):
+    # Los carriles son hilos con su propia conexión: los datos deben estar confirmados
+
+    def test_reintenta_y_descarta(self):
+        log = encolar('569111', 'wamid.1')
+        siguiente = encolar('569111', 'wamid.2')
+        worker = WorkerColaWhatsApp(concurrencia=2, max_intentos=2, backoff=0, intervalo=0, cliente=mock.Mock())
+
+        with mock.patch.object(WhatsAppService, 'procesar_payload', side_effect=RuntimeError('falla')):
+            estadisticas = worker.ejecutar(una_vez=True)
+
+        self.assertEqual(estadisticas, {'procesados': 0, 'reintentos': 2, 'descartados': 2})
+        log.refresh_from_db()
+        self.assertEqual((log.intentos, log.procesado, log.error), (2, False, 'falla'))
+        siguiente.refresh_from_db()
+        self.assertEqual(siguiente.intentos, 2) # Corrió recién cuando el primero se descartó
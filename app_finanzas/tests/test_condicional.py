@@ -0,0 +1,64 @@
+from django.urls import reverse
+from rest_framework.test import APIClient
+from app_finanzas.models import Categoria
+from .utils import DatosBase, CacheCompartidaMixin, crear_usuario
+
+# --- GET CONDICIONAL: ETag / 304 (ver api/condicional.py) ---
+
+
+class SinCacheCompartidaTests(DatosBase):
+
+    def test_sin_etag_y_sin_304(self):
+        api = APIClient()
+        api.force_authenticate(self.usuario)
+        respuesta = api.get(reverse('api_presupuestos-list'))
+        self.assertNotIn('ETag', respuesta)
+        self.assertIn('no-cache', respuesta['Cache-Control'])
+
+        respuesta = api.get(reverse('api_presupuestos-list'), HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(respuesta.status_code, 200)
+
+
+class GetCondicionalTests(CacheCompartidaMixin, DatosBase):
+
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(self.usuario)
+
+    def etag(self, nombre_url, api=None):
+        respuesta = (api or self.api).get(reverse(nombre_url))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('private', respuesta['Cache-Control'])
+        return respuesta['ETag']
+
+    def revalidar(self, nombre_url, etag):
+        return self.api.get(reverse(nombre_url), HTTP_IF_NONE_MATCH=etag).status_code
+
+    def test_304_mientras_nada_cambie(self):
+        for nombre_url in ('api_presupuestos-list', 'api_categorias-list', 'api_dashboard_data'):
+            with self.subTest(nombre_url):
+                self.assertEqual(self.revalidar(nombre_url, self.etag(nombre_url)), 304)
+
+    def test_una_transaccion_invalida_presupuestos_y_dashboard(self):
+        presupuestos, categorias = self.etag('api_presupuestos-list'), self.etag('api_categorias-list')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.gasto(500, self.ocio)
+        self.assertEqual(self.revalidar('api_presupuestos-list', presupuestos), 200)
+        self.assertEqual(self.revalidar('api_categorias-list', categorias), 304)
+
+    def test_una_categoria_global_invalida_a_todos(self):
+        etag = self.etag('api_categorias-list')
+        with self.captureOnCommitCallbacks(execute=True):
+            Categoria.objects.create(nombre='Salud')
+        self.assertEqual(self.revalidar('api_categorias-list', etag), 200)
+
+    def test_cada_usuario_su_etag(self):
+        otro = APIClient()
+        otro.force_authenticate(crear_usuario('otro@ejemplo.cl'))
+        self.assertNotEqual(self.etag('api_categorias-list'), self.etag('api_categorias-list', api=otro))
+
+    def test_la_url_cambia_el_etag(self):
+        etag = self.etag('api_presupuestos-list')
+        respuesta = self.api.get(reverse('api_presupuestos-list'), {'page': 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
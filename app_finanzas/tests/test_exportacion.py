@@ -0,0 +1,62 @@
+import csv
+import io
+import zipfile
+from decimal import Decimal
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from app_finanzas.exportador import generar_csv
+from app_finanzas.models import Transaccion
+from .utils import HOY, DatosBase
+
+# --- EXPORTACIONES EN STREAMING (ver exportador.py) ---
+
+
+class GenerarCsvTests(SimpleTestCase):
+
+    def test_csv_neutraliza_formulas(self):
+        filas = [['=HYPERLINK("http://x")', '+56912345678', '@SUMA', 'almuerzo', Decimal('-1500'), 3]]
+        contenido = ''.join(generar_csv(['a', 'b', 'c', 'd', 'e', 'f'], filas))
+        ultima = contenido.splitlines()[-1]
+        self.assertEqual(ultima, '"\'=HYPERLINK(""http://x"")",\'+56912345678,\'@SUMA,almuerzo,-1500,3')
+
+
+class ExportarTests(DatosBase):
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.usuario)
+
+    def descargar(self, nombre_url, **params):
+        respuesta = self.api.get(reverse(nombre_url), params)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        return respuesta, b''.join(respuesta.streaming_content)
+
+    def test_transacciones_en_csv(self):
+        Transaccion.objects.create(usuario=self.usuario, tipo='GASTO', monto=1500, fecha=HOY, categoria=self.super, descripcion='=1+1')
+        respuesta, contenido = self.descargar('api_transacciones-exportar', formato='csv')
+        self.assertIn('transacciones.csv', respuesta['Content-Disposition'])
+
+        filas = list(csv.reader(io.StringIO(contenido.decode('utf-8-sig'))))
+        self.assertEqual(len(filas), 1 + 22)
+        self.assertIn(['Comida', 'Supermercado'], [fila[3:5] for fila in filas])
+        self.assertIn("'=1+1", [fila[5] for fila in filas])
+
+    def test_transacciones_en_xlsx(self):
+        _, contenido = self.descargar('api_transacciones-exportar', formato='xlsx')
+        with zipfile.ZipFile(io.BytesIO(contenido)) as libro:
+            self.assertIn('xl/workbook.xml', libro.namelist())
+            hoja = libro.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(hoja.count('<row>'), 1 + 21)
+        self.assertIn('<t xml:space="preserve">sueldo</t>', hoja)
+
+    def test_reporte_lee_el_libro(self):
+        _, contenido = self.descargar('api_presupuestos-reporte', formato='csv')
+        filas = list(csv.reader(io.StringIO(contenido.decode('utf-8-sig'))))
+        gastado = {fila[2]: fila[5] for fila in filas[1:]}
+        self.assertEqual(gastado['Comida'], '10000.00')
+
+    def test_formato_invalido(self):
+        respuesta = self.api.get(reverse('api_transacciones-exportar'), {'formato': 'pdf'})
+        self.assertEqual(respuesta.status_code, 400)
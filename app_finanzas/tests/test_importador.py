@@ -0,0 +1,99 @@
+import datetime
+import io
+from decimal import Decimal
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from app_finanzas.importador import importar_transacciones, normalizar_fila, parsear_monto
+from app_finanzas.models import Presupuesto, ReglaCategoria, ResumenDiario, Transaccion
+from .utils import HOY, DatosBase
+
+# --- IMPORTACIÓN DE CARTOLAS (ver importador.py) ---
+
+AYER = HOY - datetime.timedelta(days=1)
+
+
+def cartola(*filas, encabezado='fecha;descripcion;monto'):
+    return io.BytesIO('\n'.join((encabezado,) + filas).encode())
+
+
+class ParseoTests(SimpleTestCase):
+
+    def test_montos_en_formatos_de_banco(self):
+        self.assertEqual(parsear_monto('$ -12.500'), Decimal('-12500.00'))
+        self.assertEqual(parsear_monto('1.234,56'), Decimal('1234.56'))
+        self.assertEqual(parsear_monto('(3.000)'), Decimal('-3000.00'))
+
+    def test_monto_mas_grande_que_la_columna_es_error_de_fila(self):
+        with self.assertRaisesMessage(ValueError, 'fuera de rango'):
+            normalizar_fila({'fecha': HOY.isoformat(), 'monto': '1' + '0' * 13})
+        self.assertEqual(normalizar_fila({'fecha': HOY.isoformat(), 'monto': '9' * 13})['monto'], Decimal('9' * 13))
+
+
+class ImportarTests(DatosBase):
+
+    def importar(self, archivo, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return importar_transacciones(self.usuario, archivo, **kwargs)
+
+    def test_csv_con_reglas_y_filas_malas(self):
+        ReglaCategoria.objects.create(usuario=self.usuario, patron='lider', categoria=self.super)
+        resultado = self.importar(cartola(
+            f'{HOY.isoformat()};Compra LÍDER Ñuñoa;-4.500',
+            f'{HOY.isoformat()};Sueldo;800.000',
+            'no es fecha;x;-1',
+            f'{HOY.isoformat()};Yate;-{"9" * 14}',
+        ))
+        self.assertEqual((resultado['importadas'], resultado['categorizadas'], resultado['con_error']), (2, 1, 2))
+        self.assertEqual([e['linea'] for e in resultado['errores']], [4, 5])
+        lider = Transaccion.objects.get(descripcion='Compra LÍDER Ñuñoa')
+        self.assertEqual((lider.tipo, lider.monto, lider.categoria), ('GASTO', 4500, self.super))
+
+    def test_ofx(self):
+        ofx = io.BytesIO(
+            b'OFXHEADER:100\nCHARSET:1252\n<OFX><STMTTRN>\n<DTPOSTED>' + HOY.strftime('%Y%m%d').encode()
+            + b'120000\n<TRNAMT>-1990.00\n<NAME>Caf\xe9\n</STMTTRN></OFX>\n'
+        )
+        resultado = self.importar(ofx, nombre='banco.ofx')
+        self.assertEqual(resultado['importadas'], 1)
+        self.assertTrue(Transaccion.objects.filter(descripcion='Café', monto=1990, tipo='GASTO').exists())
+
+    def test_reimportar_no_duplica_pero_respeta_filas_iguales(self):
+        filas = (f'{HOY.isoformat()};Café;-1.500', f'{HOY.isoformat()};Café;-1.500', f'{AYER.isoformat()};Pan;-900')
+        self.assertEqual(self.importar(cartola(*filas))['importadas'], 3)
+        resultado = self.importar(cartola(*filas, f'{AYER.isoformat()};Pan;-900'))
+        self.assertEqual((resultado['importadas'], resultado['duplicadas']), (1, 3))
+        self.assertEqual(Transaccion.objects.filter(descripcion='Pan').count(), 2)
+
+    def test_filas_iguales_en_lotes_distintos_de_un_archivo_desordenado(self):
+        # Con lotes de 2 y fechas alternadas, el mismo día cae en varios lotes: las filas que
+        # guardó un lote anterior no cuentan como duplicadas de las siguientes
+        filas = [f'{(HOY if i % 2 else AYER).isoformat()};Café;-1.500' for i in range(8)]
+        resultado = self.importar(cartola(*filas), tamano_lote=2)
+        self.assertEqual((resultado['importadas'], resultado['duplicadas']), (8, 0))
+
+        # Y una fila que ya existía tapa una sola fila del archivo, no una por lote
+        resultado = self.importar(cartola(*filas, *filas), tamano_lote=2)
+        self.assertEqual((resultado['importadas'], resultado['duplicadas']), (8, 8))
+        self.assertEqual(Transaccion.objects.filter(descripcion='Café').count(), 16)
+
+    def test_recalcula_libro_y_resumen(self):
+        self.importar(cartola(f'{HOY.isoformat()};Lider;-7.000;supermercado', encabezado='fecha;descripcion;monto;categoria'))
+        self.assertLibroCuadra()
+        self.assertEqual(Presupuesto.objects.get(pk=self.de_comida.pk).gastado, 17000)
+        resumen = ResumenDiario.objects.get(usuario=self.usuario, fecha=HOY, categoria_padre=self.comida, tipo='GASTO')
+        self.assertEqual((resumen.total, resumen.cantidad), (17000, 11))
+
+    def test_endpoint(self):
+        api = APIClient()
+        api.force_authenticate(self.usuario)
+        archivo = cartola(f'{HOY.isoformat()};Café;-1.500')
+        archivo.name = 'cartola.csv'
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = api.post(reverse('api_transacciones-importar'), {'archivo': archivo})
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json()['importadas'], 1)
+
+        archivo.seek(0)
+        respuesta = api.post(reverse('api_transacciones-importar'), {'archivo': archivo})
+        self.assertEqual((respuesta.status_code, respuesta.json()['duplicadas']), (200, 1))
@@ -0,0 +1,62 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from presuApp.instrumentacion import huella
+from app_finanzas.models import Categoria, Presupuesto
+from .utils import DatosBase, limite_consultas, verificar_presupuesto_vista
+
+# --- PRESUPUESTO DE CONSULTAS POR VISTA (presuApp/instrumentacion.py) ---
+
+
+class PresupuestoConsultasTests(DatosBase):
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        self.api = APIClient()
+        self.api.force_authenticate(self.usuario)
+
+    def test_vistas_web(self):
+        for nombre in ('dashboard', 'mis_gastos', 'presupuestos', 'categorias'):
+            with self.subTest(vista=nombre):
+                respuesta = verificar_presupuesto_vista(self.client, reverse(nombre))
+                self.assertEqual(respuesta.status_code, 200)
+
+    def test_vistas_api(self):
+        for nombre in ('api_dashboard_data', 'api_transacciones-list', 'api_presupuestos-list', 'api_categorias-list', 'api_sync'):
+            with self.subTest(vista=nombre):
+                respuesta = verificar_presupuesto_vista(self.api, reverse(nombre))
+                self.assertEqual(respuesta.status_code, 200)
+
+    def test_consultas_no_crecen_con_las_filas(self):
+        # Sin N+1: el doble de transacciones, las mismas consultas
+        url = reverse('api_transacciones-list')
+        with limite_consultas(maximo=100) as antes:
+            self.api.get(url)
+        for _ in range(20):
+            self.gasto(500, self.super)
+        with limite_consultas(maximo=len(antes)):
+            self.api.get(url)
+
+    def test_limite_consultas_falla_si_se_pasa(self):
+        with self.assertRaisesMessage(AssertionError, '2 consultas, el presupuesto es 1'):
+            with limite_consultas(maximo=1):
+                list(Categoria.objects.all())
+                list(Presupuesto.objects.all())
+
+
+class MiddlewareInstrumentacionTests(DatosBase):
+
+    def test_huella_ignora_valores_y_largo_de_listas(self):
+        self.assertEqual(
+            huella('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+            huella('SELECT *   FROM t WHERE id IN (%s, %s)'),
+        )
+
+    @override_settings(INSTRUMENTACION_SQL=True, PRESUPUESTO_CONSULTAS={'mis_gastos': 1})
+    def test_server_timing_y_warning_si_pasa_el_presupuesto(self):
+        self.client.force_login(self.usuario)
+        with self.assertLogs('presuApp.instrumentacion', 'WARNING') as logs:
+            respuesta = self.client.get(reverse('mis_gastos'))
+        self.assertIn('sql;dur=', respuesta['Server-Timing'])
+        self.assertEqual(logs.records[0].vista, 'mis_gastos')
+        self.assertGreater(logs.records[0].consultas, 1)
@@ -0,0 +1,70 @@
+import datetime
+from django.urls import reverse
+from app_finanzas.models import Presupuesto
+from .utils import HOY, DatosBase
+
+# --- LIBRO DE GASTOS (Presupuesto.gastado, ver agregados.py) ---
+
+
+class LibroGastosTests(DatosBase):
+
+    def test_estado_inicial(self):
+        self.global_mes.refresh_from_db()
+        self.de_comida.refresh_from_db()
+        self.assertEqual(self.global_mes.gastado, 20000)
+        self.assertEqual(self.de_comida.gastado, 10000) # Solo Supermercado (hija de Comida)
+        self.assertLibroCuadra()
+
+    def test_crear_editar_y_borrar(self):
+        gasto = self.gasto(3000, self.super)
+        self.assertLibroCuadra()
+
+        gasto.monto = 4500
+        gasto.categoria = self.ocio
+        gasto.save()
+        self.de_comida.refresh_from_db()
+        self.assertEqual(self.de_comida.gastado, 10000)
+        self.assertLibroCuadra()
+
+        gasto.fecha = HOY.replace(day=1) - datetime.timedelta(days=1) # Mes anterior
+        gasto.save()
+        self.assertLibroCuadra()
+
+        gasto.delete()
+        self.global_mes.refresh_from_db()
+        self.assertEqual(self.global_mes.gastado, 20000)
+        self.assertLibroCuadra()
+
+    def test_pasar_de_gasto_a_ingreso(self):
+        gasto = self.gasto(7000, self.comida)
+        gasto.tipo = 'INGRESO'
+        gasto.save()
+        self.assertLibroCuadra()
+
+    def test_cambiar_categorias_del_presupuesto(self):
+        self.de_comida.categorias.add(self.ocio)
+        self.de_comida.refresh_from_db()
+        self.assertEqual(self.de_comida.gastado, 20000)
+        self.de_comida.categorias.remove(self.comida)
+        self.assertLibroCuadra()
+
+    def test_mover_subcategoria_de_padre(self):
+        self.super.categoria_padre = self.ocio
+        self.super.save()
+        self.de_comida.refresh_from_db()
+        self.assertEqual(self.de_comida.gastado, 0)
+        self.assertLibroCuadra()
+
+    def test_presupuesto_nuevo_parte_con_lo_ya_gastado(self):
+        nuevo = Presupuesto.objects.create(usuario=self.usuario, mes=HOY.month, anio=HOY.year, monto_limite=1, nombre='Ocio')
+        nuevo.categorias.add(self.ocio)
+        nuevo.refresh_from_db()
+        self.assertEqual(nuevo.gastado, 10000)
+
+    def test_las_vistas_leen_el_libro(self):
+        self.client.force_login(self.usuario)
+        self.gasto(5000, self.super)
+        respuesta = self.client.get(reverse('api_presupuestos-list'))
+        gastado = {p['nombre']: p['gastado'] for p in respuesta.json()}
+        self.assertEqual(float(gastado['Comida']), 15000)
+        self.assertEqual(float(gastado['Presupuesto Mensual']), 25000)
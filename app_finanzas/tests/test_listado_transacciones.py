@@ -0,0 +1,56 @@
+import datetime
+from django.urls import reverse
+from rest_framework.test import APIClient
+from app_finanzas.models import Transaccion
+from .utils import HOY, DatosBase, crear_usuario, limite_consultas
+
+# --- LISTADO DE TRANSACCIONES: CURSOR, ?fields= Y FILTROS ---
+
+
+class ListadoTransaccionesTests(DatosBase):
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.usuario)
+        self.url = reverse('api_transacciones-list')
+
+    def listar(self, **params):
+        respuesta = self.api.get(self.url, params)
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        return respuesta.data
+
+    def test_cursor_recorre_todo_sin_repetir(self):
+        ayer = HOY - datetime.timedelta(days=1)
+        for _ in range(3):
+            self.gasto(700, fecha=ayer)
+        Transaccion.objects.create(usuario=crear_usuario('otro@ejemplo.cl'), tipo='GASTO', monto=1, fecha=HOY)
+
+        vistos, pagina = [], self.listar(page_size=7)
+        while True:
+            vistos += [t['id'] for t in pagina['results']]
+            if not pagina['next']:
+                break
+            pagina = self.api.get(pagina['next']).data
+        propios = Transaccion.objects.filter(usuario=self.usuario).order_by('-fecha', '-id')
+        self.assertEqual(vistos, list(propios.values_list('id', flat=True)))
+
+    def test_consultas_fijas_por_pagina(self):
+        with limite_consultas(maximo=3):
+            self.listar(page_size=500)
+
+    def test_fields(self):
+        pagina = self.listar(fields='id,monto')
+        self.assertEqual(set(pagina['results'][0]), {'id', 'monto'})
+
+    def test_filtros(self):
+        ayer = HOY - datetime.timedelta(days=1)
+        viejo = self.gasto(700, self.super, fecha=ayer)
+        self.assertEqual([t['id'] for t in self.listar(fecha_hasta=ayer.isoformat())['results']], [viejo.pk])
+        self.assertEqual(len(self.listar(fecha_desde=HOY.isoformat(), tipo='INGRESO')['results']), 1)
+        # Una categoría principal incluye las transacciones de sus hijas
+        self.assertEqual(len(self.listar(categoria=self.comida.pk)['results']), 11)
+
+    def test_filtros_invalidos(self):
+        for params in ({'fecha_desde': '2025-13-01'}, {'tipo': 'OTRO'}, {'categoria': 'abc'}):
+            with self.subTest(params):
+                self.assertEqual(self.api.get(self.url, params).status_code, 400)
@@ -0,0 +1,75 @@
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from app_finanzas.agregados import reconstruir_resumen
+from app_finanzas.models import ResumenDiario, Transaccion
+from .utils import HOY, DatosBase, crear_usuario
+
+# --- LOTE DE OPERACIONES (ver api/lote.py) ---
+
+
+class LoteTransaccionesTests(DatosBase):
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.usuario)
+        self.url = reverse('api_transacciones-lote')
+
+    def datos(self, monto, categoria=None):
+        return {'tipo': 'GASTO', 'monto': str(monto), 'fecha': HOY.isoformat(), 'categoria': categoria and categoria.pk}
+
+    def enviar(self, *operaciones):
+        return self.api.post(self.url, {'operaciones': list(operaciones)}, format='json')
+
+    def test_aplica_todo_y_mantiene_libro_y_resumen(self):
+        actualizar, eliminar = Transaccion.objects.filter(usuario=self.usuario, tipo='GASTO')[:2]
+        respuesta = self.enviar(
+            {'op': 'crear', 'clave': 'c1', 'datos': self.datos(1500, self.super)},
+            {'op': 'actualizar', 'id': actualizar.pk, 'datos': {'monto': '9000'}},
+            {'op': 'eliminar', 'id': eliminar.pk},
+        )
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        self.assertEqual([r['estado'] for r in respuesta.data['resultados']], [201, 200, 204])
+        self.assertFalse(Transaccion.objects.filter(pk=eliminar.pk).exists())
+        self.assertEqual(Transaccion.objects.get(pk=actualizar.pk).monto, 9000)
+        self.assertLibroCuadra()
+
+        filas = ResumenDiario.objects.filter(usuario=self.usuario)
+        campos = ('fecha', 'categoria_padre_id', 'tipo', 'total', 'cantidad')
+        antes = set(filas.values_list(*campos))
+        reconstruir_resumen(self.usuario.pk)
+        self.assertEqual(antes, set(filas.values_list(*campos)))
+
+    def test_reintentado_no_duplica(self):
+        operacion = {'op': 'crear', 'clave': 'c1', 'datos': self.datos(1500)}
+        antes = Transaccion.objects.count()
+        primero = self.enviar(operacion)
+        segundo = self.enviar(operacion)
+        self.assertEqual(Transaccion.objects.count(), antes + 1)
+        self.assertTrue(segundo.data['resultados'][0]['repetida'])
+        self.assertEqual(segundo.data['resultados'][0]['id'], primero.data['resultados'][0]['id'])
+
+    def test_con_un_error_no_aplica_nada(self):
+        antes = Transaccion.objects.count()
+        respuesta = self.enviar({'op': 'crear', 'datos': self.datos(1500)}, {'op': 'eliminar', 'id': 999999})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual([r['estado'] for r in respuesta.data['resultados']], [424, 404])
+        self.assertEqual(Transaccion.objects.count(), antes)
+        self.assertLibroCuadra()
+
+    def test_no_toca_transacciones_de_otro_usuario(self):
+        ajena = Transaccion.objects.create(usuario=crear_usuario('otro@ejemplo.cl'), tipo='GASTO', monto=1, fecha=HOY)
+        respuesta = self.enviar({'op': 'eliminar', 'id': ajena.pk})
+        self.assertEqual(respuesta.data['resultados'][0]['estado'], 404)
+        self.assertTrue(Transaccion.objects.filter(pk=ajena.pk).exists())
+
+    def test_misma_transaccion_dos_veces(self):
+        gasto = Transaccion.objects.filter(usuario=self.usuario).first()
+        respuesta = self.enviar({'op': 'eliminar', 'id': gasto.pk}, {'op': 'actualizar', 'id': gasto.pk, 'datos': {'monto': '1'}})
+        self.assertEqual([r['estado'] for r in respuesta.data['resultados']], [400, 400])
+
+    @override_settings(API_LOTE_MAX_OPERACIONES=2)
+    def test_maximo_de_operaciones(self):
+        respuesta = self.enviar(*[{'op': 'crear', 'datos': self.datos(100)} for _ in range(3)])
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('operaciones', respuesta.data)
@@ -0,0 +1,71 @@
+import json
+import logging
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from presuApp import metricas
+from presuApp.registro import FiltroMuestreo, FormatoJSON
+
+# --- MÉTRICAS (presuApp/metricas.py) Y LOGGING ESTRUCTURADO (presuApp/registro.py) ---
+
+
+def registro(nombre, nivel=logging.INFO, **extra):
+    record = logging.makeLogRecord({'name': nombre, 'levelno': nivel, 'levelname': logging.getLevelName(nivel), 'msg': 'evento'})
+    record.__dict__.update(extra)
+    return record
+
+
+class MetricasTests(SimpleTestCase):
+
+    def metrica(self, clase, *args, **kwargs):
+        metrica = clase(*args, **kwargs)
+        self.addCleanup(metricas._registro.remove, metrica)
+        return metrica
+
+    def test_contador(self):
+        contador = self.metrica(metricas.Contador, 'prueba_total', 'Ayuda.', ['motivo'])
+        contador.inc(motivo='a')
+        contador.inc(2, motivo='b"c')
+        self.assertEqual(list(contador.lineas())[2:], ['prueba_total{motivo="a"} 1', 'prueba_total{motivo="b\\"c"} 2'])
+        with self.assertRaises(ValueError):
+            contador.inc(otra='x')
+
+    def test_histograma_acumula_por_cubeta(self):
+        histograma = self.metrica(metricas.Histograma, 'prueba_segundos', 'Ayuda.', cubetas=(0.1, 1))
+        for valor in (0.05, 0.5, 5):
+            histograma.observar(valor)
+        self.assertEqual(list(histograma.lineas())[2:], [
+            'prueba_segundos_bucket{le="0.1"} 1',
+            'prueba_segundos_bucket{le="1"} 2',
+            'prueba_segundos_bucket{le="+Inf"} 3',
+            'prueba_segundos_sum 5.55',
+            'prueba_segundos_count 3',
+        ])
+
+
+class EndpointMetricasTests(TestCase):
+
+    @override_settings(WHATSAPP_PROCESAR_EN_LINEA=False)
+    def test_expone_las_metricas_de_la_app(self):
+        self.client.post(reverse('webhook_whatsapp'), {'entry': []}, content_type='application/json')
+        texto = self.client.get(reverse('metricas')).content.decode()
+        self.assertIn('presuapp_webhook_descartados_total{motivo="sin_mensaje"}', texto)
+        self.assertIn('# TYPE presuapp_webhook_segundos histogram', texto)
+
+    @override_settings(METRICAS_IPS=[], METRICAS_TOKEN='secreto')
+    def test_solo_ips_permitidas_o_token(self):
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 404)
+        respuesta = self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(respuesta.status_code, 200)
+
+
+class RegistroTests(SimpleTestCase):
+
+    def test_muestreo_por_logger_y_sus_hijos(self):
+        filtro = FiltroMuestreo({'app_finanzas.cliente_graph': 0.0})
+        self.assertFalse(filtro.filter(registro('app_finanzas.cliente_graph.envio')))
+        self.assertTrue(filtro.filter(registro('app_finanzas.cliente_graph', nivel=logging.WARNING)))
+        self.assertTrue(filtro.filter(registro('app_finanzas.cola_whatsapp')))
+
+    def test_json_con_los_extras(self):
+        datos = json.loads(FormatoJSON().format(registro('app_finanzas', log_id=7)))
+        self.assertEqual((datos['severity'], datos['message'], datos['log_id']), ('INFO', 'evento', 7))
@@ -0,0 +1,50 @@
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from app_finanzas.utils import parsear_mes, rango_mes, validar_periodo
+from .utils import HOY, DatosBase
+
+# --- PERIODOS (utils.rango_mes) Y SU VALIDACIÓN EN LOS DASHBOARDS ---
+
+
+class RangoMesTests(SimpleTestCase):
+
+    def test_rango_semiabierto(self):
+        self.assertEqual([d.isoformat() for d in rango_mes(2025, 12)], ['2025-12-01', '2026-01-01'])
+        self.assertEqual([d.isoformat() for d in rango_mes(2024, 2)], ['2024-02-01', '2024-03-01'])
+
+    def test_validar_periodo(self):
+        self.assertEqual(validar_periodo('2025', '3'), (2025, 3))
+        self.assertEqual(parsear_mes('9998-12'), (9998, 12))
+        for anio, mes in (('9999', '12'), ('0', '1'), ('2025', '13'), ('abc', '1'), ('2025', '')):
+            with self.subTest(anio=anio, mes=mes), self.assertRaises(ValueError):
+                validar_periodo(anio, mes)
+
+
+class PeriodoDashboardTests(DatosBase):
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.usuario)
+        self.client.force_login(self.usuario)
+
+    def test_api_rechaza_periodos_invalidos(self):
+        url = reverse('api_dashboard_data')
+        for params in ({'anio': 9999, 'mes': 12}, {'anio': 'x'}, {'mes': 'x'}, {'mes': 13}):
+            with self.subTest(**params):
+                self.assertEqual(self.api.get(url, params).status_code, 400)
+
+    def test_api_periodo_sin_datos(self):
+        respuesta = self.api.get(reverse('api_dashboard_data'), {'anio': 9998, 'mes': 12})
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_reporte_rechaza_anio_fuera_de_rango(self):
+        respuesta = self.api.get(reverse('api_presupuestos-reporte'), {'desde': '9999-12'})
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_web_vuelve_al_mes_actual(self):
+        for params in ({'anio': 9999, 'mes': 12}, {'anio': 'x', 'mes': 'y'}):
+            with self.subTest(**params):
+                respuesta = self.client.get(reverse('dashboard'), params)
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertEqual((respuesta.context['anio_actual'], respuesta.context['mes_actual']), (HOY.year, HOY.month))
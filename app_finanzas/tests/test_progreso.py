@@ -0,0 +1,72 @@
+import datetime
+from django.urls import reverse
+from rest_framework.test import APIClient
+from app_finanzas.agregados import gastos_por_presupuesto, progreso_presupuestos
+from app_finanzas.models import Presupuesto
+from .utils import HOY, DatosBase, crear_usuario, limite_consultas
+
+# --- MOTOR DE PROGRESO DE PRESUPUESTOS (agregados.gastos_por_presupuesto / progreso_presupuestos) ---
+
+MES_PASADO = HOY.replace(day=1) - datetime.timedelta(days=1)
+
+
+class GastosPorPresupuestoTests(DatosBase):
+
+    def test_varios_usuarios_y_meses_en_una_consulta(self):
+        self.gasto(3000, self.super, fecha=MES_PASADO)
+        pasado = Presupuesto.objects.create(usuario=self.usuario, mes=MES_PASADO.month, anio=MES_PASADO.year, monto_limite=1)
+        otro = crear_usuario('otro@ejemplo.cl')
+        ajeno = Presupuesto.objects.create(usuario=otro, mes=HOY.month, anio=HOY.year, monto_limite=1)
+
+        presupuestos = list(Presupuesto.objects.prefetch_related('categorias'))
+        with limite_consultas(maximo=1):
+            gastado = gastos_por_presupuesto(presupuestos)
+        self.assertEqual(gastado, {self.global_mes.pk: 20000, self.de_comida.pk: 10000, pasado.pk: 3000, ajeno.pk: 0})
+
+    def test_una_subcategoria_incluida_no_suma_a_sus_hermanas(self):
+        solo_super = Presupuesto.objects.create(usuario=self.usuario, mes=HOY.month, anio=HOY.year, monto_limite=1, nombre='Super')
+        solo_super.categorias.add(self.super)
+        self.gasto(700, self.comida)
+        self.assertEqual(gastos_por_presupuesto([solo_super])[solo_super.pk], 10000)
+
+
+class ProgresoPresupuestosTests(DatosBase):
+
+    def test_estados(self):
+        presupuesto = Presupuesto.objects.get(pk=self.global_mes.pk) # gastado = 20000
+        casos = {100000: ('success', 20, 80000), 25000: ('warning', 80, 5000), 20000: ('danger', 100, 0), 10000: ('danger', 200, -10000)}
+        for limite, (estado, porcentaje, restante) in casos.items():
+            with self.subTest(limite=limite):
+                presupuesto.monto_limite = limite
+                datos, = progreso_presupuestos([presupuesto])
+                self.assertEqual((datos['estado'], datos['porcentaje'], datos['restante']), (estado, porcentaje, restante))
+                self.assertEqual(datos['porcentaje_visual'], min(porcentaje, 100))
+                self.assertEqual(datos['excedido'], porcentaje > 100)
+
+    def test_la_lista_web_no_consulta_por_presupuesto(self):
+        self.client.force_login(self.usuario)
+        with limite_consultas(maximo=100) as antes:
+            self.client.get(reverse('presupuestos'))
+        for mes in range(1, 13):
+            Presupuesto.objects.create(usuario=self.usuario, mes=mes, anio=HOY.year - 1, monto_limite=1000).categorias.add(self.ocio)
+        with limite_consultas(maximo=len(antes)):
+            respuesta = self.client.get(reverse('presupuestos'))
+        self.assertEqual(len(respuesta.context['datos']), 14)
+
+
+class PresupuestosApiTests(DatosBase):
+
+    def test_gastado_y_porcentaje_desde_el_libro_sin_n_mas_1(self):
+        api = APIClient()
+        api.force_authenticate(self.usuario)
+        url = reverse('api_presupuestos-list')
+        with limite_consultas(maximo=100) as antes:
+            api.get(url)
+        for mes in range(1, 13):
+            Presupuesto.objects.create(usuario=self.usuario, mes=mes, anio=HOY.year - 1, monto_limite=1000).categorias.add(self.ocio)
+        with limite_consultas(maximo=len(antes)):
+            respuesta = api.get(url)
+
+        comida = next(p for p in respuesta.json() if p['nombre'] == 'Comida')
+        self.assertEqual((float(comida['gastado']), comida['porcentaje']), (10000, 20))
+        self.assertEqual([c['nombre'] for c in comida['categorias_detalle']], ['Comida'])
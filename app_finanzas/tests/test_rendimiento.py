@@ -0,0 +1,58 @@
+import io
+import json
+import os
+import tempfile
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+from app_finanzas.models import Presupuesto, Transaccion
+from app_finanzas.rendimiento import comparar
+from usuarios.models import UsuarioCustom
+
+# --- BENCHMARK (rendimiento.py, manage.py generar_datos_sinteticos / medir_rendimiento) ---
+
+
+def corrida(p50, consultas, error=None):
+    caso = {'error': error} if error else {'ms': {'p50': p50}, 'consultas': consultas}
+    return {'casos': {'dashboard': caso}}
+
+
+class CompararTests(SimpleTestCase):
+
+    def test_regresiones(self):
+        self.assertEqual(comparar(corrida(10, 5), corrida(11.9, 5)), [
+            ('dashboard', 'p50_ms', 10, 11.9, False), ('dashboard', 'consultas', 5, 5, False),
+        ])
+        filas = comparar(corrida(10, 5), corrida(12.5, 6))
+        self.assertEqual([fila[-1] for fila in filas], [True, True])
+
+    def test_casos_fallidos_no_se_comparan(self):
+        self.assertEqual(comparar(corrida(10, 5), corrida(0, 0, error='500')), [])
+
+
+class BenchmarkTests(TestCase):
+
+    def test_generar_y_medir(self):
+        call_command('generar_datos_sinteticos', usuarios=1, meses=2, gastos_mes=10, presupuestos_mes=2, stdout=io.StringIO())
+        usuario = UsuarioCustom.objects.get(email='sintetico0@ejemplo.cl')
+        self.assertTrue(Transaccion.objects.filter(usuario=usuario).exists())
+        self.assertTrue(Presupuesto.objects.filter(usuario=usuario).exists())
+
+        with tempfile.TemporaryDirectory() as directorio:
+            salida = os.path.join(directorio, 'base.json')
+            call_command('medir_rendimiento', repeticiones=1, salida=salida, stdout=io.StringIO())
+            with open(salida, encoding='utf-8') as archivo:
+                resultado = json.load(archivo)
+            self.assertTrue(resultado['casos'])
+            self.assertFalse([nombre for nombre, caso in resultado['casos'].items() if 'error' in caso])
+
+            # Una línea base con menos consultas hace fallar la comparación
+            for caso in resultado['casos'].values():
+                caso['consultas'] -= 1
+            with open(salida, 'w', encoding='utf-8') as archivo:
+                json.dump(resultado, archivo)
+            with self.assertRaisesMessage(CommandError, 'regresiones'):
+                call_command('medir_rendimiento', repeticiones=1, comparar=salida, stdout=io.StringIO())
+
+    def test_usuario_inexistente(self):
+        with self.assertRaises(CommandError):
+            call_command('medir_rendimiento', usuario='nadie@ejemplo.cl', stdout=io.StringIO())
@@ -0,0 +1,106 @@
+import datetime
+from unittest import mock
+from django.urls import reverse
+from app_finanzas import signals
+from app_finanzas.agregados import reconstruir_resumen
+from app_finanzas.models import Categoria, Presupuesto, ResumenDiario, Transaccion
+from .utils import HOY, DatosBase, crear_usuario
+
+# --- RESUMEN DIARIO (ResumenDiario, ver agregados.py) ---
+
+
+class ResumenDiarioTests(DatosBase):
+
+    def fila(self, categoria_padre, tipo='GASTO', fecha=HOY, usuario=None):
+        return ResumenDiario.objects.filter(
+            usuario=usuario or self.usuario, fecha=fecha, categoria_padre=categoria_padre, tipo=tipo
+        ).first()
+
+    def assertResumenCuadra(self, usuario=None):
+        """Lo mantenido con deltas es igual a reconstruirlo desde las transacciones."""
+        filas = ResumenDiario.objects.filter(usuario=usuario or self.usuario)
+        campos = ('fecha', 'categoria_padre_id', 'tipo', 'total', 'cantidad')
+        antes = set(filas.values_list(*campos))
+        reconstruir_resumen((usuario or self.usuario).pk)
+        self.assertEqual(antes, set(filas.values_list(*campos)))
+
+    def test_agrupa_por_categoria_principal(self):
+        comida = self.fila(self.comida)
+        self.assertEqual((comida.total, comida.cantidad), (10000, 10))
+        self.assertEqual(self.fila(self.ocio).total, 10000)
+        self.assertEqual(self.fila(None, tipo='INGRESO').total, 500000)
+        self.assertResumenCuadra()
+
+    def test_editar_mueve_entre_filas_y_borra_las_vacias(self):
+        ayer = HOY - datetime.timedelta(days=1)
+        gasto = self.gasto(2500, self.super, fecha=ayer)
+        self.assertEqual(self.fila(self.comida, fecha=ayer).cantidad, 1)
+
+        gasto.categoria = self.ocio
+        gasto.save()
+        self.assertIsNone(self.fila(self.comida, fecha=ayer))
+        self.assertEqual(self.fila(self.ocio, fecha=ayer).total, 2500)
+
+        gasto.delete()
+        self.assertIsNone(self.fila(self.ocio, fecha=ayer))
+        self.assertResumenCuadra()
+
+    def test_una_sola_fila_sin_categoria(self):
+        self.gasto(100)
+        self.gasto(200)
+        filas = ResumenDiario.objects.filter(usuario=self.usuario, fecha=HOY, categoria_padre=None, tipo='GASTO')
+        self.assertEqual([(f.total, f.cantidad) for f in filas], [(300, 2)])
+
+    def test_mover_subcategoria_de_padre(self):
+        self.super.categoria_padre = self.ocio
+        self.super.save()
+        self.assertIsNone(self.fila(self.comida))
+        self.assertEqual(self.fila(self.ocio).total, 20000)
+
+    def test_el_dashboard_lee_el_resumen(self):
+        self.client.force_login(self.usuario)
+        datos = self.client.get(reverse('api_dashboard_data')).json()
+        self.assertEqual(float(datos['totales']['gastos']), 20000)
+
+
+class BorrarCategoriaTests(DatosBase):
+
+    def test_borrar_padre_personal_recalcula_una_vez(self):
+        comida_id = self.comida.pk
+        with mock.patch.object(signals, 'reconstruir_resumen', wraps=reconstruir_resumen) as reconstruir:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.comida.delete() # En cascada se va Supermercado
+        reconstruir.assert_called_once_with(self.usuario.pk)
+
+        self.assertFalse(ResumenDiario.objects.filter(categoria_padre_id=comida_id).exists())
+        # Los gastos de Supermercado quedaron sin categoría (SET_NULL)
+        self.assertEqual(ResumenDiario.objects.get(usuario=self.usuario, fecha=HOY, categoria_padre=None, tipo='GASTO').total, 10000)
+        self.assertLibroCuadra()
+
+    def test_borrar_global_recalcula_a_los_usuarios_afectados(self):
+        hogar = Categoria.objects.create(nombre='Hogar')
+        luz = Categoria.objects.create(nombre='Luz', categoria_padre=hogar)
+        beto = crear_usuario('beto@ejemplo.cl')
+        Transaccion.objects.create(usuario=beto, tipo='GASTO', monto=700, fecha=HOY, categoria=luz)
+        self.gasto(300, hogar)
+        del_hogar = Presupuesto.objects.create(usuario=self.usuario, mes=HOY.month, anio=HOY.year, monto_limite=1000, nombre='Hogar')
+        del_hogar.categorias.add(hogar)
+        ajeno = crear_usuario('carla@ejemplo.cl')
+
+        with mock.patch.object(signals, 'reconstruir_resumen', wraps=reconstruir_resumen) as reconstruir:
+            with self.captureOnCommitCallbacks(execute=True):
+                hogar.delete()
+        self.assertEqual(sorted(c.args[0] for c in reconstruir.call_args_list), [self.usuario.pk, beto.pk])
+        self.assertNotIn(ajeno.pk, [c.args[0] for c in reconstruir.call_args_list])
+
+        self.assertEqual(ResumenDiario.objects.get(usuario=beto, categoria_padre=None).total, 700)
+        # Sin categorías, el presupuesto de Hogar pasó a sumar todo el mes
+        del_hogar.refresh_from_db()
+        self.assertEqual(del_hogar.gastado, 20300)
+        self.assertLibroCuadra()
+
+    def test_borrar_cuenta_no_recalcula(self):
+        with mock.patch.object(signals, 'reconstruir_resumen') as reconstruir:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.usuario.delete()
+        reconstruir.assert_not_called()
@@ -0,0 +1,90 @@
+import datetime
+import gzip
+import io
+import json
+import tempfile
+from pathlib import Path
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from app_finanzas.models import WhatsAppLog
+from app_finanzas.retencion_whatsapp import purgar
+from .utils import payload_whatsapp
+
+# --- RETENCIÓN DE WhatsAppLog (ver retencion_whatsapp.py) ---
+
+HACE_UN_ANIO = timezone.now() - datetime.timedelta(days=365)
+
+
+class RetencionTests(TestCase):
+
+    def setUp(self):
+        # Cuatro viejos procesados (uno sin mensaje_id), uno viejo pendiente y uno reciente
+        for i in range(3):
+            self.log(f'wamid.{i}', viejo=True)
+        self.log(None, viejo=True)
+        self.pendiente = self.log('wamid.pendiente', viejo=True, procesado=False)
+        self.reciente = self.log('wamid.reciente')
+
+    def log(self, wamid, viejo=False, procesado=True):
+        log = WhatsAppLog.objects.create(
+            payload=payload_whatsapp('56911112222', wamid or ''), mensaje_id=wamid,
+            telefono='56911112222', procesado=procesado,
+        )
+        if viejo:
+            WhatsAppLog.objects.filter(pk=log.pk).update(fecha_creacion=HACE_UN_ANIO)
+        return log
+
+    def corte(self):
+        return timezone.now() - datetime.timedelta(days=30)
+
+    def assertIntactos(self):
+        for log in (self.pendiente, self.reciente):
+            self.assertEqual(WhatsAppLog.objects.get(pk=log.pk).payload, log.payload)
+
+    def test_compactar_por_lotes(self):
+        stats = purgar(self.corte(), lote=2)
+        self.assertEqual(stats, {'compactados': 3, 'archivados': 0, 'borrados': 1, 'lotes': 2})
+        self.assertEqual(
+            WhatsAppLog.objects.get(mensaje_id='wamid.0').payload,
+            {'compactado': True, 'de': '56911112222', 'tipo': 'text'},
+        )
+        self.assertIntactos()
+        # Ya compactados: una segunda pasada no hace nada
+        self.assertEqual(purgar(self.corte())['compactados'], 0)
+
+    @override_settings(WHATSAPP_PROCESAR_EN_LINEA=False)
+    def test_compactado_sigue_deduplicando(self):
+        purgar(self.corte())
+        respuesta = self.client.post(
+            reverse('webhook_whatsapp'), payload_whatsapp('56911112222', 'wamid.0'), content_type='application/json'
+        )
+        self.assertEqual(respuesta.json(), {'status': 'duplicate'})
+
+    def test_archivar(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            stats = purgar(self.corte(), modo='archivar', directorio=directorio, lote=3)
+            self.assertEqual((stats['archivados'], stats['borrados'], stats['lotes']), (4, 4, 2))
+            archivo = Path(directorio) / f"whatsapp-{HACE_UN_ANIO.strftime('%Y-%m')}.jsonl.gz"
+            with gzip.open(archivo, 'rt', encoding='utf-8') as contenido:
+                lineas = [json.loads(linea) for linea in contenido]
+        self.assertEqual(len(lineas), 4)
+        self.assertEqual(lineas[0]['payload']['entry'][0]['changes'][0]['value']['messages'][0]['id'], 'wamid.0')
+        self.assertEqual(WhatsAppLog.objects.count(), 2)
+        self.assertIntactos()
+
+    def test_borrar(self):
+        self.assertEqual(purgar(self.corte(), modo='borrar')['borrados'], 4)
+        self.assertEqual(set(WhatsAppLog.objects.values_list('pk', flat=True)), {self.pendiente.pk, self.reciente.pk})
+
+    def test_modo_desconocido(self):
+        with self.assertRaises(ValueError):
+            purgar(self.corte(), modo='comprimir')
+
+    def test_comando(self):
+        salida = io.StringIO()
+        call_command('purgar_logs_whatsapp', dias=30, modo='borrar', pausa=0, stdout=salida)
+        self.assertIn('borrados: 4', salida.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('purgar_logs_whatsapp', lote=0, stdout=io.StringIO())
@@ -0,0 +1,76 @@
+import datetime
+import io
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from app_finanzas.api.sync import codificar_cursor
+from app_finanzas.models import Eliminacion, Transaccion
+from .utils import HOY, DatosBase, crear_usuario
+
+# --- SINCRONIZACIÓN INCREMENTAL (ver api/sync.py) ---
+
+
+class SyncTests(DatosBase):
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.usuario)
+        self.url = reverse('api_sync')
+
+    def sync(self, cursor=None):
+        respuesta = self.api.get(self.url, {'since': cursor} if cursor else {})
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        return respuesta.data
+
+    def test_completo_y_luego_incremental(self):
+        inicial = self.sync()
+        self.assertTrue(inicial['completo'])
+        self.assertEqual(len(inicial['transacciones']), 21)
+
+        borrada = Transaccion.objects.filter(usuario=self.usuario).first()
+        borrada_id = borrada.pk
+        borrada.delete()
+        nueva = self.gasto(4000, self.ocio)
+
+        cambios = self.sync(inicial['cursor'])
+        self.assertFalse(cambios['completo'])
+        self.assertIn(nueva.pk, [t['id'] for t in cambios['transacciones']])
+        self.assertEqual(cambios['eliminados']['transacciones'], [borrada_id])
+
+    @override_settings(SYNC_LIMITE=8)
+    def test_por_paginas_sin_saltos_ni_repetidos(self):
+        vistos, cursor, paginas = [], None, 0
+        while True:
+            pagina = self.sync(cursor)
+            vistos += [t['id'] for t in pagina['transacciones']]
+            cursor, paginas = pagina['cursor'], paginas + 1
+            if not pagina['hay_mas']:
+                break
+        self.assertEqual(paginas, 3)
+        self.assertEqual(sorted(vistos), sorted(Transaccion.objects.filter(usuario=self.usuario).values_list('id', flat=True)))
+
+    def test_cursor_mas_viejo_que_las_lapidas_pide_descarga_completa(self):
+        viejo = codificar_cursor(timezone.now() - datetime.timedelta(days=365))
+        self.assertTrue(self.sync(viejo)['completo'])
+
+    def test_rechaza_cursor_ajeno(self):
+        respuesta = self.api.get(self.url, {'since': 'inventado'})
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_no_muestra_lapidas_de_otro_usuario(self):
+        otro = crear_usuario('otro@ejemplo.cl')
+        Transaccion.objects.create(usuario=otro, tipo='GASTO', monto=1, fecha=HOY).delete()
+        cursor = self.sync()['cursor']
+        self.assertEqual(Eliminacion.objects.filter(usuario=otro).count(), 1)
+        self.assertEqual(self.sync(cursor)['eliminados']['transacciones'], [])
+
+    def test_purgar_eliminaciones(self):
+        for transaccion in Transaccion.objects.filter(usuario=self.usuario)[:2]:
+            transaccion.delete()
+        Eliminacion.objects.filter(pk=Eliminacion.objects.order_by('id').first().pk)\
+            .update(eliminado_en=timezone.now() - datetime.timedelta(days=100))
+
+        call_command('purgar_eliminaciones', stdout=io.StringIO())
+        self.assertEqual(Eliminacion.objects.count(), 1)
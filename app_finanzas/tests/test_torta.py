@@ -0,0 +1,64 @@
+from django.urls import reverse
+from rest_framework.test import APIClient
+from app_finanzas.agregados import datos_torta, resumen_mes
+from app_finanzas.models import Categoria, Transaccion
+from .utils import HOY, DatosBase
+
+# --- GRÁFICO DE TORTA (agregados.datos_torta) ---
+
+
+class DatosTortaTests(DatosBase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for nombre, monto in (('Salud', 5000), ('Transporte', 3000), ('Mascotas', 500)):
+            Transaccion.objects.create(
+                usuario=cls.usuario, tipo='GASTO', monto=monto, fecha=HOY,
+                categoria=Categoria.objects.create(nombre=nombre, usuario=cls.usuario)
+            )
+
+    def gastos(self):
+        return Transaccion.objects.filter(usuario=self.usuario, tipo='GASTO')
+
+    def test_agrupa_por_categoria_principal_en_una_consulta(self):
+        self.gasto(250) # Sin categoría
+        with self.assertNumQueries(1):
+            torta = datos_torta(self.gastos())
+        self.assertEqual(torta, [
+            {'name': 'Comida', 'value': 10000.0}, # Supermercado suma en su padre
+            {'name': 'Ocio', 'value': 10000.0},
+            {'name': 'Salud', 'value': 5000.0},
+            {'name': 'Transporte', 'value': 3000.0},
+            {'name': 'Mascotas', 'value': 500.0},
+            {'name': 'Otros', 'value': 250.0},
+        ])
+
+    def test_top_junta_el_resto_en_otros(self):
+        torta = datos_torta(self.gastos(), top=2)
+        self.assertEqual(torta, [
+            {'name': 'Comida', 'value': 10000.0},
+            {'name': 'Ocio', 'value': 10000.0},
+            {'name': 'Otros', 'value': 8500.0},
+        ])
+
+    def test_top_suma_el_resto_a_otros_si_ya_esta(self):
+        self.gasto(20000) # "Otros" (sin categoría) queda entre los principales
+        torta = datos_torta(self.gastos(), top=2)
+        self.assertEqual(torta, [{'name': 'Otros', 'value': 38500.0}, {'name': 'Comida', 'value': 10000.0}])
+
+    def test_top_mayor_que_las_porciones(self):
+        self.assertEqual(len(datos_torta(self.gastos(), top=10)), 5)
+
+    def test_desde_el_resumen_diario_da_lo_mismo(self):
+        resumen = resumen_mes(self.usuario, HOY.year, HOY.month).filter(tipo='GASTO')
+        desde_resumen = datos_torta(resumen, top=3, campos_nombre=('categoria_padre__nombre',), campo_monto='total')
+        self.assertEqual(desde_resumen, datos_torta(self.gastos(), top=3))
+
+    def test_api_valida_top(self):
+        api = APIClient()
+        api.force_authenticate(self.usuario)
+        url = reverse('api_dashboard_data')
+        self.assertEqual(len(api.get(url, {'top': 2}).json()['grafico_torta']), 3)
+        self.assertEqual(api.get(url, {'top': 0}).status_code, 400)
+        self.assertEqual(api.get(url, {'top': 'x'}).status_code, 400)
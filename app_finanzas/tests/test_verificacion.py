@@ -0,0 +1,77 @@
+from unittest import mock
+from django.db import transaction
+from django.test import TestCase
+from app_finanzas import verificacion
+from app_finanzas.al_confirmar import LoteAlConfirmar
+from app_finanzas.models import Alerta, Presupuesto, Transaccion
+from .utils import HOY, crear_usuario
+
+# --- VERIFICACIÓN DIFERIDA DE ALERTAS (verificacion.py / al_confirmar.py) ---
+
+
+class LoteAlConfirmarTests(TestCase):
+
+    def setUp(self):
+        self.procesadas = []
+        self.lote = LoteAlConfirmar(self.procesadas.append)
+
+    def test_dentro_de_un_atomic_espera_y_agrupa(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                for clave in (3, 1, 3, 2, 1):
+                    self.lote.agregar(clave)
+                self.assertEqual(self.procesadas, [])
+        self.assertEqual(self.procesadas, [[1, 2, 3]])
+
+    def test_transaccion_revertida_no_procesa(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.lote.agregar(1)
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(self.procesadas, [])
+
+
+class VerificacionDiferidaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = crear_usuario()
+        cls.presupuesto = Presupuesto.objects.create(usuario=cls.usuario, mes=HOY.month, anio=HOY.year, monto_limite=10000)
+
+    def gastar(self, monto):
+        Transaccion.objects.create(usuario=self.usuario, tipo='GASTO', monto=monto, fecha=HOY)
+
+    def titulos(self):
+        return list(Alerta.objects.filter(usuario=self.usuario).order_by('id').values_list('titulo', flat=True))
+
+    def test_un_periodo_se_revisa_una_vez_al_confirmar(self):
+        with mock.patch.object(verificacion, 'verificar_periodo', wraps=verificacion.verificar_periodo) as verificar:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    for _ in range(30):
+                        self.gastar(300)
+                    verificar.assert_not_called()
+                    self.assertEqual(self.titulos(), [])
+        verificar.assert_called_once_with(self.usuario.pk, HOY.year, HOY.month)
+        self.assertEqual(len(self.titulos()), 1) # 90%: solo el aviso del 80
+
+    def test_sube_de_nivel_sin_repetir_avisos(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.gastar(8000)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.gastar(100) # Sigue en el nivel del 80%
+        with self.captureOnCommitCallbacks(execute=True):
+            self.gastar(2000)
+        self.assertEqual(len(self.titulos()), 2)
+        self.assertIn('Límite Excedido', self.titulos()[-1])
+        self.presupuesto.refresh_from_db()
+        self.assertEqual(self.presupuesto.nivel_alerta_enviado, 3)
+
+    def test_los_ingresos_no_se_revisan(self):
+        with mock.patch.object(verificacion, 'verificar_periodo') as verificar:
+            with self.captureOnCommitCallbacks(execute=True):
+                Transaccion.objects.create(usuario=self.usuario, tipo='INGRESO', monto=50000, fecha=HOY)
+        verificar.assert_not_called()
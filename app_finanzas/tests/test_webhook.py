@@ -0,0 +1,39 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from app_finanzas.models import WhatsAppLog
+from .utils import payload_whatsapp
+
+# --- WEBHOOK DE WHATSAPP: INGESTA IDEMPOTENTE POR messages[0].id ---
+
+
+@override_settings(WHATSAPP_PROCESAR_EN_LINEA=False)
+class WebhookWhatsAppTests(TestCase):
+
+    def setUp(self):
+        self.url = reverse('webhook_whatsapp')
+
+    def enviar(self, payload):
+        return self.client.post(self.url, payload, content_type='application/json')
+
+    def test_reintento_de_meta_no_duplica(self):
+        payload = payload_whatsapp('56911112222', 'wamid.1')
+        self.assertEqual(self.enviar(payload).json(), {'status': 'received'})
+        self.assertEqual(self.enviar(payload).json(), {'status': 'duplicate'})
+        log = WhatsAppLog.objects.get()
+        self.assertEqual((log.mensaje_id, log.telefono, log.procesado), ('wamid.1', '56911112222', False))
+
+    def test_mensajes_distintos_del_mismo_telefono(self):
+        self.enviar(payload_whatsapp('56911112222', 'wamid.1'))
+        self.enviar(payload_whatsapp('56911112222', 'wamid.2', texto='otro'))
+        self.assertEqual(WhatsAppLog.objects.count(), 2)
+
+    def test_sin_id_no_choca(self):
+        payload = payload_whatsapp('56911112222', '')
+        self.assertEqual(self.enviar(payload).json(), {'status': 'received'})
+        self.assertEqual(self.enviar(payload).json(), {'status': 'received'})
+        self.assertEqual(WhatsAppLog.objects.filter(mensaje_id=None).count(), 2)
+
+    def test_callbacks_de_estado_no_se_guardan(self):
+        estado = {"entry": [{"changes": [{"value": {"statuses": [{"id": "wamid.1", "status": "read"}]}}]}]}
+        self.assertEqual(self.enviar(estado).json(), {'status': 'ignored'})
+        self.assertFalse(WhatsAppLog.objects.exists())
@@ -0,0 +1,97 @@
+import datetime
+from collections import Counter
+from contextlib import contextmanager
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from presuApp.instrumentacion import huella, presupuesto_de
+from usuarios.models import UsuarioCustom
+from app_finanzas.models import Categoria, Presupuesto, Transaccion
+from app_finanzas.agregados import calcular_gastado
+
+# --- AYUDA PARA TESTS ---
+
+HOY = datetime.date.today()
+
+
+@contextmanager
+def limite_consultas(maximo=None, vista=None, using='default'):
+    """
+    Falla (AssertionError) si el bloque ejecuta más consultas que `maximo` o que el
+    presupuesto configurado para `vista` (PRESUPUESTO_CONSULTAS). Muestra las consultas
+    más repetidas.
+
+        with limite_consultas(vista='mis_gastos'):
+            client.get(reverse('mis_gastos'))
+    """
+    limite = maximo if maximo is not None else presupuesto_de(vista)
+    with CaptureQueriesContext(connections[using]) as capturadas:
+        yield capturadas
+
+    if len(capturadas) > limite:
+        repetidas = Counter(huella(q['sql']) for q in capturadas.captured_queries).most_common(5)
+        detalle = '\n'.join(f'  {veces}x {sql[:200]}' for sql, veces in repetidas)
+        raise AssertionError(
+            f"{vista or 'Bloque'}: {len(capturadas)} consultas, el presupuesto es {limite}.\n{detalle}"
+        )
+
+
+def verificar_presupuesto_vista(client, url, metodo='get', **kwargs):
+    """Hace el request con `client` y verifica el presupuesto de la vista que resuelve `url`."""
+    vista = resolve(url.split('?')[0]).view_name
+    with limite_consultas(vista=vista):
+        return getattr(client, metodo)(url, **kwargs)
+
+
+def crear_usuario(email='ana@ejemplo.cl', telefono=None):
+    return UsuarioCustom.objects.create_user(username=email, email=email, password='clave-segura-123', numero_telefono=telefono)
+
+
+def payload_whatsapp(telefono, wamid, texto='hola'):
+    """Lo mínimo de un webhook de Meta con un mensaje de texto."""
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{"id": "prueba", "changes": [{"field": "messages", "value": {
+            "messaging_product": "whatsapp",
+            "messages": [{"from": telefono, "id": wamid, "type": "text", "text": {"body": texto}}],
+        }}]}],
+    }
+
+
+class CacheCompartidaMixin:
+    """Como en producción con Redis: activa las cachés y los sellos (CACHE_COMPARTIDA), desde cero."""
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(override_settings(CACHE_COMPARTIDA=True))
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+
+class DatosBase(TestCase):
+    """Un usuario con una categoría padre, una hija, gastos del mes y dos presupuestos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = crear_usuario()
+        cls.comida = Categoria.objects.create(nombre='Comida', usuario=cls.usuario)
+        cls.super = Categoria.objects.create(nombre='Supermercado', usuario=cls.usuario, categoria_padre=cls.comida)
+        cls.ocio = Categoria.objects.create(nombre='Ocio', usuario=cls.usuario)
+        cls.global_mes = Presupuesto.objects.create(usuario=cls.usuario, mes=HOY.month, anio=HOY.year, monto_limite=100000)
+        cls.de_comida = Presupuesto.objects.create(usuario=cls.usuario, mes=HOY.month, anio=HOY.year, monto_limite=50000, nombre='Comida')
+        cls.de_comida.categorias.add(cls.comida)
+        for i in range(20):
+            Transaccion.objects.create(
+                usuario=cls.usuario, tipo='GASTO', monto=1000, fecha=HOY,
+                categoria=cls.super if i % 2 else cls.ocio, descripcion=f'gasto {i}'
+            )
+        Transaccion.objects.create(usuario=cls.usuario, tipo='INGRESO', monto=500000, fecha=HOY, descripcion='sueldo')
+
+    def gasto(self, monto, categoria=None, fecha=HOY):
+        return Transaccion.objects.create(usuario=self.usuario, tipo='GASTO', monto=monto, fecha=fecha, categoria=categoria)
+
+    def assertLibroCuadra(self):
+        for presupuesto in Presupuesto.objects.filter(usuario=self.usuario):
+            self.assertEqual(presupuesto.gastado, calcular_gastado(presupuesto), presupuesto.nombre)
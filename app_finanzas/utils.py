@@ -0,0 +1,33 @@
+import datetime
+
+def rango_mes(anio, mes):
+    """
+    Rango semiabierto [inicio, fin) de un mes, para filtrar con fecha__gte / fecha__lt.
+    A diferencia de fecha__month / fecha__year (que aplican una función sobre la columna),
+    así la BD puede usar los índices compuestos que empiezan por (usuario, fecha).
+    """
+    inicio = datetime.date(anio, mes, 1)
+    if mes == 12:
+        fin = datetime.date(anio + 1, 1, 1)
+    else:
+        fin = datetime.date(anio, mes + 1, 1)
+    return inicio, fin
+
+
+def validar_periodo(anio, mes):
+    """(anio, mes) como enteros; ValueError si no es un mes que rango_mes() pueda armar."""
+    anio, mes = int(anio), int(mes)
+    if not 1 <= mes <= 12:
+        raise ValueError(f"Mes inválido: {mes}")
+    # El fin del rango es el 1 de enero siguiente: 9999-12 ya no cabe en un date
+    if not 1 <= anio <= 9998:
+        raise ValueError(f"Año inválido: {anio}")
+    return anio, mes
+
+
+def parsear_mes(texto):
+    """'AAAA-MM' -> (anio, mes). Retorna None si viene vacío; ValueError si es inválido."""
+    if not texto:
+        return None
+    anio, mes = texto.split('-')
+    return validar_periodo(anio, mes)
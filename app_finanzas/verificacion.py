@@ -0,0 +1,109 @@
+import logging
+from presuApp.metricas import ALERTAS_GENERADAS
+from .models import Presupuesto, Alerta
+from .al_confirmar import LoteAlConfirmar
+
+logger = logging.getLogger(__name__)
+
+# --- VERIFICACIÓN DIFERIDA DE ALERTAS DE PRESUPUESTO ---
+# Antes cada save() de un gasto revisaba en el acto todos los presupuestos del mes.
+# Ahora solo se anota la clave (usuario, año, mes) y la revisión corre UNA vez por clave
+# cuando la transacción de la BD se confirma (transaction.on_commit). Dentro de un
+# atomic() (importaciones, ediciones masivas, reasignación de categorías) 1.000 gastos
+# del mismo mes se revisan una sola vez; fuera de un atomic() corre al instante.
+#
+# Los niveles se guardan en Presupuesto.nivel_alerta_enviado, así que revisar de más un
+# periodo no genera alertas repetidas.
+
+
+def _verificar_periodos(claves):
+    for usuario_id, anio, mes in claves:
+        verificar_periodo(usuario_id, anio, mes)
+
+
+_lote = LoteAlConfirmar(_verificar_periodos)
+
+
+def encolar_verificacion(usuario_id, anio, mes, using=None):
+    """Pide revisar las alertas de los presupuestos de ese periodo al confirmar la transacción."""
+    _lote.agregar((usuario_id, anio, mes), using=using)
+
+
+def verificar_periodo(usuario_id, anio, mes):
+    """Revisa los niveles de alerta de todos los presupuestos del usuario en ese mes."""
+    # El total gastado ya viene del libro (Presupuesto.gastado), sin agregaciones
+    for presupuesto in Presupuesto.objects.filter(usuario_id=usuario_id, anio=anio, mes=mes):
+        verificar_niveles_alerta(presupuesto)
+
+
+def verificar_limite(presupuesto):
+    # 1. Total gastado en ese presupuesto (libro mantenido por las señales)
+    total_gastado = presupuesto.gastado
+
+    # 2. Comparar
+    if total_gastado > presupuesto.monto_limite:
+        diferencia = total_gastado - presupuesto.monto_limite
+        
+        # 3. Crear o Actualizar Alerta (Para no llenar de spam, buscamos si ya existe una alerta hoy)
+        titulo = f"⚠️ Límite Excedido: {presupuesto.nombre}"
+        mensaje = (f"Has superado tu presupuesto de ${presupuesto.monto_limite:,.0f} "
+                   f"por un monto de ${diferencia:,.0f}. "
+                   f"Total gastado: ${total_gastado:,.0f}")
+
+        # Buscamos si ya existe una alerta no leída para este presupuesto
+        # (Esto es opcional, evita crear 10 alertas si compras 10 chicles seguidos estando excedido)
+        Alerta.objects.create(
+            usuario_id=presupuesto.usuario_id,
+            titulo=titulo,
+            mensaje=mensaje,
+            leida=False
+        )
+        ALERTAS_GENERADAS.inc(nivel='limite')
+        logger.info("alerta_generada", extra={'usuario_id': presupuesto.usuario_id, 'presupuesto_id': presupuesto.pk, 'nivel': 'limite'})
+
+def verificar_niveles_alerta(presupuesto):
+    # 1. Total gastado (ya actualizado por actualizar_libro_presupuestos)
+    total_gastado = presupuesto.gastado
+
+    # 2. Calcular porcentaje
+    limite = presupuesto.monto_limite
+    if limite <= 0: return
+
+    porcentaje = (total_gastado / limite) * 100
+    
+    # 3. Determinar nivel actual
+    nuevo_nivel = 0
+    titulo = ""
+    mensaje = ""
+
+    if porcentaje >= 100:
+        nuevo_nivel = 3
+        titulo = f"🚨 Límite Excedido: {presupuesto.nombre}"
+        mensaje = f"Has superado el 100% de tu presupuesto. Total: ${total_gastado:,.0f} / ${limite:,.0f}"
+    
+    elif porcentaje >= 95:
+        nuevo_nivel = 2
+        titulo = f"⚠️ Peligro (95%): {presupuesto.nombre}"
+        mensaje = f"Estás a punto de agotar tu presupuesto. Llevas gastado ${total_gastado:,.0f}."
+    
+    elif porcentaje >= 80:
+        nuevo_nivel = 1
+        titulo = f"📢 Atención (80%): {presupuesto.nombre}"
+        mensaje = f"Ya consumiste el 80% de tu presupuesto. Llevas ${total_gastado:,.0f}."
+
+    # 4. Enviar Alerta SOLO si subimos de nivel (Anti-Spam)
+    if nuevo_nivel > 0 and nuevo_nivel > presupuesto.nivel_alerta_enviado:
+        
+        Alerta.objects.create(
+            usuario_id=presupuesto.usuario_id,
+            titulo=titulo,
+            mensaje=mensaje,
+            leida=False
+        )
+        
+        # Actualizamos el presupuesto para recordar que ya avisamos este nivel
+        presupuesto.nivel_alerta_enviado = nuevo_nivel
+        presupuesto.save(update_fields=['nivel_alerta_enviado'])
+        
+        ALERTAS_GENERADAS.inc(nivel=nuevo_nivel)
+        logger.info("alerta_generada", extra={'usuario_id': presupuesto.usuario_id, 'presupuesto_id': presupuesto.pk, 'nivel': nuevo_nivel})
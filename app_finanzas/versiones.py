@@ -0,0 +1,60 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from .al_confirmar import LoteAlConfirmar
+
+# --- SELLOS DE VERSIÓN POR USUARIO ---
+# Un sello es el instante (en nanosegundos) de la última escritura que cambió un grupo de
+# datos de un usuario. Viven en la caché de Django y los mueven las señales al confirmar
+# la transacción de la BD. Sirven para:
+#   - saber si una copia en memoria sigue vigente (cache_categorias.py)
+#   - armar ETag / Last-Modified y responder 304 sin consultar la BD (api/condicional.py)
+#
+# Si un sello se pierde de la caché se crea uno nuevo con la hora actual: a lo más se
+# invalida de más, nunca se sirve algo viejo como vigente.
+#
+# Solo sirven si la caché es compartida (CACHE_COMPARTIDA): con una caché por proceso, una
+# escritura del worker de la cola o de otra instancia movería el sello solo allá y aquí se
+# seguiría respondiendo 304 / sirviendo copias viejas. Quien los use debe preguntar
+# compartidos() y, si no, ir directo a la BD.
+
+FINANZAS = 'finanzas'     # Transacciones y presupuestos (incluye el libro y el resumen diario)
+CATEGORIAS = 'categorias' # Árbol de categorías (usuario None = globales)
+
+
+def compartidos():
+    return settings.CACHE_COMPARTIDA
+
+
+def _clave(recurso, usuario_id=None):
+    return f"version:{recurso}:{usuario_id or 'global'}"
+
+
+def actuales(pares):
+    """[(recurso, usuario_id), ...] -> [sello, ...] en el mismo orden (una ida a la caché)."""
+    claves = [_clave(recurso, usuario_id) for recurso, usuario_id in pares]
+    encontrados = cache.get_many(claves)
+    for clave in claves:
+        if clave not in encontrados:
+            cache.add(clave, time.time_ns(), timeout=None)
+            encontrados[clave] = cache.get(clave)
+    return [encontrados[clave] for clave in claves]
+
+
+def actual(recurso, usuario_id=None):
+    return actuales([(recurso, usuario_id)])[0]
+
+
+def _mover(claves):
+    for clave in claves:
+        # Nunca hacia atrás (relojes distintos entre servidores): Last-Modified debe crecer
+        anterior = cache.get(clave) or 0
+        cache.set(clave, max(time.time_ns(), anterior + 1), timeout=None)
+
+
+_lote = LoteAlConfirmar(_mover)
+
+
+def marcar(recurso, usuario_id=None, using=None):
+    """Mueve el sello al confirmar la transacción de la BD (de inmediato si no hay una abierta)."""
+    _lote.agregar(_clave(recurso, usuario_id), using=using)
@@ -3,19 +3,32 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .forms import TransaccionForm, CategoriaForm, PresupuestoForm
 from .models import Transaccion, Categoria, Presupuesto
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponseBadRequest
 from django.db.models import Q
 from django.utils import timezone
 import datetime
 import calendar
 from django.shortcuts import render, redirect, get_object_or_404
-from django.db.models import Sum
 from .models import Alerta
+from .agregados import progreso_presupuestos
+from .cache_categorias import arbol_usuario
+from .cache_alertas import refrescar as refrescar_resumen_alertas
+from .verificacion import encolar_verificacion
+from .exportador import (
+    FORMATOS, ENCABEZADO_TRANSACCIONES, ENCABEZADO_REPORTE,
+    filas_transacciones, filas_reporte_presupuestos, respuesta_exportacion
+)
+from .utils import parsear_mes
+from django.db import transaction
 
 
 # Create your views here.
-@login_required
-def mis_gastos_view(request):
+def filtros_mis_gastos(request):
+    """
+    Lee los filtros de mis_gastos (?filtro, fecha_inicio, fecha_fin, categoria) y arma el
+    QuerySet. Lo comparten la página y la exportación, así el archivo trae lo mismo que se ve.
+    Retorna (transacciones, filtro, inicio, fin, categoria_id).
+    """
     hoy = timezone.now().date()
     # Por defecto: Primer día del mes actual hasta hoy
 
@@ -66,15 +79,13 @@ def mis_gastos_view(request):
     transacciones = Transaccion.objects.filter(
         usuario=request.user,
         fecha__range=[inicio, fin]
-    ).order_by('-fecha')
-    
-    categorias_jerarquia = Categoria.objects.filter(
-        Q(usuario=None) | Q(usuario=request.user),
-        categoria_padre=None # Solo padres
-    ).prefetch_related('subcategorias').order_by('nombre')
+    )
 
     # Verificamos si hay una selección en la URL (?categoria=5)
-    categoria_id = request.GET.get('categoria')
+    try:
+        categoria_id = int(request.GET.get('categoria') or 0) or None
+    except ValueError:
+        categoria_id = None
 
     if categoria_id:
         # Filtramos: Coincidencia exacta (si eligió subcategoría o un padre directo)
@@ -83,12 +94,17 @@ def mis_gastos_view(request):
             Q(categoria_id=categoria_id) | 
             Q(categoria__categoria_padre_id=categoria_id)
         )
-        try:
-            categoria_id = int(categoria_id) 
-        except:
-            categoria_id = None
 
-    transacciones = transacciones.order_by('-fecha')
+    return transacciones.order_by('-fecha'), filtro, inicio, fin, categoria_id
+
+
+@login_required
+def mis_gastos_view(request):
+    transacciones, filtro, inicio, fin, categoria_id = filtros_mis_gastos(request)
+    transacciones = transacciones.select_related('categoria__categoria_padre')
+
+    # Padres con sus hijas visibles (globales + del usuario), desde la caché del árbol
+    categorias_jerarquia = obtener_jerarquia_categorias(request.user)
 
     context = {
         'transacciones': transacciones,
@@ -152,15 +168,11 @@ def categorias_view(request):
 def load_subcategorias(request):
     padre_id = request.GET.get('padre_id')
     
-    # Filtramos: Que sean hijas de ese padre Y (que sean globales O del usuario)
-    subcategorias = Categoria.objects.filter(
-        categoria_padre_id=padre_id
-    ).filter(
-        Q(usuario=None) | Q(usuario=request.user)
-    ).order_by('nombre')
+    # Hijas de ese padre visibles para el usuario (globales + propias), ya ordenadas
+    subcategorias = arbol_usuario(request.user).hijas(padre_id) if padre_id else []
     
     # Retornamos solo los datos necesarios (id y nombre) en formato JSON
-    data = list(subcategorias.values('id', 'nombre'))
+    data = [{'id': c.id, 'nombre': c.nombre} for c in subcategorias]
     return JsonResponse(data, safe=False)
 
 @login_required
@@ -196,16 +208,24 @@ def eliminar_categoria_view(request, id):
     # Si por alguna razón no existe "General", usamos la Categoría Padre como fallback (opcional)
     # o simplemente no reasignamos (quedarían en NULL si el modelo lo permite).
     
-    if categoria_destino:
-        # 3. REASIGNACIÓN MASIVA
-        # Buscamos todas las transacciones que tenían la categoría vieja
-        # y las actualizamos a la categoría destino.
-        conteo = Transaccion.objects.filter(categoria=categoria_a_borrar).update(categoria=categoria_destino)
+    # Todo en una transacción: las alertas de presupuesto se revisan una vez al confirmar
+    with transaction.atomic():
+        if categoria_destino:
+            # 3. REASIGNACIÓN MASIVA
+            # Buscamos todas las transacciones que tenían la categoría vieja
+            # y las actualizamos a la categoría destino.
+            afectadas = Transaccion.objects.filter(categoria=categoria_a_borrar)
+
+            # .update() no dispara señales: encolamos a mano la revisión de cada mes tocado
+            for mes in afectadas.filter(tipo='GASTO').dates('fecha', 'month'):
+                encolar_verificacion(request.user.pk, mes.year, mes.month)
+
+            conteo = afectadas.update(categoria=categoria_destino, actualizado_en=timezone.now())
+            
+            messages.info(request, f'Se reasignaron {conteo} transacciones a "{categoria_destino.nombre}".')
         
-        messages.info(request, f'Se reasignaron {conteo} transacciones a "{categoria_destino.nombre}".')
-    
-    # 4. Eliminar
-    categoria_a_borrar.delete()
+        # 4. Eliminar (las señales de Categoria recalculan el libro y el resumen diario)
+        categoria_a_borrar.delete()
     messages.success(request, 'Categoría eliminada correctamente.')
     
     return redirect('categorias')
@@ -236,70 +256,48 @@ def eliminar_gasto_view(request, id):
 
 @login_required
 def lista_presupuestos_view(request):
-    # Obtenemos los presupuestos del usuario ordenados por fecha
-    presupuestos = Presupuesto.objects.filter(usuario=request.user).order_by('-anio', '-mes')
+    # Obtenemos los presupuestos del usuario ordenados por fecha.
+    # Las categorías se traen en bloque para el template (badges y conteo)
+    presupuestos = Presupuesto.objects.filter(usuario=request.user).order_by('-anio', '-mes')\
+        .prefetch_related('categorias__categoria_padre')
     
-    # Creamos una lista auxiliar para mandar al template con los cálculos ya hechos
-    datos_presupuestos = []
-
-    for p in presupuestos:
-        cats_seleccionadas = p.categorias.all()
-        # Definimos el rango de fechas de ese presupuesto (Mes completo)
-        # Nota: Usamos una lógica simple de año/mes
-        gastos_query = Transaccion.objects.filter(
-            usuario=request.user,
-            tipo='GASTO',
-            fecha__year=p.anio,
-            fecha__month=p.mes
-        )
-
-        # Filtramos por categoría si es específico
-        if cats_seleccionadas.exists():
-            # Si seleccionó categorías, filtramos:
-            # Gastos que pertenezcan a las seleccionadas DIRECTAMENTE
-            # O gastos cuya categoria_padre esté en las seleccionadas
-            gastos_query = gastos_query.filter(
-                Q(categoria__in=cats_seleccionadas) | 
-                Q(categoria__categoria_padre__in=cats_seleccionadas)
-            )
-        else:
-            # Si NO seleccionó ninguna categoría, asumimos que es un 
-            # PRESUPUESTO GENERAL (Todos los gastos del mes)
-            pass
-        
-        # Sumamos el total gastado (si es None, lo convertimos a 0)
-        total_gastado = gastos_query.aggregate(Sum('monto'))['monto__sum'] or 0
-        
-        # Calculamos porcentaje para la barra de progreso
-        porcentaje = 0
-        if p.monto_limite > 0:
-            # CAMBIO: Usamos int() para redondear y quitar decimales aquí mismo
-            calculo_raw = (total_gastado * 100) / p.monto_limite
-            porcentaje = int(calculo_raw)
-        
-        # Guardamos todo en un diccionario
-        datos_presupuestos.append({
-            'presupuesto': p,
-            'gastado': total_gastado,
-            # CAMBIO: Ya no necesitamos min() aquí si queremos saber cuánto se pasó,
-            # pero para la barra visual (width) sí necesitamos un tope.
-            # Vamos a pasar dos variables: una para la barra y otra real.
-            'porcentaje': porcentaje, 
-            'porcentaje_visual': min(porcentaje, 100), # Tope visual para el CSS
-            'excedido': porcentaje > 100,
-            'restante': p.monto_limite - total_gastado
-        })
+    # Cálculos de progreso (gastado, porcentaje, restante) sin consultas por presupuesto
+    datos_presupuestos = progreso_presupuestos(presupuestos)
 
     return render(request, 'finanzas/presupuestos.html', {'datos': datos_presupuestos})
 
+@login_required
+def exportar_gastos_view(request):
+    # Mismos filtros que la página (?filtro, fechas, categoria) + ?formato=csv|xlsx
+    formato = request.GET.get('formato', 'csv')
+    if formato not in FORMATOS:
+        return HttpResponseBadRequest('Formato no soportado.')
+
+    transacciones, filtro, inicio, fin, categoria_id = filtros_mis_gastos(request)
+    nombre = f"transacciones_{inicio:%Y%m%d}_{fin:%Y%m%d}"
+    return respuesta_exportacion(
+        ENCABEZADO_TRANSACCIONES, filas_transacciones(transacciones), formato, nombre, hoja='Transacciones'
+    )
+
+@login_required
+def exportar_presupuestos_view(request):
+    # Reporte mensual presupuesto vs. real (?desde=AAAA-MM&hasta=AAAA-MM opcionales)
+    formato = request.GET.get('formato', 'csv')
+    if formato not in FORMATOS:
+        return HttpResponseBadRequest('Formato no soportado.')
+    try:
+        desde = parsear_mes(request.GET.get('desde'))
+        hasta = parsear_mes(request.GET.get('hasta'))
+    except ValueError:
+        return HttpResponseBadRequest('Use el formato AAAA-MM para desde/hasta.')
+
+    filas = filas_reporte_presupuestos(request.user, desde, hasta)
+    return respuesta_exportacion(ENCABEZADO_REPORTE, filas, formato, 'reporte_presupuestos', hoja='Presupuestos')
+
 def obtener_jerarquia_categorias(user):
-    # Traemos todos los PADRES (Globales o del Usuario)
-    # prefetch_related optimiza la consulta de los hijos para no matar la BD
-    padres = Categoria.objects.filter(
-        Q(usuario=None) | Q(usuario=user),
-        categoria_padre=None
-    ).prefetch_related('subcategorias').order_by('nombre')
-    return padres
+    # Padres (Globales o del Usuario) con sus hijas visibles en `.hijas`.
+    # Sale de la caché del árbol: no toca la BD salvo que alguna categoría haya cambiado
+    return arbol_usuario(user).jerarquia
 
 @login_required
 def crear_presupuesto_view(request):
@@ -420,4 +418,6 @@ def marcar_alerta_leida_view(request, id):
 @login_required
 def limpiar_alertas_view(request):
     Alerta.objects.filter(usuario=request.user, leida=False).update(leida=True)
+    # .update() no dispara señales: actualizamos la campanita a mano
+    refrescar_resumen_alertas(request.user.pk)
     return redirect(request.META.get('HTTP_REFERER', 'dashboard'))
\ No newline at end of file
@@ -0,0 +1,85 @@
+import threading
+from collections import defaultdict
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+
+# --- BACKENDS DE CACHÉ CON CONTADORES ---
+# Los mismos backends de Django, pero contando aciertos y fallos de lectura por "espacio"
+# (lo que va antes del primer ':' de la clave: version, alertas, dashboard...) para poder
+# ver si la caché está sirviendo. Los contadores son del proceso (cada worker los suyos).
+# Se eligen en settings.py según CACHE_URL.
+
+_lock = threading.Lock()
+_contadores = defaultdict(lambda: [0, 0]) # espacio -> [aciertos, fallos]
+_AUSENTE = object()
+_anidado = threading.local()
+
+# Claves de Django que no siguen el formato espacio:resto
+_ESPACIOS_DJANGO = {
+    'django.contrib.sessions': 'sesiones',
+}
+
+
+def _espacio(clave):
+    clave = str(clave)
+    for prefijo, nombre in _ESPACIOS_DJANGO.items():
+        if clave.startswith(prefijo):
+            return nombre
+    return clave.split(':', 1)[0] if ':' in clave else 'otros'
+
+
+def _registrar(claves, aciertos):
+    with _lock:
+        for clave in claves:
+            _contadores[_espacio(clave)][0 if clave in aciertos else 1] += 1
+
+
+def estadisticas():
+    """{espacio: {'aciertos', 'fallos', 'tasa_aciertos'}} desde que partió el proceso."""
+    with _lock:
+        copia = {espacio: tuple(valores) for espacio, valores in _contadores.items()}
+    return {
+        espacio: {
+            'aciertos': aciertos,
+            'fallos': fallos,
+            'tasa_aciertos': round(aciertos / (aciertos + fallos), 4) if aciertos + fallos else None,
+        }
+        for espacio, (aciertos, fallos) in sorted(copia.items())
+    }
+
+
+def reiniciar_estadisticas():
+    with _lock:
+        _contadores.clear()
+
+
+class ContadoresMixin:
+    def get(self, key, default=None, version=None):
+        valor = super().get(key, _AUSENTE, version=version)
+        if not getattr(_anidado, 'activo', False):
+            _registrar([key], () if valor is _AUSENTE else (key,))
+        return default if valor is _AUSENTE else valor
+
+    def get_many(self, keys, version=None):
+        # En locmem / archivo, get_many llama a get() por clave: contamos solo aquí
+        keys = list(keys)
+        _anidado.activo = True
+        try:
+            encontrados = super().get_many(keys, version=version)
+        finally:
+            _anidado.activo = False
+        _registrar(keys, encontrados)
+        return encontrados
+
+
+class LocMemConContadores(ContadoresMixin, LocMemCache):
+    pass
+
+
+class ArchivoConContadores(ContadoresMixin, FileBasedCache):
+    pass
+
+
+class RedisConContadores(ContadoresMixin, RedisCache):
+    pass
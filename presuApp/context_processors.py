@@ -1,14 +1,16 @@
-from app_finanzas.models import Alerta
+from django.utils.functional import SimpleLazyObject
+from app_finanzas.cache_alertas import obtener_resumen
 
 def contador_alertas(request):
     if request.user.is_authenticated:
-        # Contamos solo las NO leídas
-        count = Alerta.objects.filter(usuario=request.user, leida=False).count()
-        # Traemos las ultimas 5 para mostrar en el dropdown (opcional)
-        alertas_recientes = Alerta.objects.filter(usuario=request.user, leida=False).order_by('-fecha_creacion')[:5]
-        
+        # Perezoso: la caché (o la BD) solo se consulta si el template usa notificaciones_*
+        usuario_id = request.user.pk
+        resumen = SimpleLazyObject(lambda: obtener_resumen(usuario_id))
+
         return {
-            'notificaciones_count': count,
-            'notificaciones_list': alertas_recientes
+            # Contamos solo las NO leídas
+            'notificaciones_count': SimpleLazyObject(lambda: resumen['total']),
+            # Las ultimas 5 para mostrar en el dropdown
+            'notificaciones_list': SimpleLazyObject(lambda: resumen['recientes'])
         }
-    return {'notificaciones_count': 0}
\ No newline at end of file
+    return {'notificaciones_count': 0}
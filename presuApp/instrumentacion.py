@@ -0,0 +1,101 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+# --- INSTRUMENTACIÓN SQL POR REQUEST ---
+# Middleware opcional (INSTRUMENTACION_SQL=True) que mide por request:
+#   - cantidad de consultas y tiempo total en SQL
+#   - consultas repetidas por "huella" (el SQL sin valores): el síntoma de un N+1
+#   - tiempo total de la vista
+# y lo deja en el header Server-Timing (visible en las DevTools del navegador) y en un
+# evento de log 'request_sql' con esos campos. Si la vista pasa su presupuesto de consultas
+# (PRESUPUESTO_CONSULTAS) el log sale como WARNING con las huellas más repetidas.
+#
+# Ojo: en las respuestas en streaming (exportaciones) las consultas corren después de que
+# el middleware termina, así que no se cuentan.
+
+logger = logging.getLogger(__name__)
+
+_LISTA_IN = re.compile(r'\((?:%s, )+%s\)')
+_ESPACIOS = re.compile(r'\s+')
+
+
+def huella(sql):
+    """SQL sin valores ni largo de las listas IN: iguales = misma consulta con otros parámetros."""
+    return _ESPACIOS.sub(' ', _LISTA_IN.sub('(%s, ...)', sql)).strip()
+
+
+def presupuesto_de(vista):
+    """Máximo de consultas permitido para una vista (por nombre de URL)."""
+    return settings.PRESUPUESTO_CONSULTAS.get(vista, settings.PRESUPUESTO_CONSULTAS_DEFECTO)
+
+
+class Recolector:
+    """execute_wrapper de Django: anota cada consulta de la conexión mientras está instalado."""
+
+    def __init__(self):
+        self.cantidad = 0
+        self.tiempo = 0.0
+        self.huellas = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tiempo += time.perf_counter() - inicio
+            self.cantidad += 1
+            self.huellas[huella(sql)] += 1
+
+    def repetidas(self, maximo=5):
+        return [(sql, veces) for sql, veces in self.huellas.most_common(maximo) if veces > 1]
+
+
+class InstrumentacionSQLMiddleware:
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTACION_SQL:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recolector = Recolector()
+        inicio = time.perf_counter()
+        with ExitStack() as pila:
+            # all() solo arma los objetos de conexión del hilo (no conecta): así también se
+            # miden las conexiones que se abran recién durante el request
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(recolector))
+            response = self.get_response(request)
+        total = time.perf_counter() - inicio
+
+        match = getattr(request, 'resolver_match', None)
+        vista = match.view_name if match else ''
+        limite = presupuesto_de(vista)
+        excedido = recolector.cantidad > limite
+
+        response['Server-Timing'] = ', '.join([
+            f'sql;dur={recolector.tiempo * 1000:.1f};desc="{recolector.cantidad} consultas"',
+            f'vista;dur={total * 1000:.1f}',
+        ])
+
+        datos = {
+            'metodo': request.method,
+            'ruta': request.path,
+            'vista': vista,
+            'estado': response.status_code,
+            'consultas': recolector.cantidad,
+            'sql_ms': round(recolector.tiempo * 1000, 1),
+            'vista_ms': round(total * 1000, 1),
+            'presupuesto': limite,
+        }
+        if excedido:
+            datos['repetidas'] = [{'sql': sql[:300], 'veces': veces} for sql, veces in recolector.repetidas()]
+        logger.log(logging.WARNING if excedido else logging.INFO, 'request_sql', extra=datos)
+        return response
+
@@ -0,0 +1,177 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+# --- MÉTRICAS (formato de texto de Prometheus en /metrics) ---
+# Contadores e histogramas en memoria, sin dependencias. Son del proceso: cada worker de
+# gunicorn expone los suyos (igual que las estadísticas de presuApp/cache.py), así que el
+# scraper debe apuntar a cada instancia. /metrics solo responde a METRICAS_IPS (por defecto
+# localhost, ej: un sidecar en Cloud Run) o a quien mande "Authorization: Bearer METRICAS_TOKEN".
+
+_registro = []
+
+# Segundos: de 5 ms a 10 s (webhook, Graph API)
+CUBETAS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _etiquetas(nombres, valores, extra=()):
+    pares = [*zip(nombres, valores), *extra]
+    if not pares:
+        return ''
+    return '{%s}' % ','.join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in pares)
+
+
+def _numero(valor):
+    if valor == math.inf:
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Metrica:
+    tipo = ''
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+        self._series = {}
+        _registro.append(self)
+
+    def _clave(self, etiquetas):
+        if set(etiquetas) != set(self.etiquetas):
+            raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}, no {tuple(etiquetas)}")
+        return tuple(str(etiquetas[nombre]) for nombre in self.etiquetas)
+
+    def lineas(self):
+        yield f'# HELP {self.nombre} {self.ayuda}'
+        yield f'# TYPE {self.nombre} {self.tipo}'
+        with self._lock:
+            series = {clave: self._copiar(valor) for clave, valor in self._series.items()}
+        if not series and not self.etiquetas:
+            series = {(): self._vacia()}
+        for clave, valor in sorted(series.items()):
+            yield from self._lineas_serie(clave, valor)
+
+
+class Contador(_Metrica):
+    tipo = 'counter'
+
+    def inc(self, cantidad=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._series[clave] = self._series.get(clave, 0) + cantidad
+
+    def _vacia(self):
+        return 0
+
+    def _copiar(self, valor):
+        return valor
+
+    def _lineas_serie(self, clave, valor):
+        yield f'{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}'
+
+
+class Histograma(_Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), cubetas=CUBETAS_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.cubetas = tuple(sorted(cubetas)) + (math.inf,)
+
+    def observar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = self._vacia()
+            for i, limite in enumerate(self.cubetas):
+                if valor <= limite:
+                    serie[0][i] += 1
+                    break
+            serie[1] += valor
+            serie[2] += 1
+
+    @contextmanager
+    def medir(self, **etiquetas):
+        """Observa los segundos que tarda el bloque. Las etiquetas se pueden completar dentro."""
+        inicio = time.perf_counter()
+        try:
+            yield etiquetas
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+    def _vacia(self):
+        return [[0] * len(self.cubetas), 0.0, 0] # [por cubeta, suma, cantidad]
+
+    def _copiar(self, valor):
+        return [list(valor[0]), valor[1], valor[2]]
+
+    def _lineas_serie(self, clave, valor):
+        por_cubeta, suma, cantidad = valor
+        acumulado = 0
+        for limite, n in zip(self.cubetas, por_cubeta):
+            acumulado += n
+            yield f'{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, [("le", _numero(limite))])} {acumulado}'
+        yield f'{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(suma)}'
+        yield f'{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {cantidad}'
+
+
+# --- MÉTRICAS DE LA APLICACIÓN ---
+
+WEBHOOK_SEGUNDOS = Histograma(
+    'presuapp_webhook_segundos', 'Tiempo de respuesta del webhook de WhatsApp a Meta.', ['estado'])
+WEBHOOK_DESCARTADOS = Contador(
+    'presuapp_webhook_descartados_total', 'Entregas del webhook sin nada que procesar (estados, reintentos de Meta).', ['motivo'])
+GRAPH_API_SEGUNDOS = Histograma(
+    'presuapp_graph_api_segundos', 'Latencia de los envíos a la Graph API (incluye reintentos).', ['resultado'])
+WHATSAPP_PROCESADOS = Contador(
+    'presuapp_whatsapp_procesados_total', 'Logs del webhook procesados por la cola.', ['resultado'])
+ALERTAS_GENERADAS = Contador(
+    'presuapp_alertas_generadas_total', 'Alertas de presupuesto generadas.', ['nivel'])
+LOGIN_FALLIDOS = Contador(
+    'presuapp_login_fallidos_total', 'Intentos de login fallidos de usuarios existentes.')
+BLOQUEOS = Contador(
+    'presuapp_bloqueos_total', 'Cuentas bloqueadas por intentos fallidos.')
+ACCESOS_DENEGADOS = Contador(
+    'presuapp_accesos_denegados_total', 'Logins con clave correcta rechazados por bloqueo vigente.')
+
+
+def _lineas_cache():
+    # Aciertos / fallos de presuApp/cache.py (solo si el backend es uno con contadores)
+    from presuApp.cache import estadisticas
+    datos = estadisticas()
+    nombre = 'presuapp_cache_lecturas_total'
+    yield f'# HELP {nombre} Lecturas de la caché por espacio y resultado.'
+    yield f'# TYPE {nombre} counter'
+    for espacio, valores in datos.items():
+        yield f'{nombre}{_etiquetas(["espacio", "resultado"], [espacio, "acierto"])} {valores["aciertos"]}'
+        yield f'{nombre}{_etiquetas(["espacio", "resultado"], [espacio, "fallo"])} {valores["fallos"]}'
+
+
+def exponer():
+    lineas = []
+    for metrica in _registro:
+        lineas.extend(metrica.lineas())
+    lineas.extend(_lineas_cache())
+    return '\n'.join(lineas) + '\n'
+
+
+def _autorizado(request):
+    token = settings.METRICAS_TOKEN
+    if token and request.headers.get('Authorization') == f'Bearer {token}':
+        return True
+    return request.META.get('REMOTE_ADDR') in settings.METRICAS_IPS
+
+
+def metricas_view(request):
+    if not _autorizado(request):
+        raise Http404()
+    return HttpResponse(exponer(), content_type='text/plain; version=0.0.4; charset=utf-8')
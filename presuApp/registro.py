@@ -0,0 +1,89 @@
+import atexit
+import datetime
+import json
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+# --- LOGGING: JSON, MUESTREO Y ESCRITURA FUERA DEL REQUEST ---
+# Piezas que usa settings.LOGGING:
+#   - FormatoJSON: una línea JSON por evento. `severity` y `message` son los nombres que
+#     Cloud Logging reconoce; lo que se pase en extra={...} sale como campos propios.
+#   - FormatoTexto: lo mismo legible, para desarrollo (LOG_FORMATO=texto).
+#   - FiltroMuestreo: deja pasar solo una fracción de los eventos frecuentes (por logger).
+#     WARNING o más siempre pasan.
+#   - ManejadorEnCola: el hilo del request solo deja el registro en una cola; otro hilo
+#     escribe a stdout. Así la escritura (sin buffer en Cloud Run) no se suma a la latencia.
+
+# Atributos propios de LogRecord: todo lo demás vino en extra={...}
+_ATRIBUTOS_RECORD = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+def _extras(record):
+    return {k: v for k, v in vars(record).items() if k not in _ATRIBUTOS_RECORD and not k.startswith('_')}
+
+
+class FormatoJSON(logging.Formatter):
+
+    def format(self, record):
+        datos = {
+            'time': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'severity': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            **_extras(record),
+        }
+        if record.exc_info:
+            datos['excepcion'] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class FormatoTexto(logging.Formatter):
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        texto = super().format(record)
+        extras = _extras(record)
+        if extras:
+            texto += ' ' + ' '.join(f'{k}={v}' for k, v in extras.items())
+        return texto
+
+
+class FiltroMuestreo(logging.Filter):
+    """
+    tasas = {'nombre.del.logger': fracción}. Aplica también a los loggers hijos; los
+    que no aparecen no se muestrean.
+    """
+
+    def __init__(self, tasas=None):
+        super().__init__()
+        self.tasas = tasas or {}
+
+    def _tasa(self, nombre):
+        while nombre:
+            if nombre in self.tasas:
+                return self.tasas[nombre]
+            nombre = nombre.rpartition('.')[0]
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        tasa = self._tasa(record.name)
+        return tasa >= 1 or random.random() < tasa
+
+
+class ManejadorEnCola(QueueHandler):
+
+    def __init__(self):
+        super().__init__(queue.SimpleQueue())
+        # El formato se aplica antes de encolar (QueueHandler.prepare): el hilo escritor
+        # solo copia el texto ya armado
+        salida = logging.StreamHandler(sys.stdout)
+        self._escritor = QueueListener(self.queue, salida)
+        self._escritor.start()
+        atexit.register(self._escritor.stop) # Vacía la cola al terminar el proceso
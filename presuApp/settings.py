@@ -11,8 +11,12 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
 import os
+import tempfile
+from urllib.parse import urlparse
 from decouple import config, Csv
+from django.core.exceptions import ImproperlyConfigured
 import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -51,6 +55,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'presuApp.instrumentacion.InstrumentacionSQLMiddleware', # Solo si INSTRUMENTACION_SQL=True
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -100,6 +105,57 @@ DATABASES = {
 # }
 
 
+# --- CACHÉ ---
+# CACHE_URL elige el backend (todos cuentan aciertos/fallos, ver presuApp/cache.py):
+#   locmem://                  memoria del proceso (por defecto; cada worker tiene la suya)
+#   file:///var/tmp/presuapp   archivos, compartidos entre los workers de una misma máquina
+#   redis://host:6379/0        Redis, compartido entre máquinas
+CACHE_URL = config('CACHE_URL', default='locmem://')
+_cache_url = urlparse(CACHE_URL)
+
+if _cache_url.scheme in ('redis', 'rediss') and importlib.util.find_spec('redis') is None:
+    # Mejor no partir que degradar en silencio a una caché por contenedor
+    raise ImproperlyConfigured("CACHE_URL apunta a Redis pero falta el paquete 'redis' (ver requirements.txt).")
+
+if _cache_url.scheme in ('redis', 'rediss'):
+    _cache = {'BACKEND': 'presuApp.cache.RedisConContadores', 'LOCATION': CACHE_URL}
+elif _cache_url.scheme == 'file':
+    _cache = {
+        'BACKEND': 'presuApp.cache.ArchivoConContadores',
+        'LOCATION': _cache_url.path or os.path.join(tempfile.gettempdir(), 'presuapp-cache'),
+    }
+else:
+    _cache = {'BACKEND': 'presuApp.cache.LocMemConContadores', 'LOCATION': 'presuapp'}
+
+if 'Redis' not in _cache['BACKEND']:
+    # El default de Django (300 entradas) se queda corto con claves por usuario
+    _cache['OPTIONS'] = {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=5000, cast=int)}
+
+CACHES = {
+    'default': {
+        **_cache,
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
+        'KEY_PREFIX': config('CACHE_KEY_PREFIX', default='presuapp'),
+    }
+}
+
+# ¿La caché la ven TODOS los procesos que escriben (web, worker de la cola, cada instancia
+# de Cloud Run)? Redis sí; la de archivos solo si todo corre en una misma máquina (si no,
+# CACHE_COMPARTIDA=False); locmem nunca. Lo que depende de que una escritura en otro proceso
+# se note aquí (sesiones en caché, sellos de versiones.py: ETag/304 y cachés por usuario)
+# solo se activa con una caché compartida.
+CACHE_COMPARTIDA = 'LocMem' not in _cache['BACKEND'] and config(
+    'CACHE_COMPARTIDA', default=_cache_url.scheme in ('redis', 'rediss', 'file'), cast=bool
+)
+
+# Sesiones: con caché compartida se leen de ella y solo van a la BD si no están (o al
+# escribirlas). Con una caché por proceso, un logout en una instancia no borraría la copia
+# de las demás: ahí se leen siempre de la BD
+SESSION_ENGINE = (
+    'django.contrib.sessions.backends.cached_db' if CACHE_COMPARTIDA else 'django.contrib.sessions.backends.db'
+)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -177,6 +233,74 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Lote de la API (POST /api/v1/transacciones/lote/): tope de operaciones por request
+# y cuántos días se recuerdan las claves de idempotencia de la App
+API_LOTE_MAX_OPERACIONES = config('API_LOTE_MAX_OPERACIONES', default=500, cast=int)
+API_LOTE_DIAS_CLAVES = config('API_LOTE_DIAS_CLAVES', default=7, cast=int)
+
+# Sincronización incremental (GET /api/v1/sync/, ver app_finanzas/api/sync.py)
+SYNC_LIMITE = config('SYNC_LIMITE', default=1000, cast=int) # Transacciones por respuesta
+SYNC_MARGEN_SEGUNDOS = config('SYNC_MARGEN_SEGUNDOS', default=30, cast=int) # Tolerancia a escrituras aún sin confirmar
+SYNC_DIAS_ELIMINACIONES = config('SYNC_DIAS_ELIMINACIONES', default=90, cast=int) # Vida de las lápidas (manage.py purgar_eliminaciones)
+
+# Instrumentación SQL por request (presuApp/instrumentacion.py): header Server-Timing y
+# log 'presuApp.instrumentacion'. Presupuesto de consultas por vista (nombre de URL);
+# las que lo pasan se loguean como WARNING con las consultas repetidas.
+INSTRUMENTACION_SQL = config('INSTRUMENTACION_SQL', default=False, cast=bool)
+PRESUPUESTO_CONSULTAS_DEFECTO = config('PRESUPUESTO_CONSULTAS_DEFECTO', default=20, cast=int)
+PRESUPUESTO_CONSULTAS = {
+    'dashboard': 15,
+    'mis_gastos': 10,
+    'presupuestos': 10,
+    'categorias': 15,
+    'api_dashboard_data': 12,
+    'api_transacciones-list': 6,
+    'api_presupuestos-list': 6,
+    'api_categorias-list': 6,
+    'api_sync': 10,
+}
+
+# --- LOGGING (ver presuApp/registro.py) ---
+# JSON por stdout (Cloud Logging lo indexa) o texto legible en desarrollo. Niveles por
+# módulo con LOG_NIVELES="app_finanzas.services=DEBUG,usuarios=WARNING" y muestreo de los
+# eventos INFO/DEBUG más frecuentes (los WARNING o más salen siempre).
+LOG_FORMATO = config('LOG_FORMATO', default='json') # json | texto
+LOG_NIVEL = config('LOG_NIVEL', default='INFO')
+LOG_NIVELES = dict(par.split('=', 1) for par in config('LOG_NIVELES', default='', cast=Csv()))
+LOG_MUESTREO = {
+    'presuApp.instrumentacion': config('LOG_MUESTREO_SQL', default=1.0, cast=float), # Una línea por request
+    'app_finanzas.cliente_graph': config('LOG_MUESTREO_GRAPH', default=1.0, cast=float),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'presuApp.registro.FormatoJSON'},
+        'texto': {'()': 'presuApp.registro.FormatoTexto'},
+    },
+    'filters': {
+        'muestreo': {'()': 'presuApp.registro.FiltroMuestreo', 'tasas': LOG_MUESTREO},
+    },
+    'handlers': {
+        'stdout': {
+            'class': 'presuApp.registro.ManejadorEnCola',
+            'formatter': LOG_FORMATO,
+            'filters': ['muestreo'],
+        },
+    },
+    'root': {'handlers': ['stdout'], 'level': LOG_NIVEL},
+    'loggers': {
+        # Reemplaza los handlers por defecto de Django: todo en el mismo formato y una sola vez
+        'django': {'handlers': ['stdout'], 'level': config('LOG_NIVEL_DJANGO', default='INFO'), 'propagate': False},
+        **{modulo: {'level': nivel.upper()} for modulo, nivel in LOG_NIVELES.items()},
+    },
+}
+
+# Métricas en /metrics (presuApp/metricas.py): solo desde estas IPs o con el token
+METRICAS_IPS = config('METRICAS_IPS', default='127.0.0.1,::1', cast=Csv())
+METRICAS_TOKEN = config('METRICAS_TOKEN', default='')
+
 # --- CONFIGURACIÓN CORS (Para desarrollo) ---
 # Permite que cualquier origen se conecte (útil para probar desde emulador Android/iOS)
 CORS_ALLOW_ALL_ORIGINS = True 
@@ -206,5 +330,19 @@ AUTHENTICATION_BACKENDS = [
 
 WHATSAPP_PHONE_ID = config('WHATSAPP_PHONE_ID', default='')
 WHATSAPP_TOKEN = config('WHATSAPP_TOKEN', default='')
-WHATSAPP_API_URL = f"https://graph.facebook.com/v17.0/{WHATSAPP_PHONE_ID}/messages"
-WHATSAPP_VERIFY_TOKEN = config('WHATSAPP_VERIFY_TOKEN', default='mi_token_secreto_presuapp')
\ No newline at end of file
+WHATSAPP_API_URL = config('WHATSAPP_API_URL', default=f"https://graph.facebook.com/v17.0/{WHATSAPP_PHONE_ID}/messages")
+WHATSAPP_VERIFY_TOKEN = config('WHATSAPP_VERIFY_TOKEN', default='mi_token_secreto_presuapp')
+# Cliente HTTP de la Graph API (app_finanzas/cliente_graph.py)
+WHATSAPP_TIMEOUT_CONEXION = config('WHATSAPP_TIMEOUT_CONEXION', default=3.05, cast=float)
+WHATSAPP_TIMEOUT_LECTURA = config('WHATSAPP_TIMEOUT_LECTURA', default=10, cast=float)
+WHATSAPP_REINTENTOS = config('WHATSAPP_REINTENTOS', default=3, cast=int)
+WHATSAPP_TAMANO_POOL = config('WHATSAPP_TAMANO_POOL', default=10, cast=int)
+# Por defecto el webhook solo encola y `manage.py procesar_cola_whatsapp` procesa.
+# True = procesar dentro del request (como antes), útil en desarrollo sin worker.
+WHATSAPP_PROCESAR_EN_LINEA = config('WHATSAPP_PROCESAR_EN_LINEA', default=False, cast=bool)
+# Retención de WhatsAppLog (manage.py purgar_logs_whatsapp): días que los logs procesados
+# se guardan completos, qué se hace después (compactar | archivar | borrar) y dónde van
+# los .jsonl.gz al archivar
+WHATSAPP_LOGS_DIAS = config('WHATSAPP_LOGS_DIAS', default=30, cast=int)
+WHATSAPP_LOGS_MODO = config('WHATSAPP_LOGS_MODO', default='compactar')
+WHATSAPP_LOGS_ARCHIVO = config('WHATSAPP_LOGS_ARCHIVO', default=str(BASE_DIR / 'archivo_whatsapp'))
@@ -9,6 +9,7 @@ from app_finanzas import views as finanzas_views
 from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
+from presuApp.metricas import metricas_view
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -72,6 +73,7 @@ urlpatterns = [
          name='password_reset_complete'),
     path('categorias/', finanzas_views.categorias_view, name='categorias'),
     path('mis-gastos/', finanzas_views.mis_gastos_view, name='mis_gastos'),
+    path('mis-gastos/exportar/', finanzas_views.exportar_gastos_view, name='exportar_gastos'),
     path('mis-gastos/nuevo/', finanzas_views.agregar_gasto_view, name='agregar_gasto'),
     path('gastos/mis-gastos/nuevo/', finanzas_views.agregar_gasto_view, name='agregar_gasto'),
     path('ajax/load-subcategorias/', finanzas_views.load_subcategorias, name='ajax_load_subcategorias'),
@@ -80,6 +82,7 @@ urlpatterns = [
     path('gastos/editar/<int:id>/', finanzas_views.editar_gasto_view, name='editar_gasto'),
     path('gastos/eliminar/<int:id>/', finanzas_views.eliminar_gasto_view, name='eliminar_gasto'),
     path('presupuestos/', finanzas_views.lista_presupuestos_view, name='presupuestos'),
+    path('presupuestos/exportar/', finanzas_views.exportar_presupuestos_view, name='exportar_presupuestos'),
     path('presupuestos/nuevo/', finanzas_views.crear_presupuesto_view, name='crear_presupuesto'),
     path('presupuestos/eliminar/<int:id>/', finanzas_views.eliminar_presupuesto_view, name='eliminar_presupuesto'),
     path('presupuestos/editar/<int:id>/', finanzas_views.editar_presupuesto_view, name='editar_presupuesto'),
@@ -96,4 +99,6 @@ urlpatterns = [
     # urls de las alertas
     path('alertas/leer/<int:id>/', finanzas_views.marcar_alerta_leida_view, name='marcar_alerta_leida'),
     path('alertas/limpiar-todo/', finanzas_views.limpiar_alertas_view, name='limpiar_alertas'),
+    # métricas para Prometheus (solo local, ver presuApp/metricas.py)
+    path('metrics', metricas_view, name='metricas'),
 ]
@@ -1,5 +1,9 @@
+import logging
 from django.contrib.auth.backends import ModelBackend
 from django.utils import timezone
+from presuApp.metricas import ACCESOS_DENEGADOS
+
+logger = logging.getLogger(__name__)
 
 class BloqueoBackend(ModelBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
@@ -11,7 +15,8 @@ class BloqueoBackend(ModelBackend):
             # Si el usuario tiene una fecha de bloqueo y esa fecha es FUTURA
             if user.bloqueado_hasta and user.bloqueado_hasta > timezone.now():
                 # Retornamos None para que Django piense que falló el login
-                print(f"⛔ Acceso denegado a {user.email}: Cuenta bloqueada temporalmente.")
+                ACCESOS_DENEGADOS.inc()
+                logger.warning("acceso_denegado_bloqueo", extra={'usuario_id': user.pk})
                 return None
             
             # Si no está bloqueado, lo dejamos pasar
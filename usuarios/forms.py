@@ -42,6 +42,11 @@ class RegistroUsuarioForm(UserCreationForm):
                 if 'form-control' not in field.widget.attrs['class']:
                     field.widget.attrs['class'] += ' form-control'
 
+    def clean_numero_telefono(self):
+        # Con el prefijo ya puesto, para que la validación del modelo (teléfono repetido) vea el número real
+        telefono = self.cleaned_data['numero_telefono']
+        return f"+569{telefono}" if telefono else None
+
     def save(self, commit=True):
         user = super().save(commit=False)
         user.username = user.email
@@ -104,6 +109,10 @@ class EditarUsuarioForm(forms.ModelForm):
             if telefono_db.startswith('+569'):
                 self.initial['numero_telefono'] = telefono_db[4:] # Quitamos los primeros 4 chars (+569)
 
+    def clean_numero_telefono(self):
+        # Igual que en el registro: el modelo valida el número completo
+        return f"+569{self.cleaned_data['numero_telefono']}"
+
     # LOGICA PREFIJO AL GUARDAR EDICIÓN
     def save(self, commit=True):
         user = super().save(commit=False)
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:58
+
+import re
+from django.db import migrations, models
+
+
+def completar_telefono_e164(apps, schema_editor):
+    # Si dos usuarios tienen el mismo número escrito distinto ("+569..." y "569..."), solo el
+    # primero queda con telefono_e164: el bot ya encontraba a uno solo de los dos
+    UsuarioCustom = apps.get_model('usuarios', 'UsuarioCustom')
+    vistos, lote = set(), []
+    usuarios = UsuarioCustom.objects.exclude(numero_telefono=None).order_by('id').only('id', 'numero_telefono')
+    for usuario in usuarios.iterator(chunk_size=2000):
+        telefono = re.sub(r'\D', '', usuario.numero_telefono)
+        if telefono and telefono not in vistos:
+            vistos.add(telefono)
+            usuario.telefono_e164 = telefono
+            lote.append(usuario)
+        if len(lote) >= 2000:
+            UsuarioCustom.objects.bulk_update(lote, ['telefono_e164'])
+            lote = []
+    UsuarioCustom.objects.bulk_update(lote, ['telefono_e164'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0002_usuariocustom_bloqueado_hasta_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuariocustom',
+            name='telefono_e164',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True, unique=True),
+        ),
+        migrations.RunPython(completar_telefono_e164, migrations.RunPython.noop),
+    ]
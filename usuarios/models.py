@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
+from django.core.exceptions import ValidationError
+from .telefonos import normalizar_telefono, telefono_en_uso
 
 # Create your models here.
 class UsuarioCustom(AbstractUser):
@@ -19,6 +21,9 @@ class UsuarioCustom(AbstractUser):
     # Campos adicionales
     # Usamos CharField para telefono porque a veces incluyen el simbolo +
     numero_telefono = models.CharField(max_length=20, unique=True, verbose_name='Teléfono WhatsApp',blank=True, null=True)
+    # El mismo número solo con dígitos (E.164 sin '+', como lo manda WhatsApp). Se calcula en
+    # save(): es lo que usa el bot para encontrar al usuario (ver usuarios/telefonos.py)
+    telefono_e164 = models.CharField(max_length=20, unique=True, blank=True, null=True, editable=False)
     rol = models.CharField(max_length=10, choices=ROLE_CHOICES, default=CLIENTE, verbose_name='Rol')
     
     intentos_fallidos = models.IntegerField(default=0)
@@ -32,6 +37,20 @@ class UsuarioCustom(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.get_rol_display()})"
     
+    def clean(self):
+        super().clean()
+        # El índice único de numero_telefono no ve que "+569..." y "569..." son el mismo número
+        # (telefono_e164 no es editable, así que validate_unique lo salta)
+        if telefono_en_uso(self.numero_telefono, excepto=self.pk):
+            raise ValidationError({'numero_telefono': 'Ya existe un usuario con este teléfono.'})
+
+    def save(self, *args, **kwargs):
+        self.telefono_e164 = normalizar_telefono(self.numero_telefono)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'numero_telefono' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'telefono_e164'}
+        super().save(*args, **kwargs)
+
     def esta_bloqueado(self):
         if self.bloqueado_hasta and self.bloqueado_hasta > timezone.now():
             return True
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from .telefonos import telefono_en_uso
 
 # Obtenemos tu modelo UsuarioCustom de forma segura
 User = get_user_model()
@@ -8,4 +9,10 @@ class UsuarioSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         # Agregamos 'email' (tu username), telefono y rol
-        fields = ['id', 'email', 'first_name', 'last_name', 'numero_telefono', 'rol']
\ No newline at end of file
+        fields = ['id', 'email', 'first_name', 'last_name', 'numero_telefono', 'rol']
+
+    def validate_numero_telefono(self, valor):
+        # El mismo número con o sin "+" es el mismo teléfono (ver UsuarioCustom.clean)
+        if telefono_en_uso(valor, excepto=getattr(self.instance, 'pk', None)):
+            raise serializers.ValidationError('Ya existe un usuario con este teléfono.')
+        return valor
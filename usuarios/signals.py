@@ -1,3 +1,4 @@
+import logging
 from django.contrib.auth.signals import user_login_failed, user_logged_in
 from django.dispatch import receiver
 from django.utils import timezone
@@ -5,8 +6,10 @@ from django.core.mail import send_mail
 from django.conf import settings
 from datetime import timedelta
 from django.contrib.auth import get_user_model
+from presuApp.metricas import LOGIN_FALLIDOS, BLOQUEOS
 
 Usuario = get_user_model()
+logger = logging.getLogger(__name__)
 
 # 1. SI FALLA EL LOGIN
 @receiver(user_login_failed)
@@ -28,7 +31,8 @@ def registrar_intento_fallido(sender, credentials, request, **kwargs):
         user.intentos_fallidos += 1
         user.save()
         
-        print(f"⚠️ Intento fallido #{user.intentos_fallidos} para {user.email}")
+        LOGIN_FALLIDOS.inc()
+        logger.info("login_fallido", extra={'usuario_id': user.pk, 'intentos': user.intentos_fallidos})
 
         # Si llega a 3 intentos -> BLOQUEO
         if user.intentos_fallidos >= 3:
@@ -36,7 +40,8 @@ def registrar_intento_fallido(sender, credentials, request, **kwargs):
             user.bloqueado_hasta = timezone.now() + timedelta(minutes=15)
             user.save()
 
-            print(f"🚫 BLOQUEADO: {user.email} por 15 minutos.")
+            BLOQUEOS.inc()
+            logger.warning("cuenta_bloqueada", extra={'usuario_id': user.pk, 'minutos': 15})
 
             # ENVIAR CORREO DE AVISO
             try:
@@ -56,8 +61,8 @@ def registrar_intento_fallido(sender, credentials, request, **kwargs):
                     [user.email],
                     fail_silently=True,
                 )
-            except Exception as e:
-                print(f"Error enviando correo: {e}")
+            except Exception:
+                logger.exception("error_correo_bloqueo", extra={'usuario_id': user.pk})
 
     except Usuario.DoesNotExist:
         # El email no existe en nuestra BD, ignoramos.
@@ -70,4 +75,4 @@ def resetear_intentos(sender, request, user, **kwargs):
         user.intentos_fallidos = 0
         user.bloqueado_hasta = None
         user.save()
-        print(f"✅ Contador reseteado para {user.email}")
\ No newline at end of file
+        logger.info("intentos_reseteados", extra={'usuario_id': user.pk})
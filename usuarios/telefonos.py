@@ -0,0 +1,31 @@
+import re
+from django.contrib.auth import get_user_model
+
+# --- TELÉFONOS: FORMA CANÓNICA Y BÚSQUEDA DEL BOT ---
+# numero_telefono se guarda como lo escribió la persona (los formularios le ponen "+569...").
+# Meta manda solo los dígitos en formato E.164 ("569..."), así que cada usuario tiene también
+# telefono_e164 (solo dígitos, único e indexado), que se llena en UsuarioCustom.save().
+# El bot busca al usuario en cada mensaje que llega: es una igualdad sobre ese índice.
+
+
+def normalizar_telefono(valor):
+    """'+56 9 1234-5678' -> '56912345678'. None si no tiene dígitos."""
+    if not valor:
+        return None
+    return re.sub(r'\D', '', str(valor)) or None
+
+
+def telefono_en_uso(valor, excepto=None):
+    """¿Otro usuario (distinto de `excepto`, un pk) ya tiene este número, escrito como sea?"""
+    telefono = normalizar_telefono(valor)
+    if not telefono:
+        return False
+    return get_user_model().objects.filter(telefono_e164=telefono).exclude(pk=excepto).exists()
+
+
+def usuario_por_telefono(telefono):
+    """El usuario con ese número (en cualquier formato), o None."""
+    telefono = normalizar_telefono(telefono)
+    if not telefono:
+        return None
+    return get_user_model().objects.filter(telefono_e164=telefono).first()
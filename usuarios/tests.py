@@ -1,3 +1,86 @@
+import datetime
+from django.core.exceptions import ValidationError
 from django.test import TestCase
+from app_finanzas.models import Categoria, Presupuesto, Transaccion, Eliminacion
+from app_finanzas.tests.utils import crear_usuario, limite_consultas
+from .forms import RegistroUsuarioForm, EditarUsuarioForm
+from .models import UsuarioCustom
+from .telefonos import normalizar_telefono, usuario_por_telefono
 
-# Create your tests here.
+
+# --- TELÉFONOS (telefonos.py) ---
+
+class TelefonoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = crear_usuario('ana@ejemplo.cl', '+56912345678')
+
+    def test_normalizar(self):
+        self.assertEqual(normalizar_telefono('+56 9 1234-5678'), '56912345678')
+        self.assertIsNone(normalizar_telefono(''))
+        self.assertIsNone(normalizar_telefono('sin número'))
+
+    def test_el_bot_encuentra_al_usuario_en_cualquier_formato(self):
+        self.assertEqual(usuario_por_telefono('56912345678'), self.ana)
+        self.assertEqual(usuario_por_telefono('+56 9 1234 5678'), self.ana)
+        self.assertIsNone(usuario_por_telefono('56900000000'))
+
+    def test_la_busqueda_es_una_sola_consulta(self):
+        with limite_consultas(maximo=1):
+            usuario_por_telefono('+56 9 1234 5678')
+
+    def test_cambiar_el_numero_con_update_fields(self):
+        self.ana.numero_telefono = '+56987654321'
+        self.ana.save(update_fields=['numero_telefono'])
+        self.assertEqual(usuario_por_telefono('56987654321'), self.ana)
+        self.assertIsNone(usuario_por_telefono('56912345678'))
+
+    def test_mismo_numero_sin_mas_es_repetido(self):
+        otro = UsuarioCustom(username='beto@ejemplo.cl', email='beto@ejemplo.cl', numero_telefono='56912345678')
+        with self.assertRaises(ValidationError) as error:
+            otro.full_clean()
+        self.assertIn('numero_telefono', error.exception.message_dict)
+
+    def test_el_propio_numero_no_es_repetido(self):
+        self.ana.full_clean()
+
+    def test_formularios_validan_el_numero_con_prefijo(self):
+        registro = RegistroUsuarioForm(data={
+            'email': 'beto@ejemplo.cl', 'numero_telefono': '12345678',
+            'password1': 'Xk9!ab7#qq', 'password2': 'Xk9!ab7#qq',
+        })
+        self.assertIn('numero_telefono', registro.errors)
+
+        edicion = EditarUsuarioForm(instance=self.ana, data={'numero_telefono': '12345678', 'first_name': 'Ana', 'last_name': 'Pérez'})
+        self.assertTrue(edicion.is_valid(), edicion.errors)
+        self.assertEqual(edicion.save().numero_telefono, '+56912345678')
+
+    def test_registro_sin_telefono(self):
+        form = RegistroUsuarioForm(data={
+            'email': 'beto@ejemplo.cl', 'numero_telefono': '',
+            'password1': 'Xk9!ab7#qq', 'password2': 'Xk9!ab7#qq',
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertIsNone(form.save().numero_telefono)
+
+
+# --- ELIMINAR CUENTA ---
+
+class EliminarCuentaTests(TestCase):
+
+    def test_la_cascada_no_recalcula_nada(self):
+        usuario = crear_usuario('ana@ejemplo.cl')
+        hoy = datetime.date.today()
+        padres = [Categoria.objects.create(nombre=f'Padre {i}', usuario=usuario) for i in range(5)]
+        for padre in padres:
+            Categoria.objects.create(nombre=f'Hija de {padre.nombre}', usuario=usuario, categoria_padre=padre)
+        Presupuesto.objects.create(usuario=usuario, mes=hoy.month, anio=hoy.year, monto_limite=1000)
+        for i in range(50):
+            Transaccion.objects.create(usuario=usuario, tipo='GASTO', monto=10, fecha=hoy, categoria=padres[i % 5])
+
+        # Sin los receptores del libro, resumen y lápidas: un puñado de DELETE, no uno por fila
+        with limite_consultas(maximo=40):
+            usuario.delete()
+        self.assertFalse(Transaccion.objects.exists())
+        self.assertFalse(Eliminacion.objects.exists())
@@ -3,11 +3,12 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .forms import RegistroUsuarioForm, EditarUsuarioForm
 from django.contrib.auth import logout
-from django.db.models import Sum
 from django.utils import timezone
-from django.db.models import Q
-from django.db.models.functions import ExtractDay
 from app_finanzas.models import Transaccion,Presupuesto
+from app_finanzas.agregados import (
+    progreso_presupuestos, resumen_mes, totales_por_tipo, datos_torta, gastos_por_dia
+)
+from app_finanzas.utils import rango_mes, validar_periodo
 from rest_framework import generics, permissions
 from .serializers import UsuarioSerializer
 import json
@@ -76,8 +77,9 @@ def dashboard_view(request):
     
     # Obtener mes/año del GET (o usar el actual)
     try:
-        mes_seleccionado = int(request.GET.get('mes', hoy.month))
-        anio_seleccionado = int(request.GET.get('anio', hoy.year))
+        anio_seleccionado, mes_seleccionado = validar_periodo(
+            request.GET.get('anio', hoy.year), request.GET.get('mes', hoy.month)
+        )
     except ValueError:
         mes_seleccionado = hoy.month
         anio_seleccionado = hoy.year
@@ -99,16 +101,14 @@ def dashboard_view(request):
             'texto': f"{mes_iter}/{anio_iter}" # Formato simple 12/2025
         })
 
-    # 2. FILTRAR TRANSACCIONES DEL MES SELECCIONADO
-    transacciones_mes = Transaccion.objects.filter(
-        usuario=request.user,
-        fecha__month=mes_seleccionado,
-        fecha__year=anio_seleccionado
-    )
+    # 2. RESUMEN DEL MES SELECCIONADO
+    # Los totales y gráficos salen del resumen diario (ver agregados.py), no de las transacciones
+    resumen = resumen_mes(request.user, anio_seleccionado, mes_seleccionado)
 
     # 3. KPIS (Tarjetas)
-    total_ingresos = transacciones_mes.filter(tipo='INGRESO').aggregate(Sum('monto'))['monto__sum'] or 0
-    total_gastos = transacciones_mes.filter(tipo='GASTO').aggregate(Sum('monto'))['monto__sum'] or 0
+    totales = totales_por_tipo(resumen)
+    total_ingresos = totales['INGRESO']
+    total_gastos = totales['GASTO']
     saldo_actual = total_ingresos - total_gastos
 
     presupuesto_global_obj = Presupuesto.objects.filter(
@@ -128,58 +128,37 @@ def dashboard_view(request):
     saldo_restante_global = monto_presupuesto_global - total_gastos
 
     # 4. ÚLTIMAS 5 TRANSACCIONES
-    ultimas_transacciones = transacciones_mes.order_by('-fecha', '-id')[:5]
+    # Rango semiabierto [1° del mes, 1° del siguiente) para aprovechar el índice (usuario, fecha, tipo)
+    inicio_mes, fin_mes = rango_mes(anio_seleccionado, mes_seleccionado)
+    ultimas_transacciones = Transaccion.objects.filter(
+        usuario=request.user,
+        fecha__gte=inicio_mes,
+        fecha__lt=fin_mes
+    ).select_related('categoria').order_by('-fecha', '-id')[:5]
 
     # 5. PRESUPUESTOS CON MAYOR % DE USO
     presupuestos = Presupuesto.objects.filter(usuario=request.user, mes=mes_seleccionado, anio=anio_seleccionado)
-    lista_presupuestos = []
-    
-    for p in presupuestos:
-        # Reutilizamos lógica de cálculo
-        cats = p.categorias.all()
-        gastos_query = transacciones_mes.filter(tipo='GASTO') # Ya está filtrada por fecha
-        
-        if cats.exists():
-            gastos_query = gastos_query.filter(
-                Q(categoria__in=cats) | Q(categoria__categoria_padre__in=cats)
-            )
-        
-        gastado = gastos_query.aggregate(Sum('monto'))['monto__sum'] or 0
-        porcentaje = int((gastado * 100) / p.monto_limite) if p.monto_limite > 0 else 0
-        
-        lista_presupuestos.append({
-            'nombre': p.nombre,
-            'porcentaje': porcentaje,
-            'visual': min(porcentaje, 100),
-            'estado': 'danger' if porcentaje > 90 else 'warning' if porcentaje > 70 else 'success'
-        })
+    lista_presupuestos = progreso_presupuestos(presupuestos)
     
     # Ordenamos por porcentaje descendente y tomamos los top 3
     top_presupuestos = sorted(lista_presupuestos, key=lambda x: x['porcentaje'], reverse=True)[:3]
 
     # 6. DATOS GRÁFICO TORTA (Categorías)
-    gastos_query = transacciones_mes.filter(tipo='GASTO').select_related('categoria')
-    datos_torta = {}
-    for g in gastos_query:
-        cat_nombre = "Sin Categoría"
-        if g.categoria:
-            cat_nombre = g.categoria.categoria_padre.nombre if g.categoria.categoria_padre else g.categoria.nombre
-        datos_torta[cat_nombre] = datos_torta.get(cat_nombre, 0) + float(g.monto)
+    # Una sola consulta agrupada por categoría padre (ver agregados.datos_torta)
+    torta = datos_torta(
+        resumen.filter(tipo='GASTO'),
+        sin_categoria="Sin Categoría",
+        campos_nombre=('categoria_padre__nombre',),
+        campo_monto='total'
+    )
 
     # 7. DATOS GRÁFICO DIARIO (Línea: Día vs Monto)
-    # Agrupamos por día usando ExtractDay
-    gastos_por_dia = transacciones_mes.filter(tipo='GASTO')\
-        .annotate(dia=ExtractDay('fecha'))\
-        .values('dia')\
-        .annotate(total=Sum('monto'))\
-        .order_by('dia')
+    # Creamos un diccionario rápido {1: 5000, 5: 2000}
+    mapa_gastos = gastos_por_dia(resumen)
     
     # Preparamos ejes (Días 1 al 31)
     labels_dias = []
     data_dias = []
-    # Creamos un diccionario rápido {1: 5000, 5: 2000}
-    mapa_gastos = {item['dia']: float(item['total']) for item in gastos_por_dia}
-    
     # Rellenamos los días para que el gráfico sea continuo
     # (Truco simple: iterar hasta 31, si el mes tiene menos el gráfico igual aguanta)
     ultimo_dia = 31 
@@ -204,8 +183,8 @@ def dashboard_view(request):
         'top_presupuestos': top_presupuestos,
         
         # Gráficos
-        'labels_torta': json.dumps(list(datos_torta.keys())),
-        'data_torta': json.dumps(list(datos_torta.values())),
+        'labels_torta': json.dumps([d['name'] for d in torta]),
+        'data_torta': json.dumps([d['value'] for d in torta]),
         'labels_dias': json.dumps(labels_dias),
         'data_dias': json.dumps(data_dias),
     }